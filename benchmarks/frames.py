@@ -0,0 +1,39 @@
+import json
+from typing import Iterator, List, Optional
+import numpy as np
+
+
+def synthetic_books5_frames(n: int = 10_000, levels: int = 5, inst_id: str = "BTC-USDT",
+                            mid: float = 30_000.0, tick: float = 0.1, seed: Optional[int] = 7) -> List[str]:
+    """
+    Offline OKX books5 push frames (JSON text) from a random-walk mid with
+    random level sizes. Deterministic for a given seed.
+    """
+    rng = np.random.default_rng(seed)
+    mids = mid + np.cumsum(rng.normal(0.0, tick, n))
+    half = np.maximum(np.round(rng.exponential(tick, n) / tick), 1) * tick / 2
+    offsets = np.arange(levels) * tick
+    sizes = np.round(rng.exponential(0.5, (n, 2, levels)), 6)
+    ts0 = 1_700_000_000_000
+    frames = []
+    for i in range(n):
+        bid0 = np.round(mids[i] - half[i], 1)
+        ask0 = np.round(mids[i] + half[i], 1)
+        bids = [[f"{bid0 - o:.1f}", f"{s:.6f}", "0", "1"] for o, s in zip(offsets, sizes[i, 0])]
+        asks = [[f"{ask0 + o:.1f}", f"{s:.6f}", "0", "1"] for o, s in zip(offsets, sizes[i, 1])]
+        frames.append(json.dumps({
+            "arg": {"channel": "books5", "instId": inst_id},
+            "data": [{"asks": asks, "bids": bids, "ts": str(ts0 + 100 * i), "seqId": i}],
+        }))
+    return frames
+
+
+def load_frames(path: str) -> List[str]:
+    """Recorded frames, one raw websocket message per line."""
+    with open(path) as f:
+        return [line.rstrip("\n") for line in f if line.strip()]
+
+
+def books(frames: List[str]) -> Iterator[dict]:
+    for frame in frames:
+        yield json.loads(frame)["data"][0]
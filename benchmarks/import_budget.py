@@ -0,0 +1,90 @@
+"""
+Start-up import budget for the headless ingest path.
+
+    python -m benchmarks.import_budget                  # check against the default budget
+    python -m benchmarks.import_budget --budget-ms 300  # custom budget
+    python -m benchmarks.import_budget --top 15         # also list the slowest imports
+
+Imports the ingest modules in a fresh interpreter under `python -X importtime`
+(best of --repeat runs) and exits non-zero if the cumulative import time is over
+budget or if any dependency that should load lazily (pandas, sklearn, ...) was pulled in.
+"""
+import argparse
+import os
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# everything a feed worker needs: client, processing, analytics, cost estimate and model classes
+INGEST_MODULES = (
+    "websockets.ws_client",
+    "websockets.async_ws_client",
+    "websockets.orderbook_processor",
+    "utils.tick_store",
+    "models.cost_estimator",
+    "models.slippage_model",
+    "models.maker_taker_model",
+)
+LAZY_MODULES = ("pandas", "sklearn", "joblib", "scipy", "altair", "streamlit")
+DEFAULT_BUDGET_MS = 250.0
+
+
+def measure(modules=INGEST_MODULES, lazy=LAZY_MODULES) -> Tuple[float, List[Tuple[float, str]], List[str]]:
+    """
+    Returns:
+        (total_ms, [(cumulative_ms, module), ...] for every import, lazily-loaded modules that got imported)
+    """
+    code = (
+        f"import sys\nfor m in {list(modules)!r}: __import__(m)\n"
+        f"print(','.join(m for m in {list(lazy)!r} if m in sys.modules))"
+    )
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=REPO_ROOT, capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative) / 1000.0, name))
+    # top-level entries (no indentation) add up to the whole import; skip interpreter start-up
+    top = {name.strip(): ms for ms, name in rows if not name.startswith("  ")}
+    start_up = ("site", "encodings", "_frozen_importlib_external", "zipimport")
+    total = sum(ms for name, ms in top.items() if name not in start_up and not name.startswith("encodings"))
+    loaded = [m for m in proc.stdout.strip().split(",") if m]
+    return total, sorted(((ms, name.strip()) for ms, name in rows), reverse=True), loaded
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--repeat", type=int, default=3, help="fresh interpreters to run (best is reported)")
+    parser.add_argument("--top", type=int, default=0, help="print the N slowest imports")
+    args = parser.parse_args(argv)
+
+    runs = [measure() for _ in range(max(1, args.repeat))]
+    total, rows, loaded = min(runs, key=lambda r: r[0])
+    print(f"ingest imports: {total:.1f} ms (budget {args.budget_ms:.0f} ms, best of {len(runs)})")
+    seen: Dict[str, bool] = {}
+    for ms, name in rows:
+        if len(seen) >= args.top:
+            break
+        if name not in seen:
+            seen[name] = True
+            print(f"  {ms:8.1f} ms  {name}")
+
+    failed = False
+    if loaded:
+        print(f"FAIL: lazily-loaded dependencies imported on the ingest path: {', '.join(loaded)}")
+        failed = True
+    if total > args.budget_ms:
+        print(f"FAIL: over budget by {total - args.budget_ms:.1f} ms")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
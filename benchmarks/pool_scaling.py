@@ -0,0 +1,104 @@
+"""
+Throughput of utils.analytics_pool.AnalyticsPool against the inline (single thread) path.
+
+    python -m benchmarks.pool_scaling                          # 50 instruments, 1..cpu_count workers
+    python -m benchmarks.pool_scaling --workers 1,2,4,8 --updates 200000
+    python -m benchmarks.pool_scaling --min-efficiency 0.7     # exit non-zero below 70% of linear
+
+Submits --updates synthetic books round-robin over --instruments keys as fast as
+possible and reports updates/s until every result has been merged back. Efficiency
+is speedup over one worker divided by the worker count; it can only approach 1.0
+with at least that many idle cores. No multi-core results are recorded in this
+repository, so treat scaling as unmeasured until this has been run on one.
+"""
+import argparse
+import os
+import sys
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from utils.analytics_pool import AnalyticsPool
+from utils.book_analytics import BookAnalytics
+
+
+def synthetic_books(n: int, instruments: int, levels: int = 5, seed: int = 7) -> List[tuple]:
+    rng = np.random.default_rng(seed)
+    keys = [f"SYM{i:03d}-USDT" for i in range(instruments)]
+    mids = 100.0 * np.exp(np.cumsum(rng.normal(0, 1e-4, n)))
+    steps = np.arange(levels) * 0.01
+    out = []
+    for i, mid in enumerate(mids):
+        bids = np.column_stack((mid - 0.005 - steps, rng.uniform(0.1, 5.0, levels)))
+        asks = np.column_stack((mid + 0.005 + steps, rng.uniform(0.1, 5.0, levels)))
+        out.append((keys[i % instruments], float(i) * 1e-3, bids, asks, i))
+    return out
+
+
+def run_inline(books: List[tuple]) -> float:
+    analytics: Dict[str, BookAnalytics] = {}
+    start = time.perf_counter()
+    for key, ts, bids, asks, _ in books:
+        state = analytics.get(key)
+        if state is None:
+            state = analytics[key] = BookAnalytics()
+        state.update(bids, asks, ts)
+    return len(books) / (time.perf_counter() - start)
+
+
+def run_pool(books: List[tuple], keys: List[str], workers: int, capacity: int) -> Dict[str, float]:
+    with AnalyticsPool(keys, workers=workers, capacity=capacity) as pool:
+        pool.submit(*books[0])   # wait for workers to import and attach before timing
+        pool.drain(60.0)
+        pool.processed = 0
+        start = time.perf_counter()
+        dropped = 0
+        for book in books:
+            while not pool.submit(*book):
+                dropped += 1     # backpressure: retry instead of losing the update
+                time.sleep(50e-6)
+        pool.drain(600.0)
+        elapsed = time.perf_counter() - start
+        return {"updates_per_sec": pool.processed / elapsed, "retries": dropped,
+                "lost_results": sum(pool.dropped_results())}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--instruments", type=int, default=50)
+    parser.add_argument("--updates", type=int, default=100_000)
+    parser.add_argument("--workers", help="comma-separated worker counts (default: powers of two up to cpu_count)")
+    parser.add_argument("--capacity", type=int, default=8192, help="ring records per worker")
+    parser.add_argument("--min-efficiency", type=float, help="fail if the largest pool is below this fraction of linear")
+    args = parser.parse_args(argv)
+
+    cpus = os.cpu_count() or 1
+    if args.workers:
+        counts = [int(w) for w in args.workers.split(",") if w.strip()]
+    else:
+        counts = [1]
+        while counts[-1] * 2 <= cpus:
+            counts.append(counts[-1] * 2)
+    books = synthetic_books(args.updates, args.instruments)
+    keys = sorted({b[0] for b in books})
+
+    print(f"{args.updates} updates over {args.instruments} instruments, {cpus} CPUs")
+    print(f"{'inline':<12}{run_inline(books):>14,.0f}/s")
+    base = None
+    efficiency = 1.0
+    for n in counts:
+        result = run_pool(books, keys, n, args.capacity)
+        rate = result["updates_per_sec"]
+        base = base or rate
+        efficiency = rate / base / n
+        print(f"{f'{n} worker(s)':<12}{rate:>14,.0f}/s  x{rate / base:5.2f}  eff {efficiency:5.1%}  "
+              f"retries {result['retries']}  lost {result['lost_results']}")
+    if args.min_efficiency is not None and efficiency < args.min_efficiency:
+        print(f"FAIL: efficiency {efficiency:.1%} below {args.min_efficiency:.0%}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
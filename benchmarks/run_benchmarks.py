@@ -0,0 +1,299 @@
+"""
+Offline micro-benchmarks for the feed, processor, model and dashboard hot paths.
+
+    python -m benchmarks.run_benchmarks                        # run, write benchmarks/results/<commit>.json
+    python -m benchmarks.run_benchmarks --compare base.json    # also diff against an earlier run
+    python -m benchmarks.run_benchmarks --frames rec.jsonl     # replay recorded frames instead of synthetic
+
+Every benchmark reports seconds per call (median of --repeat runs) and calls/sec.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import timeit
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+from loguru import logger
+
+from benchmarks.frames import synthetic_books5_frames, load_frames, books
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def bench(fn: Callable[[], object], repeat: int = 5, min_time: float = 0.2) -> Dict[str, float]:
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    number = max(1, int(number * min_time / 0.2))
+    runs = [t / number for t in timer.repeat(repeat=repeat, number=number)]
+    median = statistics.median(runs)
+    return {
+        "sec_per_call": median,
+        "min_sec_per_call": min(runs),
+        "stdev_sec": statistics.stdev(runs) if len(runs) > 1 else 0.0,
+        "calls_per_sec": 1.0 / median if median > 0 else float("inf"),
+        "number": number,
+        "repeat": repeat,
+    }
+
+
+def _cycle(items: List):
+    # round-robin over pre-built inputs so every call sees a different frame
+    state = {"i": 0}
+    n = len(items)
+
+    def nxt():
+        i = state["i"]
+        state["i"] = i + 1 if i + 1 < n else 0
+        return items[i]
+    return nxt
+
+
+def _count(n: int) -> str:
+    return f"{n // 1000}k" if n >= 1000 and n % 1000 == 0 else str(n)
+
+
+def dashboard_rerun(frames: List[str]) -> Callable[[], object]:
+    """
+    The data work behind one main.py rerun after a new book version (history append
+    and reads, bar and latency frames, line charts, formatted book sides), without
+    the Streamlit element calls. Each call is a new version, so nothing is memoized.
+    """
+    import altair as alt
+    import pandas as pd
+    from utils.history_store import HistoryStore
+    from websockets.ws_client import OrderBookClient
+
+    client = OrderBookClient("ws://offline")
+    for frame in frames[:3000]:
+        client._on_message(None, frame)
+    history = HistoryStore()
+    data = client.get_latest_orderbook()
+    state = {"version": 0, "ts": 1_700_000_000.0}
+    for _ in range(3000):
+        state["version"] += 1
+        state["ts"] += 0.1
+        history.append(state["version"], state["ts"], data, 12.0)
+
+    def line_chart(df, label):
+        chart_df = df.reset_index()
+        return alt.Chart(chart_df).mark_line(point=True).encode(
+            x=alt.X("Time:T"), y=alt.Y(f"{label}:Q"), tooltip=["Time:T", f"{label}:Q"],
+        ).interactive()
+
+    def bar_frame(column, label, limit=None):
+        bars = client.get_bars("1s")
+        if limit:
+            bars = bars[-limit:]
+        return pd.DataFrame({
+            "Time": pd.to_datetime(bars["start"], unit="s", utc=True), label: bars[f"{column}_close"],
+        }).set_index("Time")
+
+    def book_side(metrics, side):
+        levels = metrics.levels(side)[:10]
+        df = pd.DataFrame({
+            "Price": levels[:, 0], "Qty": levels[:, 1], "CumQty": metrics.cum_depth(side)[:10],
+            "% of side": metrics.pct_of_side(side)[:10].round(2),
+        })
+        df["Price"] = df["Price"].map(lambda x: f"{x:,.2f}")
+        df["Qty"] = df["Qty"].map(lambda x: f"{x:,.6f}")
+        df["CumQty"] = df["CumQty"].map(lambda x: f"{x:,.6f}")
+        df["% of side"] = df["% of side"].map(lambda x: f"{x:.2f}%")
+        return df
+
+    def rerun():
+        state["version"] += 1
+        state["ts"] += 0.1
+        history.append(state["version"], state["ts"], data, 12.0)
+        history.tail(2)
+        history.tail(1)
+        rows = history.tail(120)
+        latency = pd.DataFrame({
+            "Time": pd.to_datetime(rows["ts"], unit="s", utc=True), "Latency (ms)": rows["latency_ms"],
+        }).set_index("Time")
+        charts = [line_chart(bar_frame(c, label, limit), label)
+                  for c, label in (("mid", "Mid Price"), ("spread", "Spread")) for limit in (None, 60)]
+        metrics = client.get_book_metrics()
+        return latency, charts, book_side(metrics, "bids"), book_side(metrics, "asks"), history.memory()
+    return rerun
+
+
+def collect(frames: List[str]) -> Dict[str, Callable[[], object]]:
+    from websockets.ws_client import OrderBookClient
+    from websockets.orderbook_processor import OrderBookProcessor
+    from utils.data_utils import process_orderbook_snapshot, process_orderbook_batch, snapshots_to_arrays
+    from utils.latency_tracker import LatencyTracker
+    from models.market_impact import AlmgrenChrissModel, AlmgrenChrissParams
+    from models.execution_scheduler import AdaptiveScheduler
+    from models.slippage_model import SlippageModel
+    from utils.synthetic_market import SyntheticMarket
+    from utils.book_diff import diff_levels
+    from models.cost_estimator import CostEstimator
+    from models.scenario_engine import ScenarioEngine, horizon_grid, size_grid
+    from models.maker_taker_model import MakerTakerModel
+    import pandas as pd
+
+    raw_books = list(books(frames))
+    next_frame = _cycle(frames)
+    next_book = _cycle(raw_books)
+
+    client = OrderBookClient("ws://offline")
+    processor = OrderBookProcessor()
+    for b in raw_books[:200]:
+        processor.update(b)
+
+    tracker = LatencyTracker()
+    for v in np.random.default_rng(1).exponential(20.0, 500):
+        tracker.add_latency(v)
+
+    ac = AlmgrenChrissModel(AlmgrenChrissParams(sigma=0.3, eta=0.01, gamma=0.001, T=600, X=10, N=50))
+
+    rng = np.random.default_rng(2)
+    X = pd.DataFrame({
+        "order_size_usd": rng.uniform(10, 1e5, 2000),
+        "market_volatility": rng.uniform(0.001, 0.05, 2000),
+        "spread_percent": rng.uniform(0.0001, 0.01, 2000),
+    })
+    slippage = SlippageModel()
+    slippage.fit(X, X["order_size_usd"] * 1e-4 + rng.normal(0, 0.1, 2000))
+    Xm = pd.DataFrame({
+        "spread": rng.uniform(0.1, 2, 2000),
+        "volatility": rng.uniform(0.001, 0.05, 2000),
+        "order_type": rng.integers(0, 2, 2000),
+        "relative_price_distance": rng.uniform(0, 0.01, 2000),
+    })
+    maker_taker = MakerTakerModel()
+    maker_taker.fit(Xm, (Xm["relative_price_distance"] < 0.005).astype(int))
+    x_one, xm_one = X.iloc[:1], Xm.iloc[:1]
+
+    batch_bids, batch_asks = snapshots_to_arrays(raw_books, 5)
+    side_pairs = _cycle(list(zip(batch_bids[:-1], batch_bids[1:])))
+
+    # 500 parents sharing every slice boundary: the worst case for one tick
+    scheduler = AdaptiveScheduler()
+    for i in range(500):
+        scheduler.submit(f"SYM{i % 50}-USDT", "Buy" if i % 2 else "Sell",
+                         AlmgrenChrissParams(sigma=0.001, eta=0.01, gamma=0.001, T=1e9, X=10, N=10**9), 0.0)
+    clock = {"ts": 0.0}
+
+    estimator = CostEstimator(impact_params={"BTC-USDT": (0.01, 0.001)})
+    scenarios = ScenarioEngine(estimator)
+    grid_sizes, grid_horizons = size_grid(100, 1e6, 100), horizon_grid(10, 3600, 50)
+    grid_version = {"v": 0}
+
+    def scenario_grid():
+        # a new book version each call, so nothing is served from the memo
+        grid_version["v"] += 1
+        estimator.update_book("BTC-USDT", batch_bids[0], batch_asks[0], 0.015, grid_version["v"])
+        scenarios.evaluate("BTC-USDT", "Buy", grid_sizes, grid_horizons)
+
+    def scheduler_boundary():
+        scheduler.on_tick(clock["ts"])
+        clock["ts"] += 1.0
+        scheduler.events.queue.clear()
+
+    return {
+        "feed.on_message": lambda: client._on_message(None, next_frame()),
+        "processor.update": lambda: processor.update(next_book()),
+        "data_utils.process_orderbook_snapshot": lambda: process_orderbook_snapshot(next_book()),
+        f"data_utils.process_orderbook_batch[{_count(len(raw_books))}]":
+            lambda: process_orderbook_batch(batch_bids, batch_asks),
+        "book_diff.diff_levels": lambda: diff_levels(*side_pairs()),
+        "latency_tracker.p95": tracker.p95_latency,
+        "latency_tracker.median": tracker.median_latency,
+        "almgren_chriss.optimal_trade_schedule": ac.optimal_trade_schedule,
+        "almgren_chriss.expected_cost": ac.expected_cost,
+        "execution_scheduler.on_tick[500 due]": scheduler_boundary,
+        "execution_scheduler.on_tick[idle]": lambda: scheduler.on_tick(0.5),
+        "scenario_engine.evaluate[100x50x3]": scenario_grid,
+        "synthetic_market.generate[100k]": lambda: SyntheticMarket(seed=1).generate(100_000),
+        "slippage_model.predict[1 row]": lambda: slippage.predict(x_one),
+        "maker_taker_model.predict_proba[1 row]": lambda: maker_taker.predict_proba(xm_one),
+        "dashboard.rerun[new version]": dashboard_rerun(frames),
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return None
+
+
+def compare(current: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """Names of benchmarks slower than baseline by more than `threshold` (fraction)."""
+    regressions = []
+    print(f"\n{'benchmark':45s} {'baseline':>12s} {'current':>12s} {'change':>8s}")
+    for name, res in current["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if base is None:
+            print(f"{name:45s} {'-':>12s} {res['sec_per_call'] * 1e6:10.2f}us {'new':>8s}")
+            continue
+        change = res["sec_per_call"] / base["sec_per_call"] - 1.0
+        flag = " !" if change > threshold else ""
+        if flag:
+            regressions.append(name)
+        print(f"{name:45s} {base['sec_per_call'] * 1e6:10.2f}us {res['sec_per_call'] * 1e6:10.2f}us {change:+7.1%}{flag}")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", help="recorded frames file (one websocket message per line)")
+    parser.add_argument("--n-frames", type=int, default=10_000, help="synthetic frames to generate")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.2, help="target seconds per repeat")
+    parser.add_argument("--filter", default="", help="only run benchmarks whose name contains this")
+    parser.add_argument("--output", help="result JSON path (default benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", help="baseline result JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="regression threshold (fraction)")
+    args = parser.parse_args(argv)
+
+    # per-tick log lines would dominate every feed measurement
+    logger.remove()
+
+    frames = load_frames(args.frames) if args.frames else synthetic_books5_frames(args.n_frames)
+    results = {}
+    for name, fn in collect(frames).items():
+        if args.filter and args.filter not in name:
+            continue
+        results[name] = bench(fn, args.repeat, args.min_time)
+        r = results[name]
+        print(f"{name:45s} {r['sec_per_call'] * 1e6:10.2f}us/call {r['calls_per_sec']:14,.0f}/s")
+
+    commit = git_commit()
+    report = {
+        "meta": {
+            "commit": commit,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": sys.version.split()[0],
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "frames": args.frames or f"synthetic:{args.n_frames}",
+        },
+        "results": results,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"{commit or 'local'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nWrote {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) above {args.threshold:.0%}: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+"""
+Scale / stress run of the book pipeline on synthetic order flow (utils.synthetic_market).
+
+    python -m benchmarks.stress                                   # 2M updates, default market
+    python -m benchmarks.stress --events 20000000 --chunk 1000000 --rate 50000 --branching 0.7
+    python -m benchmarks.stress --store data/synthetic            # also write a TickStore
+
+Streams --events generated updates in --chunk batches through the vectorized paths
+(process_orderbook_batch, walk_book_batch for every trade, impact calibration) and
+replays a --sample of them through the per-update paths (OrderBookProcessor,
+process_orderbook_snapshot, BookAnalytics, feed parsing). Reports updates/s per stage
+and the peak RSS, which should not grow with --events. The same --seed gives the same data
+whatever the --chunk.
+"""
+import argparse
+import resource
+import sys
+import time
+from collections import defaultdict
+from typing import Dict
+
+import numpy as np
+from loguru import logger
+
+from utils.synthetic_market import MarketBatch, MarketConfig, SyntheticMarket
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def _head(batch: MarketBatch, n: int) -> MarketBatch:
+    """Copy of the first n updates (and their trades), so the full batch can be freed."""
+    keep = batch.trade_rows < n
+    return MarketBatch(batch.ts[:n].copy(), batch.bids[:n].copy(), batch.asks[:n].copy(), batch.seq[:n].copy(),
+                       batch.trades[keep], batch.trade_rows[keep], batch.trade_ids[keep])
+
+
+def run(args) -> Dict[str, float]:
+    from models.impact_calibration import ImpactCalibrator
+    from utils.book_analytics import BookAnalytics
+    from utils.data_utils import process_orderbook_batch, process_orderbook_snapshot
+    from utils.fill_model import walk_book_batch
+    from utils.tick_store import TickStore
+    from websockets.orderbook_processor import OrderBookProcessor
+    from websockets.ws_client import OrderBookClient
+
+    config = MarketConfig(rate=args.rate, branching=args.branching, levels=args.levels)
+    market = SyntheticMarket(config, seed=args.seed)
+    store = TickStore(args.store, config.levels, "SYN-USDT") if args.store else None
+    calibrator = ImpactCalibrator()
+    seconds: Dict[str, float] = defaultdict(float)
+    counts: Dict[str, int] = defaultdict(int)
+
+    def timed(stage: str, n: int, fn):
+        start = time.perf_counter()
+        out = fn()
+        seconds[stage] += time.perf_counter() - start
+        counts[stage] += n
+        return out
+
+    sample = None
+    it = iter(market.chunks(args.events, args.chunk))
+    while True:
+        batch = timed("generate", 0, lambda: next(it, None))
+        if batch is None:
+            break
+        counts["generate"] += len(batch)
+        timed("process_orderbook_batch", len(batch), lambda: process_orderbook_batch(batch.bids, batch.asks))
+        # fill every trade against the book it hit (the row before it)
+        rows = np.maximum(batch.trade_rows - 1, 0)
+        sides = np.where(batch.trades["side"][:, None, None] > 0, batch.asks[rows], batch.bids[rows])
+        timed("walk_book_batch", len(rows), lambda: walk_book_batch(sides, batch.trades["sz"]))
+        timed("impact.calibrate_history", len(batch),
+              lambda: calibrator.calibrate_history("SYN-USDT", batch.ts, batch.bids, batch.asks, batch.trades))
+        if store is not None:
+            timed("tick_store.append", len(batch), lambda: store.append(batch.ts, batch.bids, batch.asks))
+        if sample is None:
+            sample = _head(batch, args.sample)
+        logger.info(f"{counts['generate']:,} / {args.events:,} updates, peak RSS {_peak_rss_mb():.0f} MB")
+
+    # per-update paths on a sample: these take one dict / frame at a time
+    n = len(sample)
+    snapshots = sample.snapshots()
+    frames = sample.feed_frames("SYN-USDT")
+    processor = OrderBookProcessor(top_n=config.levels)
+    analytics = BookAnalytics()
+    client = OrderBookClient("ws://offline", "SYN-USDT", top_n=config.levels, subscribe_trades=True)
+    logger.disable("websockets.ws_client")
+    timed("OrderBookProcessor.update", n, lambda: [processor.update(s) for s in snapshots])
+    timed("process_orderbook_snapshot", n, lambda: [process_orderbook_snapshot(s, config.levels) for s in snapshots])
+    timed("BookAnalytics.update", n,
+          lambda: [analytics.update(b, a, t) for b, a, t in zip(sample.bids, sample.asks, sample.ts.tolist())])
+    timed("feed.on_message", len(frames), lambda: [client._on_message(None, f) for f in frames])
+    logger.enable("websockets.ws_client")
+
+    result = {stage: counts[stage] / seconds[stage] for stage in seconds if seconds[stage] > 0}
+    result["peak_rss_mb"] = _peak_rss_mb()
+    result["trades"] = market.trade_count
+    return result
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=2_000_000, help="book updates to generate")
+    parser.add_argument("--chunk", type=int, default=500_000, help="updates per generated batch")
+    parser.add_argument("--sample", type=int, default=20_000, help="updates replayed through the per-update paths")
+    parser.add_argument("--rate", type=float, default=MarketConfig.rate, help="background events per second")
+    parser.add_argument("--branching", type=float, default=MarketConfig.branching, help="Hawkes branching ratio")
+    parser.add_argument("--levels", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--store", help="also append every update to a TickStore at this path")
+    args = parser.parse_args(argv)
+
+    result = run(args)
+    print(f"{args.events:,} updates, {result.pop('trades'):,} trades, seed {args.seed}")
+    peak = result.pop("peak_rss_mb")
+    for stage, rate in result.items():
+        print(f"{stage:<32}{rate:>16,.0f} /s")
+    print(f"{'peak RSS':<32}{peak:>16,.0f} MB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
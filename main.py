@@ -2,22 +2,61 @@ import streamlit as st
 import os
 import time
 import pandas as pd
+import numpy as np
 from dotenv import load_dotenv
-from collections import deque
 from datetime import datetime, timezone, timedelta
 from websockets.ws_client import OrderBookClient
+from models.cost_estimator import CostEstimator
+from models.impact_calibration import ImpactCalibrator
+from models.maker_taker_model import MakerTakerModel
+from models.slippage_model import SlippageModel
+from models.scenario_engine import ScenarioEngine, horizon_grid, size_grid
+from utils.bars import RESOLUTIONS
+from utils.history_store import HistoryStore
+from websockets.venues import ADAPTERS
 import io
-import altair as alt
 
 load_dotenv()
 URL = os.getenv("API_URL")
+# Dashboard history is shared by all browser sessions and capped at HISTORY_BUDGET_MB;
+# older rows are compacted into bars and, with HISTORY_DIR set, spilled to disk.
+HISTORY_BUDGET_MB = float(os.getenv("HISTORY_BUDGET_MB", "8"))
+HISTORY_RETENTION_S = float(os.getenv("HISTORY_RETENTION_S", "3600"))
+HISTORY_DIR = os.getenv("HISTORY_DIR")
+# Cost models: joblib files saved by SlippageModel.save() / MakerTakerModel.save(), and the
+# (eta, gamma) file that `tradesim run --impact-params` keeps calibrated.
+SLIPPAGE_MODEL_PATH = os.getenv("SLIPPAGE_MODEL_PATH")
+MAKER_TAKER_MODEL_PATH = os.getenv("MAKER_TAKER_MODEL_PATH")
+IMPACT_PARAMS_PATH = os.getenv("IMPACT_PARAMS_PATH", "config/impact_params.json")
 
 @st.cache_resource
-def get_client(url):
-    client = OrderBookClient(url)
+def get_client(url, venue="OKX"):
+    client = OrderBookClient(url, venue=venue)
     client.start()
     return client
 
+@st.cache_resource
+def get_cost_estimator():
+    # shared by every session: per-session inputs (fee tier, side, size) are passed per call
+    slippage_model = maker_taker_model = None
+    if SLIPPAGE_MODEL_PATH:
+        slippage_model = SlippageModel()
+        slippage_model.load(SLIPPAGE_MODEL_PATH)
+    if MAKER_TAKER_MODEL_PATH:
+        maker_taker_model = MakerTakerModel()
+        maker_taker_model.load(MAKER_TAKER_MODEL_PATH)
+    return CostEstimator(slippage_model=slippage_model, maker_taker_model=maker_taker_model)
+
+@st.cache_resource
+def get_impact_calibrator():
+    # starts from the saved parameters, if any, and keeps refining eta from the books seen here
+    return ImpactCalibrator(path=IMPACT_PARAMS_PATH).bind(get_cost_estimator())
+
+@st.cache_resource
+def get_history_store(venue, inst):
+    spill_dir = os.path.join(HISTORY_DIR, f"{venue}_{inst}") if HISTORY_DIR else None
+    return HistoryStore(int(HISTORY_BUDGET_MB * (1 << 20)), HISTORY_RETENTION_S, spill_dir)
+
 st.set_page_config(page_title="OKX Orderbook Dashboard", layout="wide", initial_sidebar_state="expanded")
 
 # Make Stop Live button visually red using CSS targeting aria-label.
@@ -46,10 +85,11 @@ with st.sidebar.expander("Quick brief — Input Parameters (click to open)", exp
     st.markdown(
         """
         **What the inputs do**
-        - **Exchange / Symbol** — choose the market to subscribe to (OKX / BTC-USDT).
+        - **Exchange / Symbol** — choose the market to subscribe to (OKX, Binance or Bybit / BTC-USDT).
         - **Side / Order Type / Quantity** — used for the execution simulation only.
         - **Volatility / Fee Tier** — affect simulated slippage & costs.
         - **Refresh Interval** — how frequently the dashboard updates (seconds).
+        - **Chart Resolution** — bar size (1s / 1m / 5m / 1h) for the price & spread charts.
         
         **Recent UI changes**
         - Session Duration metric replaces duplicate Last update.
@@ -62,9 +102,9 @@ with st.sidebar:
     st.header("Input Parameters")
     exchange = st.selectbox(
         "Exchange",
-        options=["OKX"],
+        options=list(ADAPTERS),
         index=0,
-        help="Select the exchange source for orderbook data (currently only OKX supported)."
+        help="Select the exchange source for orderbook data (OKX, Binance or Bybit)."
     )
     symbol = st.selectbox(
         "Spot Asset",
@@ -107,12 +147,37 @@ with st.sidebar:
     st.markdown("---")
     refresh_rate = st.slider(
         "Refresh Interval (sec)",
-        0.5,
+        0.1,
         5.0,
-        1.0,
         0.5,
-        help="How often the dashboard polls & updates (seconds). Lower = more frequent updates but higher CPU/network usage."
+        0.1,
+        help="Minimum time between redraws (seconds). The dashboard redraws as soon as a new tick arrives, "
+             "at most once per interval, and stays idle while the market is quiet."
     )
+    chart_resolution = st.selectbox(
+        "Chart Resolution",
+        options=list(RESOLUTIONS),
+        index=0,
+        help="Bar size for the mid price / spread charts. Bars are kept for every resolution, so longer horizons stay cheap to draw."
+    )
+    with st.expander("Cost Scenarios", expanded=False):
+        scenario_sizes = st.slider(
+            "Order sizes (USD)", 10.0, 1_000_000.0, (100.0, 500_000.0),
+            help="Size range of the what-if grid; sizes are log-spaced."
+        )
+        scenario_horizons = st.slider(
+            "Horizons (sec)", 1.0, 3600.0, (10.0, 1800.0),
+            help="Execution horizon range used for the market impact term; log-spaced."
+        )
+        scenario_shape = st.slider(
+            "Grid points (sizes x horizons)", 5, 200, (100, 50),
+            help="Number of sizes and horizons. Every fee tier is evaluated in the same pass."
+        )
+        scenario_metric = st.selectbox(
+            "Heatmap metric",
+            options=["total_cost_bps", "total_cost", "slippage_bps", "impact_cost", "fee_cost"],
+            help="Cost surface shown in the Cost Scenarios tab, for the selected fee tier."
+        )
 
     if "running" not in st.session_state:
         st.session_state.running = False
@@ -156,9 +221,12 @@ with st.sidebar:
 # -------------------------
 # Attach client & init state
 # -------------------------
-client = get_client(URL)
+# API_URL overrides the OKX endpoint; other venues use their adapter's public URL
+client = get_client(URL if exchange == "OKX" else None, exchange)
 if getattr(client, "subscribe_inst", None) != symbol:
     client.subscribe_inst = symbol
+history = get_history_store(exchange, symbol)
+impact_calibrator = get_impact_calibrator()
 
 def safe_rerun():
     if hasattr(st, "rerun"):
@@ -175,22 +243,16 @@ def safe_rerun():
 max_history = 120
 
 def init_state():
-    if "times" not in st.session_state:
-        st.session_state.times = deque(maxlen=max_history)
-    if "mid_prices" not in st.session_state:
-        st.session_state.mid_prices = deque(maxlen=max_history)
-    if "spreads" not in st.session_state:
-        st.session_state.spreads = deque(maxlen=max_history)
-    if "latencies" not in st.session_state:
-        st.session_state.latencies = deque(maxlen=max_history)
-    if "health_statuses" not in st.session_state:
-        st.session_state.health_statuses = deque(maxlen=max_history)
-    if "export_data" not in st.session_state:
-        st.session_state.export_data = []
+    if "history_since" not in st.session_state:
+        st.session_state.history_since = None  # set by Clear History; hides older shared rows
     if "last_data" not in st.session_state:
         st.session_state.last_data = None
     if "start_time" not in st.session_state:
         st.session_state.start_time = None
+    if "rendered_version" not in st.session_state:
+        st.session_state.rendered_version = None
+    if "memo" not in st.session_state:
+        st.session_state.memo = {}
 
 init_state()
 
@@ -221,9 +283,26 @@ def check_health(latency_ms):
     else:
         return "Unhealthy", "❌"
 
+def health_label(latency_ms):
+    health, icon = check_health(latency_ms)
+    return f"{icon} {health}"
+
+def recent_history(n=max_history):
+    """Newest rows of the shared history, oldest first, since this session last cleared it."""
+    return history.tail(n, since=st.session_state.history_since)
+
+def last_health():
+    rows = recent_history(1)
+    return health_label(rows["latency_ms"][-1]) if len(rows) else "N/A"
+
+def previous_mid():
+    rows = recent_history(2)
+    return rows["mid_price"][0] if len(rows) > 1 else None
+
 def make_line_chart(df, y_label):
     if df.empty:
         return None
+    import altair as alt  # only needed once a chart has data
     chart_df = df.reset_index().rename(columns={df.index.name or 'index': 'Time'})
     if 'Time' in chart_df.columns:
         chart_df['Time'] = pd.to_datetime(chart_df['Time'])
@@ -239,34 +318,180 @@ def make_line_chart(df, y_label):
     )
     return chart
 
+def memoized(name, key, build):
+    """build() result cached in the session until `key` changes (e.g. the book version)."""
+    cached = st.session_state.memo.get(name)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    value = build()
+    st.session_state.memo[name] = (key, value)
+    return value
+
+def bar_frame(column, label, resolution=None, limit=None):
+    """Bar closes of `column` ("mid", "spread" or "depth") as a Time-indexed frame."""
+    resolution = resolution or chart_resolution
+
+    def build():
+        bars = client.get_bars(resolution)
+        if limit:
+            bars = bars[-limit:]
+        return pd.DataFrame({
+            "Time": pd.to_datetime(bars["start"], unit="s", utc=True),
+            label: bars[f"{column}_close"],
+        }).set_index("Time")
+    return memoized(f"bars:{column}:{label}:{limit}", (resolution, client.version), build)
+
+def latency_frame():
+    def build():
+        rows = recent_history()
+        return pd.DataFrame({
+            "Time": pd.to_datetime(rows["ts"], unit="s", utc=True),
+            "Latency (ms)": rows["latency_ms"],
+        }).set_index("Time")
+    return memoized("latency", (history.appended, st.session_state.history_since), build)
+
+EXPORT_COLUMNS = {
+    "best_bid": "Best Bid", "best_ask": "Best Ask", "spread": "Spread", "mid_price": "Mid Price",
+    "total_bid_volume": "Bid Volume", "total_ask_volume": "Ask Volume", "latency_ms": "Latency (ms)",
+}
+
+def export_frame(n=None, rows=None):
+    """Raw history rows (default: those still in memory) in the CSV export layout."""
+    rows = recent_history(n) if rows is None else rows
+    df = pd.DataFrame({label: rows[name] for name, label in EXPORT_COLUMNS.items()})
+    df.insert(0, "Time", [datetime.fromtimestamp(t, timezone.utc).isoformat() for t in rows["ts"].tolist()])
+    latency = rows["latency_ms"]
+    df["Health"] = np.select([latency < 100, latency < 300], ["Healthy", "Warning"], "Unhealthy")
+    return df
+
+def to_csv(df, index=False):
+    csv_buffer = io.StringIO()
+    df.to_csv(csv_buffer, index=index)
+    return csv_buffer.getvalue()
+
+def export_csv():
+    return memoized("export_csv", (history.appended, st.session_state.history_since), lambda: to_csv(export_frame()))
+
+def full_history_csv():
+    """Every raw row since this session cleared the history, read back from spilled segments too."""
+    return memoized(
+        "full_history_csv", (history.appended, history.compacted, st.session_state.history_since),
+        lambda: to_csv(export_frame(rows=history.rows(since=st.session_state.history_since))),
+    )
+
+def compacted_csv():
+    """History compacted out of the raw rows, as 1m bars."""
+    return memoized("compacted_csv", history.compacted, lambda: to_csv(history.bars.to_frame("1m"), index=True))
+
+def render_history_memory():
+    mem = history.memory()
+    caption = (f"History: {mem['raw_rows']:,}/{mem['raw_capacity']:,} raw rows "
+               f"({(mem['raw_bytes'] + mem['bar_bytes']) / (1 << 20):.1f} MB in memory, shared by all sessions)")
+    if mem["compacted_rows"]:
+        caption += f" · {mem['compacted_rows']:,} older rows compacted into 1m/1h bars"
+    if mem["spilled_segments"]:
+        caption += f" · {mem['spilled_bytes'] / (1 << 20):.1f} MB spilled to disk"
+    st.caption(caption)
+
 # formatting helpers for orderbook tables
-def _format_orderbook_side(rows, side_name="bids", depth=10):
-    if not rows:
+def _format_orderbook_side(metrics, side_name="bids", depth=10):
+    if metrics is None:
         return None
-    try:
-        df = pd.DataFrame(rows[:depth], columns=["Price", "Qty"])
-    except Exception:
-        df = pd.DataFrame(rows[:depth])
-        if df.shape[1] >= 2:
-            df = df.iloc[:, :2]
-            df.columns = ["Price", "Qty"]
-        else:
-            return None
-    df["Price"] = df["Price"].astype(float)
-    df["Qty"] = df["Qty"].astype(float)
-    if side_name == "bids":
-        df = df.sort_values("Price", ascending=False).reset_index(drop=True)
-    else:
-        df = df.sort_values("Price", ascending=True).reset_index(drop=True)
-    df["CumQty"] = df["Qty"].cumsum()
-    total = df["Qty"].sum()
-    df["% of side"] = (df["Qty"] / total * 100).round(2) if total > 0 else 0.0
+    levels = metrics.levels(side_name)[:depth]
+    if not len(levels):
+        return None
+    # cumulative qty and % of side come from the per-book-version cache
+    df = pd.DataFrame({
+        "Price": levels[:, 0],
+        "Qty": levels[:, 1],
+        "CumQty": metrics.cum_depth(side_name)[:depth],
+        "% of side": metrics.pct_of_side(side_name)[:depth].round(2),
+    })
     df["Price"] = df["Price"].map(lambda x: f"{x:,.2f}")
     df["Qty"] = df["Qty"].map(lambda x: f"{x:,.6f}")
     df["CumQty"] = df["CumQty"].map(lambda x: f"{x:,.6f}")
     df["% of side"] = df["% of side"].map(lambda x: f"{x:.2f}%")
     return df
 
+def estimate_order_cost():
+    book = client.get_latest_book()
+    if book is None:
+        return None
+    estimator = get_cost_estimator()
+    estimator.update_book(symbol, book.bids, book.asks, version=client.version)
+    return estimator.estimate(symbol, order_side, quantity, order_type, tier=fee_tier, volatility=volatility / 100)
+
+def scenario_grid():
+    """
+    Cost grid over the sidebar's sizes x horizons for every fee tier (memoized per book version).
+    Without impact parameters for the symbol nothing depends on the horizon, so one is evaluated.
+    """
+    book = client.get_latest_book()
+    if book is None:
+        return None
+    estimator = get_cost_estimator()
+    estimator.update_book(symbol, book.bids, book.asks, version=client.version)
+    if estimator.impact_params.get(symbol) is not None:
+        horizons = horizon_grid(*scenario_horizons, scenario_shape[1])
+    else:
+        horizons = horizon_grid(scenario_horizons[1], scenario_horizons[1], 1)
+    return ScenarioEngine(estimator).evaluate(
+        symbol, order_side, size_grid(*scenario_sizes, scenario_shape[0]), horizons, order_type=order_type,
+        volatility=volatility / 100,
+    )
+
+def make_heatmap(grid, metric, tier):
+    import altair as alt
+    df = grid.heatmap(metric, tier).stack().rename(metric).reset_index()
+    # a single horizon is a size-only strip: no horizon axis
+    x = alt.X('horizon_s:O', title='Horizon (s)', axis=alt.Axis(format='.0f', labelOverlap=True)) \
+        if len(grid.horizons) > 1 else alt.X('horizon_s:O', title=None, axis=None)
+    return (
+        alt.Chart(df)
+        .mark_rect()
+        .encode(
+            x=x,
+            y=alt.Y('size_usd:O', title='Size (USD)', sort='descending', axis=alt.Axis(format=',.0f', labelOverlap=True)),
+            color=alt.Color(f'{metric}:Q', title=metric, scale=alt.Scale(scheme='viridis')),
+            tooltip=[
+                alt.Tooltip('size_usd:Q', title='Size (USD)', format=',.2f'),
+                alt.Tooltip('horizon_s:Q', title='Horizon (s)', format='.1f'),
+                alt.Tooltip(f'{metric}:Q', title=metric, format='.4f'),
+            ],
+        )
+    )
+
+def render_scenarios():
+    grid = scenario_grid()
+    if grid is None:
+        st.info("Cost scenarios will appear once a book snapshot is available.")
+        return
+    if len(grid.horizons) == 1:
+        # no (eta, gamma) for this symbol yet: impact is zero at every horizon
+        if scenario_metric == "impact_cost":
+            st.info(
+                f"No market impact parameters for {symbol} yet. They are calibrated from the live book "
+                f"(or loaded from IMPACT_PARAMS_PATH); pick another metric meanwhile."
+            )
+            return
+        st.caption(
+            f"{order_type} {order_side} · {len(grid.sizes)} sizes x {len(grid.tiers)} fee tiers against book "
+            f"version {grid.book_version} · showing {fee_tier} · no impact parameters yet, so costs do not "
+            f"depend on the horizon"
+        )
+    else:
+        st.caption(
+            f"{order_type} {order_side} · {len(grid.sizes)} sizes x {len(grid.horizons)} horizons x "
+            f"{len(grid.tiers)} fee tiers against book version {grid.book_version} · showing {fee_tier}"
+        )
+    key = (symbol, grid.book_version, order_side, order_type, volatility, scenario_sizes, scenario_horizons,
+           scenario_shape, scenario_metric, fee_tier, len(grid.horizons))
+    chart = memoized("scenario_chart", key, lambda: make_heatmap(grid, scenario_metric, fee_tier))
+    st.altair_chart(chart, width='stretch')
+    if grid.depth_exhausted.any():
+        first = grid.sizes[grid.depth_exhausted.argmax()]
+        st.caption(f"Sizes from ${first:,.0f} exceed the visible book; the remainder is priced at the worst visible level.")
+
 # -------------------------
 # Layout placeholders
 # -------------------------
@@ -275,6 +500,7 @@ top_placeholder = st.container()
 chart_placeholder = st.container()
 table_placeholder = st.container()
 sim_placeholder = st.container()
+status_placeholder = st.empty()
 
 # -------------------------
 # New layout functions (only change UI rendering)
@@ -298,8 +524,8 @@ def render_session_info_row():
         duration_str = "0:00:00"
     c3.metric("Session Duration", duration_str)
     c4.metric("Refresh (s)", f"{refresh_rate:.1f}")
-    last_health = st.session_state.health_statuses[-1] if st.session_state.health_statuses else "N/A"
-    c5.metric("Health", last_health)
+    c5.metric("Health", last_health())
+    render_history_memory()
 
 def render_topbook_and_mini_trends(data):
     left, right = st.columns([2,1.2])
@@ -307,7 +533,7 @@ def render_topbook_and_mini_trends(data):
         st.subheader("Top-of-book")
         cols_metrics = st.columns([1,1,1,1])
         if data:
-            prev_mid = st.session_state.mid_prices[-2] if len(st.session_state.mid_prices) > 1 else None
+            prev_mid = previous_mid()
             mid_delta = (data["mid_price"] - prev_mid) if prev_mid is not None else 0.0
             cols_metrics[0].metric("Best Bid", f"{data['best_bid']:.2f}")
             cols_metrics[1].metric("Best Ask", f"{data['best_ask']:.2f}")
@@ -324,8 +550,10 @@ def render_topbook_and_mini_trends(data):
         bcol, acol = st.columns(2)
         with bcol:
             st.write("Top bids (best first)")
-            bids = data.get("bids", []) if isinstance(data, dict) else []
-            df_bids = _format_orderbook_side(bids, side_name="bids", depth=10)
+            df_bids = memoized(
+                "bids_side", (symbol, client.side_version("bids")),
+                lambda: _format_orderbook_side(client.get_book_metrics(symbol), side_name="bids", depth=10),
+            )
             if df_bids is None or df_bids.empty:
                 # show a helpful placeholder table with zeros so it isn't blank
                 placeholder = pd.DataFrame([{"Price": "-", "Qty": "-", "CumQty": "-", "% of side": "-"}])
@@ -336,8 +564,10 @@ def render_topbook_and_mini_trends(data):
 
         with acol:
             st.write("Top asks (best first)")
-            asks = data.get("asks", []) if isinstance(data, dict) else []
-            df_asks = _format_orderbook_side(asks, side_name="asks", depth=10)
+            df_asks = memoized(
+                "asks_side", (symbol, client.side_version("asks")),
+                lambda: _format_orderbook_side(client.get_book_metrics(symbol), side_name="asks", depth=10),
+            )
             if df_asks is None or df_asks.empty:
                 placeholder = pd.DataFrame([{"Price": "-", "Qty": "-", "CumQty": "-", "% of side": "-"}])
                 st.table(placeholder)
@@ -347,8 +577,8 @@ def render_topbook_and_mini_trends(data):
 
     with right:
         st.subheader("Mini Trends")
-        mini_mid = pd.DataFrame({"Time": list(st.session_state.times), "Mid Price": list(st.session_state.mid_prices)}).set_index("Time")
-        mini_spread = pd.DataFrame({"Time": list(st.session_state.times), "Spread": list(st.session_state.spreads)}).set_index("Time")
+        mini_mid = bar_frame("mid", "Mid Price", "1s", limit=60)
+        mini_spread = bar_frame("spread", "Spread", "1s", limit=60)
         st.caption("Mid Price")
         if not mini_mid.empty:
             chart_mid = make_line_chart(mini_mid.tail(60), "Mid Price")
@@ -378,7 +608,7 @@ def render_help_expanders():
     with st.expander("Refresh Interval"):
         st.write("Lower values update more often but increase CPU/network usage.")
     with st.expander("Simulation parameters"):
-        st.write("- Volatility affects slippage estimates\n- Fee Tier affects cost calculations (not deeply implemented here)")
+        st.write("- Volatility affects slippage estimates\n- Fee Tier sets the maker/taker rates used in the cost estimate")
 
 # -------------------------
 # Render when stopped
@@ -391,14 +621,14 @@ if not st.session_state.running:
 
     render_session_info_row()
 
-    if st.session_state.times:
+    if len(recent_history(1)):
         with chart_placeholder:
-            tab1, tab2 = st.tabs(["Charts", "Latency & Health"])
+            tab1, tab2, tab3 = st.tabs(["Charts", "Latency & Health", "Cost Scenarios"])
             with tab1:
-                st.subheader("Mid Price & Spread (historic)")
+                st.subheader(f"Mid Price & Spread (historic, {chart_resolution} bars)")
                 left_col, right_col = st.columns(2)
-                df_mid = pd.DataFrame({"Time": list(st.session_state.times), "Mid Price": list(st.session_state.mid_prices)}).set_index("Time")
-                df_spread = pd.DataFrame({"Time": list(st.session_state.times), "Spread": list(st.session_state.spreads)}).set_index("Time")
+                df_mid = bar_frame("mid", "Mid Price")
+                df_spread = bar_frame("spread", "Spread")
                 mid_chart = make_line_chart(df_mid, 'Mid Price')
                 spread_chart = make_line_chart(df_spread, 'Spread')
                 with left_col:
@@ -417,27 +647,40 @@ if not st.session_state.running:
                         st.line_chart(df_spread)
             with tab2:
                 st.subheader("Latency (historic)")
-                df_latency = pd.DataFrame({"Time": list(st.session_state.times), "Latency (ms)": list(st.session_state.latencies)}).set_index("Time")
+                df_latency = latency_frame()
                 st.line_chart(df_latency)
-                st.write("Latest Health:", st.session_state.health_statuses[-1] if st.session_state.health_statuses else "N/A")
+                st.write("Latest Health:", last_health())
+            with tab3:
+                render_scenarios()
 
     render_topbook_and_mini_trends(st.session_state.last_data if st.session_state.last_data else {})
 
     with table_placeholder:
         if st.session_state.last_data:
             st.subheader("Last Orderbook Snapshot")
-            st.json(st.session_state.last_data)
-        if st.session_state.export_data:
-            df_export = pd.DataFrame(st.session_state.export_data)
-            st.dataframe(df_export.tail(50))
-            csv_buffer = io.StringIO()
-            df_export.to_csv(csv_buffer, index=False)
+            st.json(dict(st.session_state.last_data))
+        if len(recent_history(1)):
+            st.dataframe(export_frame(50))
             st.download_button(
                 label="Download Orderbook Data as CSV",
-                data=csv_buffer.getvalue(),
+                data=export_csv(),
                 file_name=f"okx_orderbook_{symbol}_{datetime.now(timezone.utc).strftime('%Y%m%d_%H%M%S')}.csv",
                 mime="text/csv"
             )
+        if history.compacted:
+            st.download_button(
+                label="Download Compacted History (1m bars) as CSV",
+                data=compacted_csv(),
+                file_name=f"okx_bars_1m_{symbol}_{datetime.now(timezone.utc).strftime('%Y%m%d_%H%M%S')}.csv",
+                mime="text/csv"
+            )
+        if history.memory()["spilled_segments"]:
+            st.download_button(
+                label="Download Full Raw History (incl. spilled to disk) as CSV",
+                data=full_history_csv(),
+                file_name=f"okx_orderbook_full_{symbol}_{datetime.now(timezone.utc).strftime('%Y%m%d_%H%M%S')}.csv",
+                mime="text/csv"
+            )
 
     with sim_placeholder:
         if simulate_order:
@@ -446,18 +689,17 @@ if not st.session_state.running:
             else:
                 st.warning("No data available for simulation. Start live to gather data.")
                 data = None
-            if data:
-                if order_type == "Market":
-                    slippage = data["mid_price"] * volatility / 100
-                    executed_price = data["mid_price"] + slippage if order_side == "Buy" else data["mid_price"] - slippage
-                    est_cost = quantity
-                    st.code(
-                        f"Simulated Market {order_side} Order\n"
-                        f"Quantity: ${quantity:.2f}\n"
-                        f"Estimated Execution Price: {executed_price:.2f}\n"
-                        f"Estimated Cost (USD): ${est_cost:.2f}\n"
-                        f"Slippage used: {slippage:.4f}"
-                    )
+            est = estimate_order_cost() if data else None
+            if est:
+                st.code(
+                    f"Simulated {order_type} {order_side} Order\n"
+                    f"Quantity: ${quantity:.2f}\n"
+                    f"Estimated Execution Price: {est.expected_price:.2f}\n"
+                    f"Slippage: {est.slippage_bps:.2f} bps (${est.slippage_cost:.4f})\n"
+                    f"Market Impact: ${est.impact_cost:.4f}\n"
+                    f"Fees: ${est.fee_cost:.4f} (maker prob {est.maker_prob:.0%})\n"
+                    f"Estimated Total Cost: ${est.total_cost:.4f} ({est.total_cost_bps:.2f} bps)"
+                )
             else:
                 st.info("Simulation will activate once data is available.")
 
@@ -468,35 +710,27 @@ if not st.session_state.running:
 # Main live loop
 # -------------------------
 try:
+    frame_start = time.monotonic()
+    version = client.version
     data = client.get_latest_orderbook()
-    latency = client.get_latency() * 1000  # ms
+    latency = client.get_latency() or 0.0  # already ms
     now = datetime.now(timezone.utc)
 
-    if data:
+    # history only grows when the feed moved; reruns from widget changes reuse it, and
+    # sessions watching the same feed record each version once
+    if data and version != st.session_state.rendered_version:
+        st.session_state.rendered_version = version
         st.session_state.last_data = data
-        st.session_state.times.append(now)
-        st.session_state.mid_prices.append(data.get("mid_price", 0.0))
-        st.session_state.spreads.append(data.get("spread", 0.0))
-        st.session_state.latencies.append(latency)
-        health, icon = check_health(latency)
-        st.session_state.health_statuses.append(f"{icon} {health}")
-        st.session_state.export_data.append({
-            "Time": now.isoformat(),
-            "Best Bid": data.get("best_bid"),
-            "Best Ask": data.get("best_ask"),
-            "Spread": data.get("spread"),
-            "Mid Price": data.get("mid_price"),
-            "Bid Volume": data.get("total_bid_volume"),
-            "Ask Volume": data.get("total_ask_volume"),
-            "Latency (ms)": latency,
-            "Health": health
-        })
+        history.append(version, now.timestamp(), data, latency)
+        book = client.get_latest_book()
+        if book is not None:
+            impact_calibrator.add_book(symbol, now.timestamp(), book.bids, book.asks)
 
     # Top metrics
     with top_placeholder:
         cols = st.columns([1,1,1,1])
         if data:
-            prev_mid = st.session_state.mid_prices[-2] if len(st.session_state.mid_prices) > 1 else None
+            prev_mid = previous_mid()
             mid_delta = (data.get("mid_price", 0.0) - prev_mid) if prev_mid is not None else 0.0
             cols[0].metric("Best Bid", f"{data.get('best_bid', 0.0):.2f}", delta=None)
             cols[1].metric("Best Ask", f"{data.get('best_ask', 0.0):.2f}", delta=None)
@@ -510,8 +744,8 @@ try:
             cols2[0].metric("Bid Volume", f"{data.get('total_bid_volume', 0.0):.6f}")
             cols2[1].metric("Ask Volume", f"{data.get('total_ask_volume', 0.0):.6f}")
             cols2[2].metric("Latency (ms)", f"{latency:.1f}")
-            cols2[3].metric("Health", st.session_state.health_statuses[-1])
-        st.progress(min(1.0, len(st.session_state.times)/max_history))
+            cols2[3].metric("Health", last_health())
+        st.progress(min(1.0, len(recent_history())/max_history))
 
     # Session info row (Session Duration replaces Last update)
     render_session_info_row()
@@ -522,12 +756,12 @@ try:
 
     # Original tabs preserved
     with chart_placeholder:
-        tab1, tab2, tab3 = st.tabs(["Price & Spread", "Latency & Health", "Orderbook Snapshot"])
+        tab1, tab2, tab3, tab4 = st.tabs(["Price & Spread", "Latency & Health", "Orderbook Snapshot", "Cost Scenarios"])
         with tab1:
-            st.subheader("Mid Price & Spread (live)")
+            st.subheader(f"Mid Price & Spread (live, {chart_resolution} bars)")
             left_col, right_col = st.columns(2)
-            df_mid = pd.DataFrame({"Time": list(st.session_state.times), "Mid Price": list(st.session_state.mid_prices)}).set_index("Time")
-            df_spread = pd.DataFrame({"Time": list(st.session_state.times), "Spread": list(st.session_state.spreads)}).set_index("Time")
+            df_mid = bar_frame("mid", "Mid Price")
+            df_spread = bar_frame("spread", "Spread")
             mid_chart = make_line_chart(df_mid, 'Mid Price')
             spread_chart = make_line_chart(df_spread, 'Spread')
             with left_col:
@@ -546,40 +780,46 @@ try:
                     st.line_chart(df_spread)
         with tab2:
             st.subheader("Latency (ms) Over Time")
-            df_latency = pd.DataFrame({"Time": list(st.session_state.times), "Latency (ms)": list(st.session_state.latencies)}).set_index("Time")
+            df_latency = latency_frame()
             st.line_chart(df_latency)
-            st.write("Live Health Status:", st.session_state.health_statuses[-1])
+            st.write("Live Health Status:", last_health())
         with tab3:
             st.subheader("Latest Raw Orderbook Snapshot")
             if data:
+                metrics = client.get_book_metrics(symbol)
                 left, right = st.columns(2)
                 with left:
                     st.write("Top bids (best first)")
-                    bids = data.get("bids", [])[:10]
-                    if bids:
-                        st.table(pd.DataFrame(bids, columns=["Price", "Qty"]))
+                    bids = memoized(
+                        "bids_table", (symbol, client.side_version("bids")),
+                        lambda: pd.DataFrame(metrics.levels("bids")[:10] if metrics else [], columns=["Price", "Qty"]),
+                    )
+                    if len(bids):
+                        st.table(bids)
                     else:
                         st.info("No bids yet.")
                 with right:
                     st.write("Top asks (best first)")
-                    asks = data.get("asks", [])[:10]
-                    if asks:
-                        st.table(pd.DataFrame(asks, columns=["Price", "Qty"]))
+                    asks = memoized(
+                        "asks_table", (symbol, client.side_version("asks")),
+                        lambda: pd.DataFrame(metrics.levels("asks")[:10] if metrics else [], columns=["Price", "Qty"]),
+                    )
+                    if len(asks):
+                        st.table(asks)
                     else:
                         st.info("No asks yet.")
             else:
                 st.info("No snapshot to show yet.")
+        with tab4:
+            render_scenarios()
 
     # Export area
     with table_placeholder:
-        if st.session_state.export_data:
-            df_export = pd.DataFrame(st.session_state.export_data)
-            st.dataframe(df_export.tail(20))
-            csv_buffer = io.StringIO()
-            df_export.to_csv(csv_buffer, index=False)
+        if len(recent_history(1)):
+            st.dataframe(export_frame(20))
             st.download_button(
                 label="Download Orderbook Data as CSV",
-                data=csv_buffer.getvalue(),
+                data=export_csv(),
                 file_name=f"okx_orderbook_{symbol}_{datetime.now(timezone.utc).strftime('%Y%m%d_%H%M%S')}.csv",
                 mime="text/csv"
             )
@@ -587,25 +827,18 @@ try:
     # Simulation panel
     with sim_placeholder:
         if simulate_order:
-            if st.session_state.last_data:
-                sdata = st.session_state.last_data
-                if order_type == "Market":
-                    slippage = sdata.get("mid_price", 0.0) * volatility / 100
-                    executed_price = sdata.get("mid_price", 0.0) + slippage if order_side == "Buy" else sdata.get("mid_price", 0.0) - slippage
-                    est_cost = quantity
-                    st.info("Market order simulation (estimated)")
-                    st.write(f"- Side: {order_side}")
-                    st.write(f"- Quantity (USD): {quantity:.2f}")
-                    st.write(f"- Estimated Execution Price: {executed_price:.2f}")
-                    st.write(f"- Estimated Cost (USD): {est_cost:.2f}")
-                    st.write(f"- Slippage used: {slippage:.6f}")
-                else:
-                    limit_price = sdata.get("best_ask") if order_side == "Buy" else sdata.get("best_bid")
-                    st.info("Limit order simulation (probabilistic)")
-                    st.write(f"- Side: {order_side}")
-                    st.write(f"- Quantity (USD): {quantity:.2f}")
-                    st.write(f"- Suggested Limit Price: {limit_price:.2f}")
-                    st.write("- Note: Execution probability depends on market movement & volatility.")
+            est = estimate_order_cost() if st.session_state.last_data else None
+            if est:
+                st.info(f"{order_type} order simulation (estimated)")
+                st.write(f"- Side: {order_side}")
+                st.write(f"- Quantity (USD): {quantity:.2f}")
+                st.write(f"- Estimated Execution Price: {est.expected_price:.2f}")
+                st.write(f"- Slippage: {est.slippage_bps:.2f} bps (${est.slippage_cost:.4f})")
+                st.write(f"- Market Impact (USD): {est.impact_cost:.4f}")
+                st.write(f"- Fees (USD): {est.fee_cost:.4f} at {est.fee_rate * 100:.3f}% (maker probability {est.maker_prob:.0%})")
+                st.write(f"- Estimated Total Cost (USD): {est.total_cost:.4f} ({est.total_cost_bps:.2f} bps)")
+                if est.depth_exhausted:
+                    st.caption("Order is larger than the visible book; the remainder is priced at the worst visible level.")
             else:
                 st.warning("No orderbook snapshot yet for simulation.")
 
@@ -616,33 +849,33 @@ try:
             st.markdown("### Quick Actions")
             qa1, qa2, qa3 = st.columns(3)
             if qa1.button("Clear History"):
-                st.session_state.times.clear()
-                st.session_state.mid_prices.clear()
-                st.session_state.spreads.clear()
-                st.session_state.latencies.clear()
-                st.session_state.health_statuses.clear()
-                st.success("History cleared (in-memory).")
+                st.session_state.history_since = time.time()
+                st.success("History cleared for this session (the shared history is kept for other sessions).")
             if qa2.button("Export last 100"):
-                df_export = pd.DataFrame(st.session_state.export_data[-100:])
-                csv_buffer = io.StringIO()
-                df_export.to_csv(csv_buffer, index=False)
                 st.download_button(
                     label="Download last 100 rows",
-                    data=csv_buffer.getvalue(),
+                    data=to_csv(export_frame(100)),
                     file_name=f"okx_orderbook_last100_{symbol}_{datetime.now(timezone.utc).strftime('%Y%m%d_%H%M%S')}.csv",
                     mime="text/csv"
                 )
             if qa3.button("Copy Snapshot to Clipboard (browser)"):
                 if st.session_state.last_data:
-                    st.text_area("Snapshot (select & copy)", value=pd.Series(st.session_state.last_data).to_json(), height=120)
+                    st.text_area("Snapshot (select & copy)", value=pd.Series(dict(st.session_state.last_data)).to_json(), height=120)
                 else:
                     st.warning("No snapshot to copy yet.")
 
     # Help expanders bottom
     render_help_expanders()
 
-    # wait & rerun
-    time.sleep(refresh_rate)
+    # Redraw on the next tick, coalescing bursts to one frame per refresh_rate. While the
+    # market is quiet this only touches a status line once a second, which also lets
+    # Streamlit interrupt the script for button clicks.
+    remaining = refresh_rate - (time.monotonic() - frame_start)
+    if remaining > 0:
+        time.sleep(remaining)
+    while st.session_state.running and client.running and client.wait_for_update(version, timeout=1.0) == version:
+        idle = (datetime.now(timezone.utc) - now).total_seconds()
+        status_placeholder.caption(f"Waiting for the next update… (idle {idle:.0f}s)")
     if st.session_state.running:
         safe_rerun()
 
@@ -0,0 +1,141 @@
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, asdict
+from typing import List, Optional, Sequence
+
+from models.market_impact import AlmgrenChrissModel, AlmgrenChrissParams
+from utils.fee_model import FeeModel
+from utils.fill_model import walk_book
+from utils.tick_store import TickStore
+
+
+@dataclass
+class BacktestJob:
+    params: AlmgrenChrissParams
+    side: str = "Buy"          # "Buy" or "Sell"
+    start_ts: Optional[float] = None
+
+
+@dataclass
+class BacktestResult:
+    start_ts: float
+    side: str
+    target_qty: float
+    filled_qty: float
+    arrival_mid: float
+    avg_price: float
+    notional: float
+    fees: float
+    implementation_shortfall: float  # quote currency, incl. fees; positive = cost
+    predicted_cost: float            # AlmgrenChrissModel.expected_cost()
+    slices: int
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+class ExecutionBacktester:
+    """
+    Replays stored L2 snapshots and executes an Almgren–Chriss schedule against them.
+
+    At each slice boundary the latest snapshot at or before that time is walked
+    best-first (taker fill) for the child quantity; anything the visible book
+    cannot absorb rolls into the next slice. Fills do not deplete later
+    snapshots, so very large children are optimistic.
+    """
+
+    def __init__(self, ts: np.ndarray, bids: np.ndarray, asks: np.ndarray, fee_model: Optional[FeeModel] = None):
+        if len(ts) == 0:
+            raise ValueError("Empty orderbook history")
+        self.ts = ts
+        self.bids = bids
+        self.asks = asks
+        self.fee_model = fee_model or FeeModel()
+
+    @classmethod
+    def from_store(cls, path: str, fee_model: Optional[FeeModel] = None) -> "ExecutionBacktester":
+        return cls(*TickStore(path).read(), fee_model=fee_model)
+
+    def start_times(self, every_s: float, horizon_s: float = 0.0) -> np.ndarray:
+        """Evenly spaced parent-order start times that leave room for `horizon_s` of replay."""
+        return np.arange(float(self.ts[0]), float(self.ts[-1]) - horizon_s, every_s)
+
+    def run(self, params: AlmgrenChrissParams, side: str = "Buy", start_ts: Optional[float] = None,
+            schedule: Optional[np.ndarray] = None) -> BacktestResult:
+        if side not in ("Buy", "Sell"):
+            raise ValueError(f"Unknown side: {side}")
+        model = AlmgrenChrissModel(params)
+        if schedule is None:
+            schedule = model.optimal_trade_schedule()
+        start_ts = float(self.ts[0]) if start_ts is None else float(start_ts)
+        if start_ts < self.ts[0]:
+            # the first stored book would be in the future for the early slices
+            raise ValueError(f"start_ts {start_ts} is before the first snapshot at {float(self.ts[0])}")
+
+        boundaries = start_ts + np.arange(len(schedule)) * model.dt
+        idx = np.searchsorted(self.ts, boundaries, side="right") - 1
+        book = self.asks if side == "Buy" else self.bids
+
+        # latest two-sided book at or before the start
+        arrival = int(idx[0])
+        arrival_mid = float("nan")
+        while arrival >= 0:
+            arrival_mid = float(self.bids[arrival, 0, 0] + self.asks[arrival, 0, 0]) / 2.0
+            if np.isfinite(arrival_mid):
+                break
+            arrival -= 1
+        if not np.isfinite(arrival_mid):
+            raise ValueError(f"No two-sided book at or before start_ts {start_ts}")
+
+        filled = notional = 0.0
+        carry = 0.0
+        for child, i in zip(schedule, idx):
+            qty, cost = walk_book(book[i], float(child) + carry)
+            carry = float(child) + carry - qty
+            filled += qty
+            notional += cost
+
+        fees = self.fee_model.calculate_fee(notional, is_maker=False)
+        sign = 1.0 if side == "Buy" else -1.0
+        shortfall = sign * (notional - arrival_mid * filled) + fees
+
+        return BacktestResult(
+            start_ts=start_ts,
+            side=side,
+            target_qty=float(params.X),
+            filled_qty=filled,
+            arrival_mid=arrival_mid,
+            avg_price=notional / filled if filled > 0 else float("nan"),
+            notional=notional,
+            fees=fees,
+            implementation_shortfall=shortfall,
+            predicted_cost=model.expected_cost(),
+            slices=len(schedule),
+        )
+
+
+# ---- process-parallel sweeps over one memory-mapped store ----
+_worker_bt: Optional[ExecutionBacktester] = None
+
+
+def _init_worker(store_path: str, fee_tier: str):
+    global _worker_bt
+    _worker_bt = ExecutionBacktester.from_store(store_path, FeeModel(fee_tier))
+
+
+def _run_job(job: BacktestJob) -> BacktestResult:
+    return _worker_bt.run(job.params, job.side, job.start_ts)
+
+
+def run_parallel(store_path: str, jobs: Sequence[BacktestJob], processes: Optional[int] = None,
+                 fee_tier: str = "Tier 1", chunksize: int = 64) -> List[BacktestResult]:
+    """
+    Run many strategy/parameter/start-time combinations across worker processes.
+    Each worker memory-maps the store once, so the data is shared via the page cache.
+    """
+    if processes == 1:
+        _init_worker(store_path, fee_tier)
+        return [_run_job(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                             initargs=(store_path, fee_tier)) as pool:
+        return list(pool.map(_run_job, jobs, chunksize=chunksize))
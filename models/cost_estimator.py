@@ -0,0 +1,332 @@
+import json
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlparse, parse_qs
+import numpy as np
+from loguru import logger
+
+from models.market_impact import AlmgrenChrissModel, AlmgrenChrissParams
+from utils.fee_model import FeeModel
+from utils.profiling import timed
+
+
+@dataclass
+class CostBreakdown:
+    instrument: str
+    side: str
+    order_type: str
+    size_usd: float
+    qty: float                # base units at current mid
+    mid_price: float
+    expected_price: float     # average fill price incl. slippage
+    slippage_bps: float
+    slippage_cost: float
+    impact_cost: float
+    maker_prob: float
+    fee_rate: float           # expected rate given maker_prob
+    fee_cost: float
+    total_cost: float
+    total_cost_bps: float
+    depth_exhausted: bool     # order larger than the visible book
+    book_version: int
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+class _BookState:
+    """Per-instrument book plus intermediates shared by every query in the same tick."""
+    __slots__ = ("bids", "asks", "mid", "spread", "volatility", "version", "cum", "memo")
+    MEMO_SIZE = 256  # results kept per book version, least recently used evicted first
+
+    def __init__(self, bids: np.ndarray, asks: np.ndarray, volatility: float, version: int):
+        self.bids = bids
+        self.asks = asks
+        self.mid = float(bids[0, 0] + asks[0, 0]) / 2.0
+        self.spread = float(asks[0, 0] - bids[0, 0])
+        self.volatility = volatility
+        self.version = version
+        self.cum = {}
+        self.memo = OrderedDict()
+
+    def recall(self, key):
+        try:
+            value = self.memo[key]
+            self.memo.move_to_end(key)
+        except KeyError:
+            # missing, or evicted by another thread in between
+            return None
+        return value
+
+    def remember(self, key, value):
+        self.memo[key] = value
+        while len(self.memo) > self.MEMO_SIZE:
+            try:
+                self.memo.popitem(last=False)
+            except KeyError:
+                break
+
+    def _cum(self, side: str):
+        if side not in self.cum:
+            levels = self.asks if side == "Buy" else self.bids
+            self.cum[side] = (levels[:, 0], np.cumsum(levels[:, 1]), np.cumsum(levels[:, 0] * levels[:, 1]))
+        return self.cum[side]
+
+    def walk(self, side: str, qty: float) -> Tuple[float, bool]:
+        """Average taker price for `qty`; beyond visible depth the worst level is reused."""
+        prices, cum_size, cum_notional = self._cum(side)
+        if qty <= 0:
+            return float(prices[0]), False
+        k = int(np.searchsorted(cum_size, qty, side="left"))
+        if k >= len(prices):
+            extra = qty - cum_size[-1]
+            return float((cum_notional[-1] + extra * prices[-1]) / qty), True
+        before_size = cum_size[k - 1] if k > 0 else 0.0
+        before_notional = cum_notional[k - 1] if k > 0 else 0.0
+        return float((before_notional + (qty - before_size) * prices[k]) / qty), False
+
+    def walk_many(self, side: str, qty: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """walk() over an array of positive sizes: (average prices, depth exhausted)."""
+        prices, cum_size, cum_notional = self._cum(side)
+        qty = np.asarray(qty, dtype=np.float64)
+        # pad so level k-1 exists for k = 0, and the worst level prices the overflow
+        size0 = np.concatenate(([0.0], cum_size))
+        notional0 = np.concatenate(([0.0], cum_notional))
+        k = np.searchsorted(cum_size, qty, side="left")
+        exhausted = k >= len(prices)
+        level = np.minimum(k, len(prices) - 1)
+        notional = notional0[k] + (qty - size0[k]) * prices[level]
+        return notional / qty, exhausted
+
+
+class CostEstimator:
+    """
+    All-in pre-trade cost for (instrument, side, size, order type) from the current book.
+
+    Components:
+        - slippage: SlippageModel prediction if one is given, else a walk of the visible book
+        - impact: AlmgrenChrissModel.expected_cost with per-instrument (eta, gamma) and the
+          book's volatility in price units, so it adds to the other USD components
+        - maker probability: MakerTakerModel if given, else 0 for Market / 1 for Limit
+        - fees: FeeModel rate blended by maker probability
+
+    Results are memoized per book version (the most recent _BookState.MEMO_SIZE
+    queries); update_book() starts a new version. Per-caller inputs (fee tier,
+    volatility) are estimate() arguments and part of the memo key, so callers
+    sharing one estimator never replace each other's book state.
+    """
+
+    def __init__(self, fee_model: Optional[FeeModel] = None, slippage_model=None, maker_taker_model=None,
+                 impact_params: Optional[Dict[str, Tuple[float, float]]] = None,
+                 horizon_s: float = 60.0, slices: int = 10):
+        self.fee_model = fee_model or FeeModel()
+        self.slippage_model = slippage_model
+        self.maker_taker_model = maker_taker_model
+        self.impact_params = dict(impact_params or {})
+        self.horizon_s = horizon_s
+        self.slices = slices
+        self._books: Dict[str, _BookState] = {}
+        self._lock = threading.Lock()
+
+    def update_book(self, instrument: str, bids: np.ndarray, asks: np.ndarray,
+                    volatility: Optional[float] = None, version: Optional[int] = None):
+        """
+        Args:
+            bids, asks: (levels, 2) arrays of [price, size], best first
+            volatility: default fractional short-term volatility (e.g. 0.015 for 1.5%) per
+                sqrt(second) for queries that do not pass their own; None keeps the
+                previous book's (0 for the first). The impact risk term uses
+                volatility * mid, in price units
+            version: book sequence number; defaults to previous + 1. Re-sending the
+                current version with the same (or no) volatility keeps its memo
+        """
+        if not len(bids) or not len(asks):
+            raise ValueError("Empty bids or asks")
+        prev = self._books.get(instrument)
+        if volatility is None:
+            volatility = prev.volatility if prev else 0.0
+        if version is None:
+            version = prev.version + 1 if prev else 0
+        elif prev is not None and prev.version == version and prev.volatility == volatility:
+            return
+        with self._lock:
+            self._books[instrument] = _BookState(bids, asks, volatility, version)
+
+    def book(self, instrument: str) -> _BookState:
+        """Current book state of `instrument` (treat as read-only); KeyError before update_book()."""
+        book = self._books.get(instrument)
+        if book is None:
+            raise KeyError(f"No book for {instrument}")
+        return book
+
+    @timed("CostEstimator.estimate")
+    def estimate(self, instrument: str, side: str, size_usd: float, order_type: str = "Market",
+                 limit_price: Optional[float] = None, tier: Optional[str] = None,
+                 volatility: Optional[float] = None) -> CostBreakdown:
+        """
+        Args:
+            tier: fee tier to price with; defaults to the fee model's current tier.
+            volatility: fractional volatility per sqrt(second); defaults to the one
+                given to update_book(). Pass tier and volatility explicitly when several
+                callers share one estimator.
+        """
+        if side not in ("Buy", "Sell"):
+            raise ValueError(f"Unknown side: {side}")
+        if order_type not in ("Market", "Limit"):
+            raise ValueError(f"Unknown order type: {order_type}")
+        if not np.isfinite(size_usd) or size_usd <= 0:
+            raise ValueError("size_usd must be finite and > 0")
+        book = self.book(instrument)
+        tier = tier or self.fee_model.tier
+        rates = self.fee_model.schedule.get(tier)
+        volatility = book.volatility if volatility is None else float(volatility)
+
+        # impact params can be recalibrated, and horizon_s changed, within one book version
+        key = (side, float(size_usd), order_type, limit_price, tier, volatility,
+               self.impact_params.get(instrument), self.horizon_s, self.slices)
+        cached = book.recall(key)
+        if cached is not None:
+            return cached
+
+        qty = size_usd / book.mid
+        taker_price, exhausted = book.walk(side, qty)
+        sign = 1.0 if side == "Buy" else -1.0
+        slippage_bps = sign * (taker_price - book.mid) / book.mid * 1e4
+        if self.slippage_model is not None:
+            slippage_bps = float(self.predict_slippage(book, size_usd, volatility)[0])
+
+        maker_prob = self.maker_prob(book, side, order_type, limit_price, volatility)
+        # a resting order that does not fill passively is assumed to cross the book
+        slippage_bps *= (1.0 - maker_prob)
+        slippage_cost = size_usd * slippage_bps / 1e4
+        expected_price = book.mid * (1.0 + sign * slippage_bps / 1e4)
+
+        impact_cost = self._impact_cost(instrument, book, qty, volatility)
+        fee_rate = maker_prob * rates.maker + (1.0 - maker_prob) * rates.taker
+        fee_cost = size_usd * fee_rate
+        total = slippage_cost + impact_cost + fee_cost
+
+        result = CostBreakdown(
+            instrument=instrument, side=side, order_type=order_type, size_usd=float(size_usd), qty=qty,
+            mid_price=book.mid, expected_price=expected_price, slippage_bps=slippage_bps,
+            slippage_cost=slippage_cost, impact_cost=impact_cost, maker_prob=maker_prob,
+            fee_rate=fee_rate, fee_cost=fee_cost, total_cost=total, total_cost_bps=total / size_usd * 1e4,
+            depth_exhausted=exhausted, book_version=book.version,
+        )
+        book.remember(key, result)
+        return result
+
+    def _impact_cost(self, instrument: str, book: _BookState, qty: float, volatility: float) -> float:
+        params = self.impact_params.get(instrument)
+        if params is None:
+            return 0.0
+        eta, gamma = params
+        # eta and gamma are price units per unit of base qty, so with sigma in price units
+        # every term of the expected cost (temporary, permanent, risk) is in quote currency
+        model = AlmgrenChrissModel(AlmgrenChrissParams(
+            sigma=volatility * book.mid, eta=eta, gamma=gamma, T=self.horizon_s, X=qty, N=self.slices,
+        ))
+        return model.expected_cost()
+
+    def predict_slippage(self, book: _BookState, size_usd, volatility: float) -> np.ndarray:
+        """SlippageModel prediction (bps) for one size or an array of sizes, in one model call."""
+        import pandas as pd
+        sizes = np.atleast_1d(np.asarray(size_usd, dtype=np.float64))
+        X = pd.DataFrame({
+            "order_size_usd": sizes,
+            "market_volatility": np.full(len(sizes), volatility),
+            "spread_percent": np.full(len(sizes), book.spread / book.mid * 100),
+        })
+        return np.asarray(self.slippage_model.predict(X), dtype=np.float64)
+
+    def maker_prob(self, book: _BookState, side: str, order_type: str, limit_price: Optional[float],
+                   volatility: float) -> float:
+        """Probability that the order fills passively (as maker)."""
+        if self.maker_taker_model is None:
+            return 0.0 if order_type == "Market" else 1.0
+        if order_type == "Market":
+            return 0.0
+        import pandas as pd
+        touch = book.bids[0, 0] if side == "Buy" else book.asks[0, 0]
+        price = touch if limit_price is None else limit_price
+        X = pd.DataFrame({
+            "spread": [book.spread],
+            "volatility": [volatility],
+            "order_type": [1],
+            "relative_price_distance": [abs(price - touch) / book.mid],
+        })
+        return float(self.maker_taker_model.predict_proba(X)["maker_prob"].iloc[0])
+
+
+# ---- local request/reply endpoint ----
+class _EstimateHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive: skip a TCP handshake per query
+    disable_nagle_algorithm = True  # headers and body are separate writes; don't wait on delayed ACKs
+    estimator: CostEstimator = None
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == "/health":
+            return self._reply(200, {"status": "ok", "instruments": sorted(self.estimator._books)})
+        if url.path != "/estimate":
+            return self._reply(404, {"error": "not found"})
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        self._estimate(query)
+
+    def do_POST(self):
+        if urlparse(self.path).path != "/estimate":
+            return self._reply(404, {"error": "not found"})
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            query = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            return self._reply(400, {"error": "invalid JSON body"})
+        if not isinstance(query, dict):
+            return self._reply(400, {"error": "JSON body must be an object"})
+        self._estimate(query)
+
+    def _estimate(self, query: dict):
+        try:
+            limit = query.get("limit_price")
+            vol = query.get("volatility")
+            size = float(query["size"])
+            if not np.isfinite(size):
+                raise ValueError("size must be finite")
+            result = self.estimator.estimate(
+                query["instrument"], query.get("side", "Buy"), size,
+                query.get("order_type", "Market"), float(limit) if limit is not None else None,
+                query.get("tier"), float(vol) if vol is not None else None,
+            )
+        except KeyError as e:
+            return self._reply(404 if "No book" in str(e) else 400, {"error": str(e)})
+        except (TypeError, ValueError) as e:
+            return self._reply(400, {"error": str(e)})
+        self._reply(200, result.to_dict())
+
+    def _reply(self, status: int, body: dict):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        # per-request access logging would dominate the latency budget
+        pass
+
+
+def start_cost_server(estimator: CostEstimator, host: str = "127.0.0.1", port: int = 8765) -> ThreadingHTTPServer:
+    """
+    Serve GET /estimate?instrument=BTC-USDT&side=Buy&size=1000&order_type=Market[&tier=Tier 2]
+    (or POST the same fields as a JSON object) from a daemon thread. Call shutdown() to stop.
+    """
+    handler = type("EstimateHandler", (_EstimateHandler,), {"estimator": estimator})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logger.info(f"Cost estimator listening on http://{host}:{server.server_address[1]}")
+    return server
@@ -0,0 +1,355 @@
+import math
+import queue
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Mapping, Optional, Tuple
+import numpy as np
+
+from models.market_impact import AlmgrenChrissParams
+from utils.profiling import timed
+
+# crypto trades around the clock: annualized volatility = per-second volatility * sqrt(this)
+SECONDS_PER_YEAR = 365.0 * 86400.0
+
+
+@dataclass
+class ChildOrder:
+    parent_id: int
+    inst_id: str
+    side: str
+    qty: float
+    slice_index: int
+    slices_left: int          # including this one
+    ts: float                 # slice boundary the child was released at
+    ref_mid: float            # mid at release; fills are measured against it
+    sigma: float              # per sqrt(second)
+    eta: float
+    kappa: float              # per second
+
+
+class AdaptiveScheduler:
+    """
+    Live Almgren–Chriss execution of many parent orders.
+
+    Each parent trades on the grid t_i = start + i * T / N. At every boundary the
+    rest of the order is re-solved in closed form from the remaining quantity and
+    time, with the latest estimates:
+
+        x(t) = R * sinh(kappa * (tau - t)) / sinh(kappa * tau),  kappa = sigma * sqrt(gamma / eta)
+
+    so the next child is R * (1 - x(dt) / R); nothing else of the schedule is
+    computed. Time is in seconds, so sigma is per sqrt(second): an EWMA of mid
+    log-return variance per second fed by observe_market() / observe_processor().
+    The annualized params.sigma of submitted orders is converted to the same unit
+    (divided by sqrt(SECONDS_PER_YEAR)). eta is an EWMA of the concession
+    observed on fills (|fill - ref_mid| / child qty, the AlmgrenChrissModel
+    convention) per instrument. Until they have data the parent's own params
+    (or `impact_params[inst_id]`) are used.
+
+    A child is valid for one slice: whatever is unfilled at the next boundary is
+    folded back into the remaining quantity. With a bounded `events` queue, parents
+    whose child does not fit stay due and are released on a later on_tick(). Orders
+    are held column-wise in numpy arrays, so a boundary shared by hundreds of
+    parents is one vectorized step.
+
+    Args:
+        events: queue receiving ChildOrder events (a new queue.Queue by default)
+        vol_halflife_s: half-life of the volatility EWMA, in seconds
+        min_vol_obs: mid observations per instrument before the live sigma replaces params.sigma
+        impact_halflife: half-life of the eta EWMA, in fills
+        impact_params: instrument -> (eta, gamma) defaults, e.g. CostEstimator.impact_params
+    """
+
+    def __init__(self, events: Optional[queue.Queue] = None, vol_halflife_s: float = 60.0,
+                 min_vol_obs: int = 20, impact_halflife: float = 20.0,
+                 impact_params: Optional[Mapping[str, Tuple[float, float]]] = None, capacity: int = 256):
+        self.events = events if events is not None else queue.Queue()
+        self.vol_halflife_s = float(vol_halflife_s)
+        self.min_vol_obs = int(min_vol_obs)
+        self._eta_alpha = 1.0 - math.exp(-math.log(2.0) / impact_halflife)
+        self.impact_params = impact_params if impact_params is not None else {}
+
+        # per instrument
+        self.instruments: List[str] = []
+        self._inst_index: Dict[str, int] = {}
+        self._mid: List[float] = []
+        self._mid_ts: List[float] = []
+        self._var: List[float] = []        # per-second log-return variance
+        self._vol_obs: List[int] = []
+        self._eta: List[float] = []        # nan until the first fill
+
+        # per parent order (slot arrays, reused after an order finishes)
+        self._ids: List[Optional[int]] = [None] * capacity
+        self._slot_of: Dict[int, int] = {}
+        self._free = list(range(capacity - 1, -1, -1))
+        self._next_id = 1
+        self._alloc(capacity)
+        self._next_due = math.inf
+
+    def _alloc(self, capacity: int):
+        def grow(name, dtype, fill):
+            old = getattr(self, name, None)
+            arr = np.full(capacity, fill, dtype=dtype)
+            if old is not None:
+                arr[:len(old)] = old
+            setattr(self, name, arr)
+
+        grow("active", bool, False)
+        grow("inst", np.intp, 0)
+        grow("sign", np.float64, 0.0)
+        grow("total", np.float64, 0.0)
+        grow("filled", np.float64, 0.0)
+        grow("notional", np.float64, 0.0)
+        grow("horizon", np.float64, 0.0)
+        grow("dt", np.float64, 0.0)
+        grow("slices", np.int64, 0)
+        grow("slice_index", np.int64, 0)
+        grow("next_ts", np.float64, np.inf)
+        grow("sigma0", np.float64, 0.0)
+        grow("eta0", np.float64, 0.0)
+        grow("gamma0", np.float64, 0.0)
+        grow("child_qty", np.float64, 0.0)
+        grow("child_mid", np.float64, np.nan)
+
+    # ---- orders ----
+    def submit(self, inst_id: str, side: str, params: AlmgrenChrissParams, start_ts: Optional[float] = None) -> int:
+        """
+        Start executing `params.X` of `inst_id` over `params.T` seconds in `params.N` slices.
+        The first child is released on the first on_tick() at or after `start_ts`.
+
+        Returns:
+            parent order id
+        """
+        if side not in ("Buy", "Sell"):
+            raise ValueError(f"Unknown side: {side}")
+        if params.N <= 0 or params.T <= 0 or params.X <= 0:
+            raise ValueError("params.N, params.T and params.X must be > 0")
+        if not self._free:
+            self._grow()
+        slot = self._free.pop()
+        parent_id = self._next_id
+        self._next_id += 1
+        self._ids[slot] = parent_id
+        self._slot_of[parent_id] = slot
+
+        start = time.time() if start_ts is None else float(start_ts)
+        self.active[slot] = True
+        self.inst[slot] = self._instrument(inst_id)
+        self.sign[slot] = 1.0 if side == "Buy" else -1.0
+        self.total[slot] = params.X
+        self.filled[slot] = self.notional[slot] = 0.0
+        self.horizon[slot] = params.T
+        self.dt[slot] = params.T / params.N
+        self.slices[slot] = params.N
+        self.slice_index[slot] = 0
+        self.next_ts[slot] = start
+        self.sigma0[slot] = params.sigma / math.sqrt(SECONDS_PER_YEAR)
+        self.eta0[slot], self.gamma0[slot] = params.eta, params.gamma
+        self.child_qty[slot] = 0.0
+        self.child_mid[slot] = np.nan
+        self._next_due = min(self._next_due, start)
+        return parent_id
+
+    def cancel(self, parent_id: int) -> bool:
+        slot = self._slot_of.get(parent_id)
+        if slot is None or not self.active[slot]:
+            return False
+        self._finish(slot)
+        return True
+
+    def _grow(self):
+        old = len(self.active)
+        self._alloc(old * 2)
+        self._ids.extend([None] * old)
+        self._free.extend(range(old * 2 - 1, old - 1, -1))
+
+    def _finish(self, slot: int):
+        self.active[slot] = False
+        self.next_ts[slot] = np.inf
+
+    def _instrument(self, inst_id: str) -> int:
+        idx = self._inst_index.get(inst_id)
+        if idx is None:
+            idx = self._inst_index[inst_id] = len(self.instruments)
+            self.instruments.append(inst_id)
+            self._mid.append(math.nan)
+            self._mid_ts.append(math.nan)
+            self._var.append(0.0)
+            self._vol_obs.append(0)
+            self._eta.append(math.nan)
+        return idx
+
+    # ---- live inputs ----
+    def observe_market(self, inst_id: str, mid: float, ts: float):
+        """Feed a mid price; updates the instrument's volatility estimate."""
+        i = self._instrument(inst_id)
+        prev, prev_ts = self._mid[i], self._mid_ts[i]
+        self._mid[i], self._mid_ts[i] = mid, ts
+        if not (prev > 0 and mid > 0):
+            return
+        dt = ts - prev_ts
+        if dt <= 0:
+            return
+        r = math.log(mid / prev)
+        alpha = 1.0 - math.exp(-math.log(2.0) * dt / self.vol_halflife_s)
+        self._var[i] += alpha * (r * r / dt - self._var[i])
+        self._vol_obs[i] += 1
+
+    def observe_processor(self, inst_id: str, processor):
+        """observe_market() with the latest mid of an OrderBookProcessor."""
+        if processor.price_history:
+            self.observe_market(inst_id, processor.price_history[-1], processor.timestamp_history[-1])
+
+    def on_fill(self, parent_id: int, qty: float, price: float):
+        """Execution report for the parent's current child; refines the instrument's eta."""
+        slot = self._slot_of.get(parent_id)
+        if slot is None or qty <= 0:
+            return
+        self.filled[slot] += qty
+        self.notional[slot] += qty * price
+        ref, child = self.child_mid[slot], self.child_qty[slot]
+        if ref > 0 and child > 0:
+            observed = max(self.sign[slot] * (price - ref), 0.0) / child
+            i = int(self.inst[slot])
+            eta = self._eta[i]
+            self._eta[i] = observed if math.isnan(eta) else eta + self._eta_alpha * (observed - eta)
+        if self.active[slot] and self.filled[slot] >= self.total[slot] * (1.0 - 1e-12):
+            self._finish(slot)
+
+    def sigma(self, inst_id: str) -> Optional[float]:
+        """
+        Live volatility per sqrt(second) (times sqrt(SECONDS_PER_YEAR) to annualize),
+        or None before min_vol_obs observations.
+        """
+        i = self._inst_index.get(inst_id)
+        if i is None or self._vol_obs[i] < self.min_vol_obs:
+            return None
+        return math.sqrt(self._var[i])
+
+    def eta(self, inst_id: str) -> Optional[float]:
+        i = self._inst_index.get(inst_id)
+        if i is None or math.isnan(self._eta[i]):
+            return None
+        return self._eta[i]
+
+    # ---- scheduling ----
+    @timed("AdaptiveScheduler.on_tick")
+    def on_tick(self, ts: Optional[float] = None) -> int:
+        """
+        Release the children of every parent whose slice boundary is due at `ts`.
+
+        Returns:
+            number of ChildOrder events emitted
+        """
+        ts = time.time() if ts is None else ts
+        if ts < self._next_due:
+            return 0
+        due = np.flatnonzero(self.next_ts <= ts)
+        emitted = self._step(due, ts) if len(due) else 0
+        self._next_due = float(self.next_ts.min())
+        return emitted
+
+    def _step(self, due: np.ndarray, ts: float) -> int:
+        i = self.slice_index[due]
+        n_slices = self.slices[due]
+        ended = i >= n_slices
+        for slot in due[ended].tolist():
+            self._finish(slot)
+        due, i, n_slices = due[~ended], i[~ended], n_slices[~ended]
+        if not len(due):
+            return 0
+
+        inst = self.inst[due]
+        sigma, eta, gamma = self._live_params(due, inst)
+        dt = self.dt[due]
+        remaining = np.maximum(self.total[due] - self.filled[due], 0.0)
+        tau = self.horizon[due] - i * dt        # time left including this slice
+        kappa = np.where((eta > 0) & (gamma > 0), sigma * np.sqrt(gamma / np.where(eta > 0, eta, 1.0)), 0.0)
+        qty = remaining * _slice_fraction(kappa, tau, dt)
+        last = i == n_slices - 1
+        qty[last] = remaining[last]
+
+        mids = np.asarray(self._mid, dtype=np.float64)[inst]
+
+        # emit before advancing: a full events queue leaves the rest due, to be retried next tick
+        emitted = released = 0
+        put = self.events.put_nowait
+        names, ids = self.instruments, self._ids
+        for slot, inst_i, sign, q, k, left, mid, s, e, kap in zip(
+            due.tolist(), inst.tolist(), self.sign[due].tolist(), qty.tolist(), i.tolist(),
+            (n_slices - i).tolist(), mids.tolist(), sigma.tolist(), eta.tolist(), kappa.tolist(),
+        ):
+            if q > 0:
+                try:
+                    put(ChildOrder(ids[slot], names[inst_i], "Buy" if sign > 0 else "Sell", q, k, left, ts, mid, s, e, kap))
+                except queue.Full:
+                    break
+                emitted += 1
+            released += 1
+
+        done = due[:released]
+        self.child_qty[done] = qty[:released]
+        self.child_mid[done] = mids[:released]
+        self.slice_index[done] = i[:released] + 1
+        self.next_ts[done] += dt[:released]
+        return emitted
+
+    def _live_params(self, due: np.ndarray, inst: np.ndarray):
+        # per-instrument overrides (nan = keep the order's own value), then one gather
+        n = len(self.instruments)
+        inst_sigma = np.where(np.asarray(self._vol_obs) >= self.min_vol_obs, np.sqrt(self._var), np.nan)
+        inst_eta = np.full(n, np.nan)
+        inst_gamma = np.full(n, np.nan)
+        for i, name in enumerate(self.instruments):
+            defaults = self.impact_params.get(name)
+            if defaults is not None:
+                inst_eta[i], inst_gamma[i] = defaults
+        fill_eta = np.asarray(self._eta)
+        inst_eta = np.where(np.isnan(fill_eta), inst_eta, fill_eta)
+
+        def pick(live, own):
+            values = live[inst]
+            return np.where(np.isnan(values), own[due], values)
+        return pick(inst_sigma, self.sigma0), pick(inst_eta, self.eta0), pick(inst_gamma, self.gamma0)
+
+    # ---- reporting ----
+    def __len__(self) -> int:
+        """Parent orders still working."""
+        return int(self.active.sum())
+
+    def status(self, parent_id: int) -> Optional[dict]:
+        slot = self._slot_of.get(parent_id)
+        if slot is None:
+            return None
+        filled = float(self.filled[slot])
+        return {
+            "inst_id": self.instruments[self.inst[slot]],
+            "side": "Buy" if self.sign[slot] > 0 else "Sell",
+            "active": bool(self.active[slot]),
+            "qty": float(self.total[slot]),
+            "filled": filled,
+            "avg_price": float(self.notional[slot]) / filled if filled > 0 else float("nan"),
+            "slices_done": int(self.slice_index[slot]),
+            "slices": int(self.slices[slot]),
+            "next_ts": float(self.next_ts[slot]),
+        }
+
+    def release(self, parent_id: int):
+        """Forget a finished order and reuse its slot (status() returns None afterwards)."""
+        slot = self._slot_of.get(parent_id)
+        if slot is None or self.active[slot]:
+            return
+        del self._slot_of[parent_id]
+        self._ids[slot] = None
+        self._free.append(slot)
+
+
+def _slice_fraction(kappa: np.ndarray, tau: np.ndarray, dt: np.ndarray) -> np.ndarray:
+    """1 - sinh(kappa (tau - dt)) / sinh(kappa tau): share of the remainder traded in the next slice."""
+    rest = np.maximum(tau - dt, 0.0)
+    linear = dt / np.maximum(tau, 1e-12)
+    # exp form stays finite for large kappa * tau
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ratio = np.exp(-kappa * dt) * np.expm1(-2.0 * kappa * rest) / np.expm1(-2.0 * kappa * tau)
+    frac = np.where(kappa * tau > 1e-9, 1.0 - ratio, linear)
+    return np.clip(frac, 0.0, 1.0)
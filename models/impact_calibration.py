@@ -0,0 +1,395 @@
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, asdict
+from typing import Dict, Optional, Sequence, Tuple
+import numpy as np
+
+# Conventions follow AlmgrenChrissModel / ExecutionCostSimulator: a child of size n
+# executes eta * n away from the pre-trade mid (temporary) and moves the mid by
+# gamma * n (permanent). Both are in price units per unit of base quantity, and eta
+# is measured beyond the touch: the half spread is already part of slippage.
+
+# regression sample columns: count, sum x, sum y, sum xy, sum xx
+_N, _SX, _SY, _SXY, _SXX = range(5)
+DEPTH_FRACTIONS = (0.1, 0.25, 0.5, 0.75)
+
+
+@dataclass
+class ImpactEstimate:
+    eta: float
+    gamma: float
+    eta_source: str       # "fills", "book" or "prior"
+    gamma_source: str     # "trades", "prior" or "none" (no trades or prior yet: gamma = 0)
+    eta_obs: int
+    gamma_obs: int
+    updated: float
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+class RollingRegression:
+    """
+    Least squares over the last `window` samples, each sample being pre-summed
+    (n, Σx, Σy, Σxy, Σxx) so a whole book or bucket can count as one. Totals are
+    kept incrementally and re-summed from the ring every `window` samples to
+    stop float drift.
+    """
+
+    def __init__(self, window: int = 500):
+        if window <= 0:
+            raise ValueError("window must be > 0")
+        self.window = window
+        self._rows = np.zeros((window, 5))
+        self._totals = np.zeros(5)
+        self._head = 0
+        self._count = 0
+        self._since_resync = 0
+
+    def add(self, rows: np.ndarray):
+        """Append (k, 5) sample rows, oldest first."""
+        rows = np.atleast_2d(np.asarray(rows, dtype=np.float64))[-self.window:]
+        k = len(rows)
+        if k == 1:
+            # live path: one sample, no index arrays
+            slot = self._head
+            self._totals += rows[0] - self._rows[slot]
+            self._rows[slot] = rows[0]
+        else:
+            idx = (self._head + np.arange(k)) % self.window
+            # unused slots are zero, so subtracting the overwritten rows is always right
+            self._totals += rows.sum(axis=0) - self._rows[idx].sum(axis=0)
+            self._rows[idx] = rows
+        self._head = (self._head + k) % self.window
+        self._count = min(self._count + k, self.window)
+        self._since_resync += k
+        if self._since_resync >= self.window:
+            self._totals = self._rows.sum(axis=0)
+            self._since_resync = 0
+
+    @property
+    def observations(self) -> int:
+        return int(self._totals[_N])
+
+    def slope(self, through_origin: bool = False) -> float:
+        return _slope(self._totals, through_origin)
+
+
+def _slope(t: np.ndarray, through_origin: bool):
+    """Slope from (..., 5) totals; nan where undefined."""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        if through_origin:
+            return t[..., _SXY] / t[..., _SXX]
+        n = t[..., _N]
+        return (n * t[..., _SXY] - t[..., _SX] * t[..., _SY]) / (n * t[..., _SXX] - t[..., _SX] ** 2)
+
+
+def rolling_slopes(rows: np.ndarray, window: int, through_origin: bool = False) -> np.ndarray:
+    """Slope over the `window` samples ending at each row (vectorized via cumulative sums)."""
+    cum = np.cumsum(np.vstack((np.zeros(5), rows)), axis=0)
+    end = np.arange(1, len(rows) + 1)
+    totals = cum[end] - cum[np.maximum(end - window, 0)]
+    return _slope(totals, through_origin)
+
+
+def book_samples(bids: np.ndarray, asks: np.ndarray, fractions: Sequence[float] = DEPTH_FRACTIONS) -> np.ndarray:
+    """
+    One regression sample per snapshot of concession beyond the touch
+    (|avg fill - best price|) against size, walking both sides for `fractions`
+    of the thinner side's visible depth.
+
+    Args:
+        bids, asks: (N, levels, 2) snapshots (NaN for missing levels)
+
+    Returns:
+        (N, 5) sample rows for a through-origin fit of concession = eta * size
+    """
+    books = np.stack((np.asarray(asks, dtype=np.float64), np.asarray(bids, dtype=np.float64)))  # (2, N, L, 2)
+    prices, sizes = books[..., 0], books[..., 1]
+    ok = np.isfinite(prices) & np.isfinite(sizes)
+    prices, sizes = np.where(ok, prices, 0.0), np.where(ok, sizes, 0.0)
+    depth = sizes.sum(axis=2).min(axis=0)                                   # (N,)
+    qty = depth[:, None] * np.asarray(fractions, dtype=np.float64)          # (N, K)
+    # same partial-level walk as utils.fill_model.walk_book_batch, for K sizes at once
+    cum_before = np.cumsum(sizes, axis=2) - sizes
+    take = np.clip(qty[None, :, :, None] - cum_before[:, :, None, :], 0.0, sizes[:, :, None, :])  # (2, N, K, L)
+    filled = take.sum(axis=3)
+    notional = (take * prices[:, :, None, :]).sum(axis=3)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        y = np.abs(notional / filled - prices[:, :, :1])
+    x = np.broadcast_to(qty, y.shape)
+    valid = np.isfinite(y) & (x > 0)
+    x, y = np.where(valid, x, 0.0), np.where(valid, y, 0.0)
+    rows = np.empty((len(depth), 5))
+    rows[:, _N] = valid.sum(axis=(0, 2))
+    rows[:, _SX] = x.sum(axis=(0, 2))
+    rows[:, _SY] = y.sum(axis=(0, 2))
+    rows[:, _SXY] = (x * y).sum(axis=(0, 2))
+    rows[:, _SXX] = (x * x).sum(axis=(0, 2))
+    return rows
+
+
+def point_samples(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """(N, 5) sample rows of single observations."""
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    return np.column_stack((np.ones_like(x), x, y, x * y, x * x))
+
+
+def flow_samples(book_ts: np.ndarray, mids: np.ndarray, trade_ts: np.ndarray, signed_qty: np.ndarray,
+                 bucket_s: float = 1.0) -> np.ndarray:
+    """
+    Permanent-impact samples (Kyle-style): for every bucket with trades, the mid
+    change from the bucket's first book to the next bucket's first book against
+    the net signed volume traded in between. Same sampling as the live path.
+
+    Returns:
+        (B, 5) sample rows for an OLS fit of d_mid = gamma * net_volume + drift
+    """
+    if not len(book_ts) or not len(trade_ts):
+        return np.zeros((0, 5))
+    bucket = np.floor(np.asarray(book_ts, dtype=np.float64) / bucket_s).astype(np.int64)
+    present, first = np.unique(bucket, return_index=True)
+    opens = np.asarray(mids, dtype=np.float64)[first]
+    # segment i runs from the first book of present[i] to the first book of present[i + 1]
+    trade_bucket = np.floor(np.asarray(trade_ts, dtype=np.float64) / bucket_s).astype(np.int64)
+    seg = np.searchsorted(present, trade_bucket, side="right") - 1
+    keep = (seg >= 0) & (seg < len(present) - 1)
+    n_seg = len(present) - 1
+    flow = np.bincount(seg[keep], weights=np.asarray(signed_qty, dtype=np.float64)[keep], minlength=n_seg)
+    traded = np.bincount(seg[keep], minlength=n_seg) > 0
+    return point_samples(flow[traded], np.diff(opens)[traded])
+
+
+class _InstrumentState:
+    __slots__ = ("book", "fills", "flow", "prior", "last_book_ts", "bucket", "bucket_open_mid",
+                 "bucket_flow", "bucket_trades", "last_mid")
+
+    def __init__(self, window: int, prior: Optional[Tuple[float, float]]):
+        self.book = RollingRegression(window)
+        self.fills = RollingRegression(window)
+        self.flow = RollingRegression(window)
+        self.prior = prior
+        self.last_book_ts = -np.inf
+        self.bucket = None
+        self.bucket_open_mid = np.nan
+        self.bucket_flow = 0.0
+        self.bucket_trades = 0
+        self.last_mid = np.nan
+
+
+class ImpactCalibrator:
+    """
+    Per-instrument (eta, gamma) estimated online from live or stored data:
+
+        - eta from the fill concession of our own executions (add_fill) once
+          `min_obs` fills are in the window, else from the concession implied
+          by walking the visible book (add_book / calibrate_history)
+        - gamma from mid changes against net signed public trade volume per
+          `bucket_s` bucket (add_trades + add_book)
+
+    Every estimate is a rolling least-squares fit over the last `window` samples,
+    refreshed as data arrives. `params` is a plain dict of instrument ->
+    (eta, gamma) kept current for O(1) lookups; bind() makes a CostEstimator
+    read from it directly. Inputs may come from several threads (feed workers,
+    dashboard sessions); one lock serializes every update. Hand-set parameters act as priors until data arrives;
+    with book data only and no gamma prior, gamma is published as 0.
+
+    Args:
+        window: samples per rolling regression
+        min_obs: samples before a fill- or trade-based estimate is trusted
+        book_interval_s: minimum spacing of book samples per instrument
+        bucket_s: bucket length for the permanent impact regression
+        path: JSON file to load parameter sets from (and save() to)
+    """
+
+    def __init__(self, window: int = 500, min_obs: int = 30, book_interval_s: float = 1.0,
+                 bucket_s: float = 1.0, path: Optional[str] = None):
+        self.window = window
+        self.min_obs = min_obs
+        self.book_interval_s = book_interval_s
+        self.bucket_s = bucket_s
+        self.path = path
+        self.params: Dict[str, Tuple[float, float]] = {}
+        self.estimates: Dict[str, ImpactEstimate] = {}
+        self._state: Dict[str, _InstrumentState] = {}
+        self._lock = threading.Lock()        # state and estimates
+        self._save_lock = threading.Lock()   # the JSON file
+        if path and os.path.exists(path):
+            self.load(path)
+
+    def bind(self, target) -> "ImpactCalibrator":
+        """
+        Share `params` with a CostEstimator (or AdaptiveScheduler): its hand-set
+        impact_params become priors and are replaced as estimates arrive.
+        """
+        for inst, prior in dict(target.impact_params).items():
+            self.set_prior(inst, *prior)
+        target.impact_params = self.params
+        return self
+
+    def set_prior(self, inst: str, eta: float, gamma: float):
+        with self._lock:
+            state = self._get(inst)
+            state.prior = (float(eta), float(gamma))
+            self._refresh(inst, state)
+
+    def _get(self, inst: str) -> _InstrumentState:
+        state = self._state.get(inst)
+        if state is None:
+            state = self._state[inst] = _InstrumentState(self.window, None)
+        return state
+
+    # ---- incremental inputs ----
+    def add_book(self, inst: str, ts: float, bids: np.ndarray, asks: np.ndarray):
+        """Live book update ((levels, 2) arrays). Cheap unless a sample is due."""
+        if not len(bids) or not len(asks):
+            return
+        mid = (bids[0, 0] + asks[0, 0]) / 2.0
+        with self._lock:
+            state = self._get(inst)
+            state.last_mid = mid
+            refresh = self._roll_bucket(state, ts, mid)
+            if ts - state.last_book_ts >= self.book_interval_s:
+                state.last_book_ts = ts
+                state.book.add(book_samples(bids[None], asks[None]))
+                refresh = True
+            if refresh:
+                self._refresh(inst, state)
+
+    def add_trades(self, inst: str, ts: np.ndarray, qty: np.ndarray, side: np.ndarray):
+        """Public trades: side +1 for buyer-initiated, -1 for seller-initiated."""
+        signed = np.asarray(qty, dtype=np.float64) * np.asarray(side, dtype=np.float64)
+        with self._lock:
+            state = self._get(inst)
+            for t, q in zip(np.asarray(ts, dtype=np.float64).tolist(), signed.tolist()):
+                if self._roll_bucket(state, t, state.last_mid):
+                    self._refresh(inst, state)
+                state.bucket_flow += q
+                state.bucket_trades += 1
+
+    def _roll_bucket(self, state: _InstrumentState, ts: float, mid: float) -> bool:
+        bucket = int(ts // self.bucket_s)
+        if state.bucket is None:
+            state.bucket, state.bucket_open_mid = bucket, mid
+            return False
+        if bucket <= state.bucket:
+            return False
+        sampled = False
+        if state.bucket_trades and np.isfinite(state.bucket_open_mid) and np.isfinite(mid):
+            state.flow.add(point_samples([state.bucket_flow], [mid - state.bucket_open_mid]))
+            sampled = True
+        state.bucket, state.bucket_open_mid = bucket, mid
+        state.bucket_flow, state.bucket_trades = 0.0, 0
+        return sampled
+
+    def add_fill(self, inst: str, qty: float, price: float, side: str, ref_price: float):
+        """
+        One of our executions.
+
+        Args:
+            ref_price: touch on the side taken (best ask for a buy) when the order was
+                sent; passing the mid instead folds the half spread into eta
+        """
+        if qty <= 0 or not ref_price > 0:
+            return
+        sign = 1.0 if side == "Buy" else -1.0
+        with self._lock:
+            state = self._get(inst)
+            state.fills.add(point_samples([qty], [sign * (price - ref_price)]))
+            self._refresh(inst, state)
+
+    # ---- batch / history ----
+    def calibrate_history(self, inst: str, ts: np.ndarray, bids: np.ndarray, asks: np.ndarray,
+                          trades: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+        """
+        Fit from stored snapshots (e.g. TickStore.read()) and optional trades
+        (utils TRADE_DTYPE records with ts, sz, side), then keep the last window
+        of samples for the live updates that follow.
+
+        Returns:
+            rolling "eta_book" per sampled snapshot and "gamma" per traded bucket
+        """
+        ts = np.asarray(ts, dtype=np.float64)
+        keep = _every(ts, self.book_interval_s)
+        book_rows = book_samples(bids[keep], asks[keep])
+        out = {"ts": ts[keep], "eta_book": np.maximum(rolling_slopes(book_rows, self.window, True), 0.0)}
+        flow_rows = None
+        if trades is not None and len(trades):
+            mids = (np.asarray(bids[:, 0, 0]) + np.asarray(asks[:, 0, 0])) / 2.0
+            flow_rows = flow_samples(ts, mids, trades["ts"], trades["sz"] * trades["side"], self.bucket_s)
+            out["gamma"] = rolling_slopes(flow_rows, self.window)
+        with self._lock:
+            state = self._get(inst)
+            state.book.add(book_rows)
+            if flow_rows is not None:
+                state.flow.add(flow_rows)
+            if len(ts):
+                state.last_book_ts = float(ts[keep][-1])
+            self._refresh(inst, state)
+        return out
+
+    # ---- estimates ----
+    def _refresh(self, inst: str, state: _InstrumentState):
+        # caller holds self._lock
+        prior_eta, prior_gamma = state.prior if state.prior else (np.nan, np.nan)
+        if state.fills.observations >= self.min_obs:
+            eta, eta_source, eta_obs = state.fills.slope(True), "fills", state.fills.observations
+        elif state.book.observations:
+            eta, eta_source, eta_obs = state.book.slope(True), "book", state.book.observations
+        else:
+            eta, eta_source, eta_obs = prior_eta, "prior", 0
+        if state.flow.observations >= self.min_obs:
+            gamma, gamma_source, gamma_obs = state.flow.slope(), "trades", state.flow.observations
+        else:
+            gamma, gamma_source, gamma_obs = prior_gamma, "prior", 0
+        if not np.isfinite(eta):
+            return
+        if not np.isfinite(gamma):
+            # book-only feed without a prior: publish eta and leave permanent impact out
+            gamma, gamma_source = 0.0, "none"
+        estimate = ImpactEstimate(
+            eta=max(float(eta), 0.0), gamma=max(float(gamma), 0.0), eta_source=eta_source,
+            gamma_source=gamma_source, eta_obs=eta_obs, gamma_obs=gamma_obs, updated=time.time(),
+        )
+        self.estimates[inst] = estimate
+        self.params[inst] = (estimate.eta, estimate.gamma)
+
+    def get(self, inst: str) -> Optional[Tuple[float, float]]:
+        return self.params.get(inst)
+
+    # ---- persistence ----
+    def save(self, path: Optional[str] = None):
+        """Write the current estimates as JSON (atomically)."""
+        path = path or self.path
+        if not path:
+            raise ValueError("No path to save impact parameters to")
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp = f"{path}.tmp"
+        with self._lock:
+            estimates = sorted(self.estimates.items())
+        with self._save_lock:
+            with open(tmp, "w") as f:
+                json.dump({inst: e.to_dict() for inst, e in estimates}, f, indent=2)
+            os.replace(tmp, path)
+
+    def load(self, path: str):
+        """Seed estimates (and priors) from a file written by save()."""
+        with open(path) as f:
+            saved = json.load(f)
+        with self._lock:
+            for inst, values in saved.items():
+                estimate = ImpactEstimate(**values)
+                self._get(inst).prior = (estimate.eta, estimate.gamma)
+                self.estimates[inst] = estimate
+                self.params[inst] = (estimate.eta, estimate.gamma)
+
+
+def _every(ts: np.ndarray, interval_s: float) -> np.ndarray:
+    """Indices of the first snapshot in each `interval_s` bucket."""
+    if not len(ts) or interval_s <= 0:
+        return np.arange(len(ts))
+    bucket = np.floor(ts / interval_s)
+    return np.flatnonzero(np.concatenate(([True], bucket[1:] != bucket[:-1])))
@@ -1,12 +1,20 @@
-import pandas as pd
-import joblib
-from sklearn.linear_model import LogisticRegression
-from sklearn.pipeline import Pipeline
-from sklearn.preprocessing import StandardScaler
-from typing import Optional
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Optional
+
+# heavy dependencies load on first use, see models/slippage_model.py
+if TYPE_CHECKING:
+    import pandas as pd
+    from sklearn.pipeline import Pipeline
+
+from utils.profiling import timed
 
 class MakerTakerModel:
     def __init__(self, model: Optional[Pipeline] = None):
+        if model is None:
+            from sklearn.linear_model import LogisticRegression
+            from sklearn.pipeline import Pipeline
+            from sklearn.preprocessing import StandardScaler
         # default pipeline: standard scaler + logistic regression
         self.model = model or Pipeline(
             [("scaler", StandardScaler()), ("clf", LogisticRegression(max_iter=200))]
@@ -24,11 +32,13 @@ class MakerTakerModel:
             raise ValueError("Empty X or y passed to fit()")
         self.model.fit(X, y)
 
+    @timed("MakerTakerModel.predict_proba")
     def predict_proba(self, X: pd.DataFrame) -> pd.DataFrame:
         """
         Returns:
             DataFrame with columns ['maker_prob', 'taker_prob']
         """
+        import pandas as pd
         probs = self.model.predict_proba(X)
         classes = list(self.model.named_steps["clf"].classes_)
         try:
@@ -45,13 +55,16 @@ class MakerTakerModel:
         Returns:
             Series of 0/1 indicating taker(0)/maker(1).
         """
+        import pandas as pd
         preds = self.model.predict(X)
         return pd.Series(preds, name="maker_flag")
 
     def save(self, path: str):
         """Persist model to disk (joblib)."""
+        import joblib
         joblib.dump(self.model, path)
 
     def load(self, path: str):
         """Load model from disk (joblib)."""
+        import joblib
         self.model = joblib.load(path)
@@ -1,8 +1,9 @@
 import numpy as np
-import joblib
 from dataclasses import dataclass
 from typing import Optional
 
+from utils.profiling import timed
+
 
 @dataclass
 class AlmgrenChrissParams:
@@ -22,6 +23,7 @@ class AlmgrenChrissModel:
         self.params = params
         self.dt = self.params.T / self.params.N
 
+    @timed("AlmgrenChrissModel.optimal_trade_schedule")
     def optimal_trade_schedule(self) -> np.ndarray:
         """
         Returns:
@@ -41,13 +43,18 @@ class AlmgrenChrissModel:
             trade = np.full(N, X / N)
             return trade
 
-        sinh_kappaT = np.sinh(kappa * T)
-        x_t = X * (np.sinh(kappa * (T - times)) / sinh_kappaT)
+        if kappa * T > 700.0:
+            # sinh overflows; the ratio below tends to exp(-kappa t)
+            x_t = X * np.exp(-kappa * times)
+        else:
+            sinh_kappaT = np.sinh(kappa * T)
+            x_t = X * (np.sinh(kappa * (T - times)) / sinh_kappaT)
         x_next = np.append(x_t[1:], 0.0)
         trade_sizes = x_t - x_next
         trade_sizes *= (X / max(1e-12, trade_sizes.sum()))
         return trade_sizes
 
+    @timed("AlmgrenChrissModel.expected_cost")
     def expected_cost(self) -> float:
         """
         Compute an approximation of expected cost (implementation follows Almgren-Chriss formula).
@@ -75,8 +82,10 @@ class AlmgrenChrissModel:
         return float(temp_cost + perm_cost + risk_cost)
 
     def save(self, path: str):
+        import joblib
         joblib.dump(self.params, path)
 
     @staticmethod
     def load(path: str) -> AlmgrenChrissParams:
+        import joblib
         return joblib.load(path)
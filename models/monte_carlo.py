@@ -0,0 +1,128 @@
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Optional
+
+from models.market_impact import AlmgrenChrissModel, AlmgrenChrissParams
+
+
+@dataclass
+class CostDistribution:
+    mean: float
+    std: float
+    var: float          # value-at-risk of shortfall at `confidence`
+    cvar: float         # mean shortfall beyond VaR
+    confidence: float
+    n_paths: int
+    costs: Optional[np.ndarray] = field(default=None, repr=False)
+
+
+def summarize_costs(costs: np.ndarray, confidence: float = 0.95, keep_costs: bool = False) -> CostDistribution:
+    var = float(np.quantile(costs, confidence))
+    tail = costs[costs >= var]
+    return CostDistribution(
+        mean=float(costs.mean()),
+        std=float(costs.std(ddof=1)) if len(costs) > 1 else 0.0,
+        var=var,
+        cvar=float(tail.mean()) if len(tail) else var,
+        confidence=confidence,
+        n_paths=len(costs),
+        costs=costs if keep_costs else None,
+    )
+
+
+def _simulate_chunk(rng: np.random.Generator, n_paths: int, schedule: np.ndarray, s0: float,
+                    sigma: float, eta: float, gamma: float, dt: float, sign: float, process: str) -> np.ndarray:
+    n = len(schedule)
+    z = rng.standard_normal((n_paths, n))
+    # impact conventions follow AlmgrenChrissModel.expected_cost: a child of size n_k
+    # executes eta * n_k away from the pre-trade price and moves it by gamma * n_k
+    temp_cost = eta * float(schedule @ schedule)
+    perm_drift = sign * gamma * np.concatenate(([0.0], np.cumsum(schedule)[:-1]))
+
+    if process == "arithmetic":
+        # sum_k n_k * (S_{k-1} - S0) collapses to the noise weighted by inventory left after each step
+        remaining_after = schedule.sum() - np.cumsum(schedule)
+        noise = z @ remaining_after * (sigma * np.sqrt(dt))
+        return sign * noise + sign * float(schedule @ perm_drift) + temp_cost
+
+    log_steps = (sigma * np.sqrt(dt)) * z - 0.5 * sigma * sigma * dt
+    log_path = np.cumsum(log_steps, axis=1)
+    # pre-trade price before each slice: S0 for the first, then the diffused path
+    pre = np.empty_like(log_path)
+    pre[:, 0] = s0
+    np.exp(log_path[:, :-1], out=pre[:, 1:])
+    pre[:, 1:] *= s0
+    pre += perm_drift
+    return sign * ((pre - s0) @ schedule) + temp_cost
+
+
+def _simulate_shard(args) -> np.ndarray:
+    seed, n_paths, chunk_size, kwargs = args
+    rng = np.random.default_rng(seed)
+    out = np.empty(n_paths)
+    for start in range(0, n_paths, chunk_size):
+        stop = min(start + chunk_size, n_paths)
+        out[start:stop] = _simulate_chunk(rng, stop - start, **kwargs)
+    return out
+
+
+class ExecutionCostSimulator:
+    """
+    Monte Carlo distribution of implementation shortfall for a trade schedule.
+
+    Prices follow either an arithmetic random walk (sigma in price units per
+    sqrt(time unit)) or GBM (sigma as return volatility per sqrt(time unit)),
+    with the same temporary/permanent impact terms as AlmgrenChrissModel.
+    Permanent impact is added on top of the diffused price, not compounded by it.
+    Paths are generated in (chunk_size, N) blocks so memory stays bounded.
+    """
+
+    PROCESSES = ("arithmetic", "gbm")
+
+    def __init__(self, params: AlmgrenChrissParams, s0: float, side: str = "Sell",
+                 process: str = "arithmetic", seed: Optional[int] = None):
+        if process not in self.PROCESSES:
+            raise ValueError(f"Unknown price process: {process}")
+        if side not in ("Buy", "Sell"):
+            raise ValueError(f"Unknown side: {side}")
+        self.params = params
+        self.model = AlmgrenChrissModel(params)
+        self.s0 = float(s0)
+        self.side = side
+        self.process = process
+        self.seed = seed
+
+    def simulate(self, n_paths: int = 10_000, schedule: Optional[np.ndarray] = None,
+                 confidence: float = 0.95, chunk_size: int = 20_000, processes: Optional[int] = None,
+                 keep_costs: bool = False) -> CostDistribution:
+        """
+        Args:
+            schedule: child sizes per slice (defaults to the optimal AC schedule)
+            processes: shard paths over this many worker processes (None/1 = in-process)
+            keep_costs: attach the per-path shortfall array to the result
+
+        Returns:
+            CostDistribution of shortfall (positive = cost, price units x shares)
+        """
+        if n_paths <= 0 or chunk_size <= 0:
+            raise ValueError("n_paths and chunk_size must be > 0")
+        if schedule is None:
+            schedule = self.model.optimal_trade_schedule()
+        kwargs = dict(
+            schedule=np.asarray(schedule, dtype=np.float64), s0=self.s0, sigma=self.params.sigma,
+            eta=self.params.eta, gamma=self.params.gamma, dt=self.model.dt,
+            sign=1.0 if self.side == "Buy" else -1.0, process=self.process,
+        )
+
+        shards = max(1, int(processes or 1))
+        seeds = np.random.SeedSequence(self.seed).spawn(shards)
+        sizes = [n_paths // shards + (1 if i < n_paths % shards else 0) for i in range(shards)]
+        jobs = [(seed, size, chunk_size, kwargs) for seed, size in zip(seeds, sizes) if size > 0]
+
+        if shards == 1:
+            costs = _simulate_shard(jobs[0])
+        else:
+            with ProcessPoolExecutor(max_workers=shards) as pool:
+                costs = np.concatenate(list(pool.map(_simulate_shard, jobs)))
+        return summarize_costs(costs, confidence, keep_costs)
@@ -0,0 +1,211 @@
+from dataclasses import dataclass
+from typing import Optional, Sequence, Tuple
+import numpy as np
+
+from models.cost_estimator import CostEstimator
+from utils.profiling import timed
+
+# ScenarioGrid arrays that matrix() / heatmap() can return
+METRICS = (
+    "slippage_bps", "slippage_cost", "impact_cost", "fee_rate", "fee_cost", "total_cost", "total_cost_bps",
+    "depth_exhausted",
+)
+
+
+@dataclass
+class ScenarioGrid:
+    """
+    Pre-trade costs over sizes x horizons x fee tiers against one book version.
+
+    Each metric is stored at its natural shape (slippage depends on size only,
+    impact on size and horizon, fees on tier and size); matrix() broadcasts any
+    of them to a (sizes, horizons) heatmap for one tier.
+    """
+    instrument: str
+    side: str
+    order_type: str
+    sizes: np.ndarray            # (S,) order sizes in USD
+    horizons: np.ndarray         # (H,) execution horizons in seconds
+    tiers: Tuple[str, ...]       # (F,) fee tier names
+    mid_price: float
+    maker_prob: float
+    book_version: int
+    slippage_bps: np.ndarray     # (S,)
+    slippage_cost: np.ndarray    # (S,)
+    depth_exhausted: np.ndarray  # (S,) order larger than the visible book
+    impact_cost: np.ndarray      # (S, H)
+    fee_rate: np.ndarray         # (F,)
+    fee_cost: np.ndarray         # (F, S)
+    total_cost: np.ndarray       # (F, S, H)
+    total_cost_bps: np.ndarray   # (F, S, H)
+
+    @property
+    def shape(self) -> Tuple[int, int, int]:
+        return len(self.tiers), len(self.sizes), len(self.horizons)
+
+    def matrix(self, metric: str = "total_cost_bps", tier: Optional[str] = None) -> np.ndarray:
+        """
+        Args:
+            metric: one of METRICS
+            tier: fee tier (default: the first one)
+
+        Returns:
+            (sizes, horizons) array, read-only when broadcast from a smaller shape
+        """
+        if metric not in METRICS:
+            raise ValueError(f"Unknown metric: {metric}")
+        f = self.tiers.index(tier) if tier is not None else 0
+        value = getattr(self, metric)
+        if metric in ("total_cost", "total_cost_bps"):
+            value = value[f]
+        elif metric == "fee_cost":
+            value = value[f][:, None]
+        elif metric == "fee_rate":
+            value = value[f]
+        elif metric != "impact_cost":
+            value = value[:, None]
+        return np.broadcast_to(value, (len(self.sizes), len(self.horizons)))
+
+    def heatmap(self, metric: str = "total_cost_bps", tier: Optional[str] = None):
+        """matrix() as a DataFrame indexed by size (USD) with one column per horizon (s)."""
+        import pandas as pd
+        return pd.DataFrame(
+            self.matrix(metric, tier),
+            index=pd.Index(self.sizes, name="size_usd"),
+            columns=pd.Index(self.horizons, name="horizon_s"),
+        )
+
+
+class ScenarioEngine:
+    """
+    What-if costs for a whole grid of order sizes, horizons and fee tiers in one
+    vectorized pass over the book held by a CostEstimator. Every cell matches
+    CostEstimator.estimate() for that size with horizon_s set to the horizon and
+    the fee model on that tier.
+
+        engine = ScenarioEngine(estimator)
+        grid = engine.evaluate("BTC-USDT", "Buy", size_grid(100, 1e6, 100), horizon_grid(10, 3600, 50))
+        grid.heatmap("total_cost_bps", "Tier 2")
+
+    Grids are memoized with the estimator's per-version results, so reruns within
+    one book version are free; update_book() starts over.
+    """
+
+    def __init__(self, estimator: CostEstimator):
+        self.estimator = estimator
+
+    @timed("ScenarioEngine.evaluate")
+    def evaluate(self, instrument: str, side: str, sizes: Sequence[float], horizons: Sequence[float],
+                 tiers: Optional[Sequence[str]] = None, order_type: str = "Market",
+                 limit_price: Optional[float] = None, slices: Optional[int] = None,
+                 volatility: Optional[float] = None) -> ScenarioGrid:
+        """
+        Args:
+            sizes: order sizes in USD (> 0)
+            horizons: execution horizons in seconds (> 0)
+            tiers: fee tier names (default: every tier of the estimator's fee schedule)
+            slices: Almgren-Chriss slices per horizon (default: the estimator's)
+            volatility: fractional volatility per sqrt(second), as for CostEstimator.estimate()
+        """
+        if side not in ("Buy", "Sell"):
+            raise ValueError(f"Unknown side: {side}")
+        if order_type not in ("Market", "Limit"):
+            raise ValueError(f"Unknown order type: {order_type}")
+        sizes = np.asarray(sizes, dtype=np.float64).ravel()
+        horizons = np.asarray(horizons, dtype=np.float64).ravel()
+        if not len(sizes) or (sizes <= 0).any():
+            raise ValueError("sizes must be non-empty and > 0")
+        if not len(horizons) or (horizons <= 0).any():
+            raise ValueError("horizons must be non-empty and > 0")
+        estimator = self.estimator
+        schedule = estimator.fee_model.schedule
+        tiers = tuple(tiers) if tiers is not None else tuple(t.name for t in schedule.tiers)
+        slices = int(slices or estimator.slices)
+        if slices <= 0:
+            raise ValueError("slices must be > 0")
+        book = estimator.book(instrument)
+        volatility = book.volatility if volatility is None else float(volatility)
+
+        params = estimator.impact_params.get(instrument)
+        key = ("scenario", side, order_type, limit_price, sizes.tobytes(), horizons.tobytes(), tiers, slices,
+               params, volatility)
+        cached = book.recall(key)
+        if cached is not None:
+            return cached
+
+        # slippage: one walk of the visible book for every size
+        qty = sizes / book.mid
+        taker_price, exhausted = book.walk_many(side, qty)
+        sign = 1.0 if side == "Buy" else -1.0
+        if estimator.slippage_model is not None:
+            slippage_bps = estimator.predict_slippage(book, sizes, volatility)
+        else:
+            slippage_bps = sign * (taker_price - book.mid) / book.mid * 1e4
+        maker_prob = estimator.maker_prob(book, side, order_type, limit_price, volatility)
+        slippage_bps = slippage_bps * (1.0 - maker_prob)
+        slippage_cost = sizes * slippage_bps / 1e4
+
+        impact_cost = np.zeros((len(sizes), len(horizons)))
+        if params is not None:
+            impact_cost = almgren_chriss_costs(qty, horizons, volatility * book.mid, *params, slices)
+
+        rates = [schedule.get(t) for t in tiers]
+        fee_rate = np.array([maker_prob * r.maker + (1.0 - maker_prob) * r.taker for r in rates])
+        fee_cost = fee_rate[:, None] * sizes[None, :]
+        total = slippage_cost[None, :, None] + impact_cost[None, :, :] + fee_cost[:, :, None]
+
+        grid = ScenarioGrid(
+            instrument=instrument, side=side, order_type=order_type, sizes=sizes, horizons=horizons,
+            tiers=tiers, mid_price=book.mid, maker_prob=maker_prob, book_version=book.version,
+            slippage_bps=slippage_bps, slippage_cost=slippage_cost, depth_exhausted=exhausted,
+            impact_cost=impact_cost, fee_rate=fee_rate, fee_cost=fee_cost,
+            total_cost=total, total_cost_bps=total / sizes[None, :, None] * 1e4,
+        )
+        book.remember(key, grid)
+        return grid
+
+
+def almgren_chriss_costs(qty: np.ndarray, horizons: np.ndarray, sigma: float, eta: float, gamma: float,
+                         slices: int) -> np.ndarray:
+    """
+    AlmgrenChrissModel.expected_cost() for every (qty, horizon) pair.
+
+    The optimal schedule scales linearly with the order size, so each horizon
+    needs one unit schedule and the cost is a quadratic in qty:
+    eta * q^2 * sum(u^2) + gamma * q^2 / 2 + sigma * sqrt(T / N) * q * sum(|inventory|).
+    With qty in base units, eta and gamma in price per unit of qty and sigma in
+    price units per sqrt(second), every term is in quote currency.
+
+    Returns:
+        (len(qty), len(horizons)) array
+    """
+    qty = np.asarray(qty, dtype=np.float64)
+    horizons = np.asarray(horizons, dtype=np.float64)
+    kappa = np.sqrt(gamma / eta) * sigma if eta > 0 and gamma > 0 else 0.0
+    if kappa == 0.0:
+        unit = np.full((len(horizons), slices), 1.0 / slices)
+    else:
+        times = np.linspace(0.0, 1.0, slices)[None, :] * horizons[:, None]
+        kT = kappa * horizons[:, None]
+        with np.errstate(over="ignore", invalid="ignore"):
+            remaining = np.sinh(kT - kappa * times) / np.sinh(kT)
+        # sinh overflows for long horizons, where the ratio tends to exp(-kappa t)
+        remaining = np.where(kT > 700.0, np.exp(-kappa * times), remaining)
+        unit = remaining - np.concatenate((remaining[:, 1:], np.zeros((len(horizons), 1))), axis=1)
+        unit /= np.maximum(1e-12, unit.sum(axis=1, keepdims=True))
+    temp = eta * (unit ** 2).sum(axis=1)
+    inventory = np.abs(np.cumsum(unit, axis=1) - unit).sum(axis=1)
+    risk = sigma * np.sqrt(horizons / slices) * inventory
+    return (temp[None, :] + 0.5 * gamma) * (qty ** 2)[:, None] + risk[None, :] * qty[:, None]
+
+
+def size_grid(low: float, high: float, n: int) -> np.ndarray:
+    """n log-spaced order sizes (USD) from low to high."""
+    if not 0 < low <= high or n <= 0:
+        raise ValueError("need 0 < low <= high and n > 0")
+    return np.geomspace(low, high, n)
+
+
+def horizon_grid(low: float, high: float, n: int) -> np.ndarray:
+    """n log-spaced execution horizons (seconds) from low to high."""
+    return size_grid(low, high, n)
@@ -1,14 +1,22 @@
+from __future__ import annotations
+
 import numpy as np
-import pandas as pd
-from sklearn.linear_model import LinearRegression
-from sklearn.preprocessing import PolynomialFeatures
-from sklearn.pipeline import Pipeline
-from typing import Optional
-import joblib
+from typing import TYPE_CHECKING, Optional
+
+# sklearn / pandas / joblib are imported on first use so feed workers that
+# never touch the model don't pay for them at start-up
+if TYPE_CHECKING:
+    import pandas as pd
+
+from utils.profiling import timed
 
 class SlippageModel:
 
     def __init__(self, degree: int = 1):
+        from sklearn.linear_model import LinearRegression
+        from sklearn.preprocessing import PolynomialFeatures
+        from sklearn.pipeline import Pipeline
+
         self.degree = int(degree)
         steps = []
         if self.degree > 1:
@@ -27,6 +35,7 @@ class SlippageModel:
             raise ValueError("Empty X or y passed to fit()")
         self.pipeline.fit(X, y)
 
+    @timed("SlippageModel.predict")
     def predict(self, X: pd.DataFrame) -> np.ndarray:
         """
         Predict slippage values for given features.
@@ -36,9 +45,11 @@ class SlippageModel:
         return self.pipeline.predict(X)
 
     def save(self, path: str):
+        import joblib
         joblib.dump({"degree": self.degree, "pipeline": self.pipeline}, path)
 
     def load(self, path: str):
+        import joblib
         obj = joblib.load(path)
         self.degree = obj.get("degree", 1)
         self.pipeline = obj["pipeline"]
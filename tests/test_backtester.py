@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from models.backtester import ExecutionBacktester
+from models.market_impact import AlmgrenChrissParams
+from utils.fill_model import walk_book, walk_book_batch
+
+
+def _ladder(best: float, step: float, sizes) -> np.ndarray:
+    return np.array([[best + step * i, s] for i, s in enumerate(sizes)], dtype=np.float64)
+
+
+def _history(n: int = 10):
+    ts = np.arange(n, dtype=np.float64) * 10.0 + 1000.0
+    bids = np.stack([_ladder(100.0 + i, -0.5, (1.0, 2.0, 3.0)) for i in range(n)])
+    asks = np.stack([_ladder(100.5 + i, 0.5, (1.0, 2.0, 3.0)) for i in range(n)])
+    return ts, bids, asks
+
+
+def test_walk_book_best_first():
+    asks = _ladder(100.0, 1.0, (1.0, 2.0, 3.0))
+    assert walk_book(asks, 2.5) == (2.5, 100.0 + 101.0 * 1.5)
+    assert walk_book(asks, 10.0) == (6.0, 100.0 + 202.0 + 306.0)
+    asks[1] = np.nan
+    assert walk_book(asks, 2.0) == (2.0, 100.0 + 102.0)
+
+
+def test_walk_book_batch_matches_walk_book():
+    rng = np.random.default_rng(0)
+    books = np.stack([_ladder(100.0, 0.1, rng.uniform(0.1, 2.0, 8)) for _ in range(50)])
+    qty = rng.uniform(0.0, 20.0, 50)
+    filled, notional = walk_book_batch(books, qty)
+    for i in range(50):
+        want = walk_book(books[i], qty[i])
+        assert np.isclose(filled[i], want[0]) and np.isclose(notional[i], want[1])
+
+
+def test_slices_use_the_latest_book_at_or_before_each_boundary():
+    bt = ExecutionBacktester(*_history())
+    params = AlmgrenChrissParams(sigma=0.0, eta=0.0, gamma=0.0, T=40.0, X=4.0, N=4)
+    result = bt.run(params, "Buy", start_ts=1005.0)
+    # boundaries 1005, 1015, 1025, 1035 hit books 0..3, one unit at each best ask
+    assert result.filled_qty == 4.0
+    assert result.notional == 100.5 + 101.5 + 102.5 + 103.5
+    assert result.arrival_mid == 100.25
+
+
+def test_start_before_history_is_rejected():
+    bt = ExecutionBacktester(*_history())
+    params = AlmgrenChrissParams(sigma=0.0, eta=0.0, gamma=0.0, T=40.0, X=4.0, N=4)
+    with pytest.raises(ValueError):
+        bt.run(params, "Buy", start_ts=999.0)
+
+
+def test_arrival_mid_skips_one_sided_books():
+    ts, bids, asks = _history()
+    bids[2, 0] = np.nan
+    bt = ExecutionBacktester(ts, bids, asks)
+    params = AlmgrenChrissParams(sigma=0.0, eta=0.0, gamma=0.0, T=10.0, X=1.0, N=1)
+    assert bt.run(params, "Sell", start_ts=1020.0).arrival_mid == 101.25
+    bids[:3, 0] = np.nan
+    with pytest.raises(ValueError):
+        ExecutionBacktester(ts, bids, asks).run(params, "Sell", start_ts=1020.0)
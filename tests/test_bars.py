@@ -0,0 +1,29 @@
+import numpy as np
+
+from utils.bars import BarAggregator
+
+
+def test_adjacent_coarse_buckets_survive():
+    bars = BarAggregator()
+    for ts in (0.5, 1.5, 59.5, 60.2):
+        bars.add_tick(ts, ts, 1.0, 2.0)
+    minute = bars.bars("1m")
+    assert minute["start"].tolist() == [0.0, 60.0]
+    assert minute["mid_open"].tolist() == [0.5, 60.2]
+    assert minute["mid_close"].tolist() == [59.5, 60.2]
+
+
+def test_rolled_up_bars_match_ticks():
+    rng = np.random.default_rng(0)
+    ts = np.sort(rng.uniform(0, 20_000, 3000))
+    mids = rng.normal(100.0, 1.0, 3000)
+    bars = BarAggregator()
+    for t, mid in zip(ts.tolist(), mids.tolist()):
+        bars.add_tick(t, mid, 0.1, 1.0)
+    for resolution in (60, 300, 3600):
+        out = bars.bars(resolution)
+        assert out["start"].tolist() == np.unique(np.floor(ts / resolution) * resolution).tolist()
+        for row in out:
+            sel = mids[(ts >= row["start"]) & (ts < row["start"] + resolution)]
+            assert (row["mid_open"], row["mid_high"], row["mid_low"], row["mid_close"]) == \
+                (sel[0], sel.max(), sel.min(), sel[-1])
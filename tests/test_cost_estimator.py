@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from models.cost_estimator import CostEstimator, _BookState
+from models.market_impact import AlmgrenChrissModel, AlmgrenChrissParams
+from models.scenario_engine import ScenarioEngine, size_grid, horizon_grid
+
+
+def _book(mid: float = 30_000.0, levels: int = 20):
+    steps = np.arange(levels) * 0.5 + 0.05
+    sizes = np.linspace(0.5, 3.0, levels)
+    bids = np.column_stack((mid - steps, sizes))
+    asks = np.column_stack((mid + steps, sizes))
+    return bids, asks
+
+
+def _estimator(**kwargs):
+    estimator = CostEstimator(impact_params={"BTC-USDT": (0.02, 0.001)}, **kwargs)
+    estimator.update_book("BTC-USDT", *_book(), volatility=3e-4, version=1)
+    return estimator
+
+
+def test_impact_is_in_quote_currency():
+    estimator = _estimator()
+    result = estimator.estimate("BTC-USDT", "Buy", 150_000.0)
+    params = AlmgrenChrissParams(sigma=3e-4 * result.mid_price, eta=0.02, gamma=0.001,
+                                 T=estimator.horizon_s, X=result.qty, N=estimator.slices)
+    assert result.impact_cost == pytest.approx(AlmgrenChrissModel(params).expected_cost())
+    # the risk term alone is worth well over a dollar on a $150k order
+    no_risk = AlmgrenChrissModel(AlmgrenChrissParams(**{**params.__dict__, "sigma": 0.0})).expected_cost()
+    assert result.impact_cost - no_risk > 1.0
+
+
+def test_scenario_grid_matches_estimate():
+    estimator = _estimator()
+    sizes, horizons = size_grid(100.0, 1e6, 7), horizon_grid(5.0, 3600.0, 4)
+    grid = ScenarioEngine(estimator).evaluate("BTC-USDT", "Sell", sizes, horizons)
+    for j, horizon in enumerate(horizons):
+        estimator.horizon_s = horizon
+        for tier in grid.tiers:
+            for i, size in enumerate(sizes):
+                want = estimator.estimate("BTC-USDT", "Sell", size, tier=tier)
+                assert grid.matrix("impact_cost", tier)[i, j] == pytest.approx(want.impact_cost, rel=1e-9)
+                assert grid.matrix("total_cost", tier)[i, j] == pytest.approx(want.total_cost, rel=1e-9)
+                assert bool(grid.depth_exhausted[i]) == want.depth_exhausted
+
+
+def test_memo_is_bounded():
+    estimator = _estimator()
+    for i in range(_BookState.MEMO_SIZE * 3):
+        estimator.estimate("BTC-USDT", "Buy", 100.0 + i)
+    memo = estimator.book("BTC-USDT").memo
+    assert len(memo) == _BookState.MEMO_SIZE
+    first = estimator.estimate("BTC-USDT", "Buy", 42.0)
+    assert estimator.estimate("BTC-USDT", "Buy", 42.0) is first
+
+
+def test_sessions_with_different_volatility_share_one_book():
+    # two dashboard sessions on one cached estimator: same book version, different sliders
+    estimator = _estimator()
+    engine = ScenarioEngine(estimator)
+    book = estimator.book("BTC-USDT")
+    sizes, horizons = size_grid(1e3, 1e6, 5), horizon_grid(10.0, 600.0, 3)
+    calm = estimator.estimate("BTC-USDT", "Buy", 150_000.0, volatility=1e-4)
+    calm_grid = engine.evaluate("BTC-USDT", "Buy", sizes, horizons, volatility=1e-4)
+    estimator.update_book("BTC-USDT", *_book(), version=1)
+    wild = estimator.estimate("BTC-USDT", "Buy", 150_000.0, volatility=5e-3)
+    engine.evaluate("BTC-USDT", "Buy", sizes, horizons, volatility=5e-3)
+
+    assert estimator.book("BTC-USDT") is book
+    assert wild.impact_cost > calm.impact_cost
+    assert estimator.estimate("BTC-USDT", "Buy", 150_000.0, volatility=1e-4) is calm
+    assert engine.evaluate("BTC-USDT", "Buy", sizes, horizons, volatility=1e-4) is calm_grid
+    # without an argument the volatility given to update_book() applies
+    default = estimator.estimate("BTC-USDT", "Buy", 150_000.0)
+    assert default == estimator.estimate("BTC-USDT", "Buy", 150_000.0, volatility=3e-4)
+    with pytest.raises(KeyError):
+        estimator.book("ETH-USDT")
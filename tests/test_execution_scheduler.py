@@ -0,0 +1,73 @@
+import math
+import queue
+
+import numpy as np
+import pytest
+
+from models.execution_scheduler import SECONDS_PER_YEAR, AdaptiveScheduler
+from models.market_impact import AlmgrenChrissModel, AlmgrenChrissParams
+
+# kappa = sigma_per_second * sqrt(gamma / eta) ~ 0.01 / s, so kappa * T ~ 6 over 600 s
+PARAMS = AlmgrenChrissParams(sigma=0.8, eta=1e-4, gamma=0.5, T=600.0, X=40.0, N=12)
+
+
+def _run(scheduler, parents, start, dt, n_slices):
+    """Tick every boundary, fill every child in full; returns parent id -> child sizes."""
+    children = {p: [] for p in parents}
+    for k in range(n_slices + 1):
+        ts = start + k * dt
+        while scheduler.on_tick(ts):
+            while not scheduler.events.empty():
+                child = scheduler.events.get_nowait()
+                assert child.ts == ts and child.slice_index == len(children[child.parent_id])
+                children[child.parent_id].append(child.qty)
+                scheduler.on_fill(child.parent_id, child.qty, 100.0)
+    return children
+
+
+@pytest.mark.parametrize("gamma", [PARAMS.gamma, 50.0])
+def test_resolve_matches_closed_form_schedule_with_constant_params(gamma):
+    params = AlmgrenChrissParams(**{**PARAMS.__dict__, "gamma": gamma})
+    scheduler = AdaptiveScheduler()
+    parent = scheduler.submit("BTC-USDT", "Buy", params, start_ts=0.0)
+    children = _run(scheduler, [parent], 0.0, params.T / params.N, params.N)[parent]
+
+    # optimal_trade_schedule puts N points on [0, T] (the last trade is empty), so
+    # N + 1 points give the scheduler's grid of N slices of T / N
+    sigma = params.sigma / math.sqrt(SECONDS_PER_YEAR)
+    grid = AlmgrenChrissParams(sigma, params.eta, gamma, params.T, params.X, params.N + 1)
+    expected = AlmgrenChrissModel(grid).optimal_trade_schedule()
+    assert expected[-1] == pytest.approx(0.0, abs=1e-9)
+    # a parent within 1e-12 of its total is done, so a steep schedule ends early
+    done = len(children)
+    np.testing.assert_allclose(children, expected[:done], rtol=1e-6, atol=1e-12)
+    assert expected[done:].sum() <= params.X * 1e-12
+    assert sum(children) == pytest.approx(params.X)
+    assert len(scheduler) == 0
+
+
+def test_no_permanent_impact_trades_twap():
+    params = AlmgrenChrissParams(**{**PARAMS.__dict__, "gamma": 0.0})
+    scheduler = AdaptiveScheduler()
+    parent = scheduler.submit("BTC-USDT", "Buy", params, start_ts=0.0)
+    children = _run(scheduler, [parent], 0.0, params.T / params.N, params.N)[parent]
+    np.testing.assert_allclose(children, np.full(params.N, params.X / params.N))
+
+
+def test_bounded_events_queue_defers_instead_of_losing_children():
+    dt = PARAMS.T / PARAMS.N
+
+    def schedulers(events):
+        scheduler = AdaptiveScheduler(events=events)
+        return scheduler, [scheduler.submit("ETH-USDT", "Sell", PARAMS, start_ts=0.0) for _ in range(5)]
+
+    bounded, parents = schedulers(queue.Queue(maxsize=1))
+    assert bounded.on_tick(0.0) == 1
+    status = [bounded.status(p) for p in parents]
+    assert [s["slices_done"] for s in status] == [1, 0, 0, 0, 0]
+    assert all(s["next_ts"] == 0.0 for s in status[1:])
+
+    bounded, parents = schedulers(queue.Queue(maxsize=1))
+    free, _ = schedulers(None)
+    assert _run(bounded, parents, 0.0, dt, PARAMS.N) == _run(free, parents, 0.0, dt, PARAMS.N)
+    assert all(bounded.status(p)["filled"] == pytest.approx(PARAMS.X) for p in parents)
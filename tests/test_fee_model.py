@@ -0,0 +1,49 @@
+import time
+
+import pytest
+
+import utils.fee_model as fee_model
+from utils.fee_model import SECONDS_PER_DAY, FeeModel, load_fee_schedules
+
+
+def test_default_schedule_comes_from_config(monkeypatch):
+    spot = load_fee_schedules()[("OKX", "spot")]
+    assert [(t.name, t.min_volume_30d, t.maker, t.taker) for t in FeeModel().schedule.tiers] == \
+        [(t.name, t.min_volume_30d, t.maker, t.taker) for t in spot.tiers]
+
+    monkeypatch.setattr(fee_model, "DEFAULT_FEE_CONFIG", "/nonexistent/fee_schedules.json")
+    monkeypatch.setattr(FeeModel, "_default_schedule", None)
+    fallback = FeeModel().schedule
+    assert [t.name for t in fallback.tiers] == list(FeeModel.FEE_TABLE)
+    assert fallback.get("Tier 2").taker == FeeModel.FEE_TABLE["Tier 2"]["taker"]
+
+
+def test_tiers_and_fees():
+    model = FeeModel("Tier 2")
+    assert model.calculate_fee(10_000.0, is_maker=False) == pytest.approx(15.0)
+    assert model.calculate_fees([100.0, 200.0], [True, False]).tolist() == pytest.approx([0.08, 0.3])
+    schedule = model.schedule
+    assert schedule.tier_for_volume(4_999_999).name == "Tier 1"
+    assert schedule.tier_for_volume(5_000_000).name == "Tier 2"
+    assert schedule.tier_for_volume(1e9).name == "Tier 3"
+    with pytest.raises(ValueError):
+        FeeModel("Tier 9")
+
+
+def test_auto_tier_follows_rolling_volume():
+    model = FeeModel(auto_tier=True)
+    day = 1000 * SECONDS_PER_DAY
+    assert model.record_fill(6_000_000, ts=day) == "Tier 2"
+    assert model.record_fill(5_000_000, ts=day + 1) == "Tier 3"
+    # both fills leave the 30-day window together
+    assert model.record_fill(1.0, ts=day + 30 * SECONDS_PER_DAY) == "Tier 1"
+
+
+def test_seeded_volume_rolls_off_gradually():
+    model = FeeModel.from_config(volume_30d=12_000_000)
+    assert model.tier == "Tier 3"
+    assert model.volume_30d.value() == pytest.approx(12_000_000)
+    now = time.time()
+    assert model.volume_30d.value(now + 1 * SECONDS_PER_DAY) == pytest.approx(11_600_000)
+    assert model.record_fill(0.0, ts=now + 6 * SECONDS_PER_DAY) == "Tier 2"
+    assert model.record_fill(0.0, ts=now + 18 * SECONDS_PER_DAY) == "Tier 1"
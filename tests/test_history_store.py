@@ -0,0 +1,47 @@
+import glob
+import os
+
+import numpy as np
+
+from utils.history_store import HISTORY_DTYPE, SEGMENT_SUFFIX, HistoryStore
+
+ROW = {"best_bid": 99.0, "best_ask": 101.0, "spread": 2.0, "mid_price": 100.0,
+       "total_bid_volume": 5.0, "total_ask_volume": 6.0}
+
+
+def _segment_bytes(spill_dir):
+    return sum(os.path.getsize(p) for p in glob.glob(os.path.join(spill_dir, f"*{SEGMENT_SUFFIX}")))
+
+
+def test_expiry_spills_in_chunks_and_rows_reads_everything_back(tmp_path):
+    spill_dir = str(tmp_path)
+    # 1000-row ring, one row a second, one minute of retention: rows expire one or two at a time
+    store = HistoryStore(1000 * HISTORY_DTYPE.itemsize, retention_s=60.0, spill_dir=spill_dir,
+                         spill_retention_s=None)
+    n = 10_000
+    for i in range(n):
+        store.append(i, float(i), ROW)
+
+    mem = store.memory()
+    assert mem["compacted_rows"] == n - len(store)
+    assert mem["spilled_segments"] == mem["compacted_rows"] // 125
+    assert mem["compacted_rows"] - 125 * mem["spilled_segments"] == mem["unspilled_rows"]
+    assert mem["spilled_bytes"] == _segment_bytes(spill_dir)
+    assert store.rows()["version"].tolist() == list(range(n))
+    assert store.rows(since=5000.5)["version"].tolist() == list(range(5001, n))
+
+    reopened = HistoryStore(1000 * HISTORY_DTYPE.itemsize, spill_dir=spill_dir, spill_retention_s=3600.0)
+    assert reopened.memory()["spilled_bytes"] == mem["spilled_bytes"]
+    reopened.append(0, float(n), ROW)
+    assert reopened.memory()["spilled_bytes"] == _segment_bytes(spill_dir) < mem["spilled_bytes"]
+    assert np.all(reopened.rows()["ts"][:-1] >= n - 3600 - 125)
+
+
+def test_quiet_feed_spills_by_time(tmp_path):
+    store = HistoryStore(1000 * HISTORY_DTYPE.itemsize, retention_s=60.0, spill_dir=str(tmp_path),
+                         spill_retention_s=None, spill_interval_s=600.0)
+    for i in range(0, 2000, 30):       # two rows a minute: far fewer than a chunk per interval
+        store.append(i, float(i), ROW)
+    mem = store.memory()
+    assert 2 <= mem["spilled_segments"] <= 3
+    assert store.rows()["ts"].tolist() == [float(i) for i in range(0, 2000, 30)]
@@ -0,0 +1,29 @@
+import threading
+
+import numpy as np
+import pytest
+
+from models.impact_calibration import ImpactCalibrator
+
+BIDS = np.array([[99.0, 1.0], [98.0, 2.0]])
+ASKS = np.array([[101.0, 1.0], [102.0, 2.0]])
+
+
+@pytest.mark.parametrize("update", [
+    lambda c: c.add_book("BTC-USDT", 10.0, BIDS, ASKS),
+    lambda c: c.add_trades("BTC-USDT", np.array([10.5, 11.5]), np.array([1.0, 2.0]), np.array([1, -1])),
+    lambda c: c.add_fill("BTC-USDT", 1.0, 101.5, "Buy", 101.0),
+    lambda c: c.set_prior("BTC-USDT", 0.1, 0.01),
+], ids=["add_book", "add_trades", "add_fill", "set_prior"])
+def test_updates_from_session_threads_are_serialized(update):
+    # main.py feeds one cached calibrator from every Streamlit session thread
+    calibrator = ImpactCalibrator(min_obs=1)
+    calibrator.add_book("BTC-USDT", 0.0, BIDS, ASKS)
+    worker = threading.Thread(target=update, args=(calibrator,))
+    with calibrator._lock:
+        worker.start()
+        worker.join(0.2)
+        assert worker.is_alive()
+    worker.join(5.0)
+    assert not worker.is_alive()
+    assert "BTC-USDT" in calibrator.params
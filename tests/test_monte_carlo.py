@@ -0,0 +1,46 @@
+import numpy as np
+
+from models.market_impact import AlmgrenChrissParams
+from models.monte_carlo import ExecutionCostSimulator
+
+
+PARAMS = AlmgrenChrissParams(sigma=0.5, eta=0.01, gamma=0.002, T=60.0, X=100.0, N=10)
+
+
+def _closed_form(sim, n):
+    remaining_after = n.sum() - np.cumsum(n)
+    mean = PARAMS.eta * (n @ n) + PARAMS.gamma * (PARAMS.X ** 2 - n @ n) / 2.0
+    std = PARAMS.sigma * np.sqrt(sim.model.dt) * np.linalg.norm(remaining_after)
+    return mean, std
+
+
+def test_arithmetic_paths_match_closed_form():
+    sim = ExecutionCostSimulator(PARAMS, s0=100.0, side="Sell", seed=7)
+    mean, std = _closed_form(sim, sim.model.optimal_trade_schedule())
+    dist = sim.simulate(n_paths=200_000, chunk_size=30_000)
+    assert abs(dist.mean - mean) < 4 * std / np.sqrt(dist.n_paths)
+    assert np.isclose(dist.std, std, rtol=0.01)
+    assert dist.mean <= dist.var <= dist.cvar
+
+
+def test_gbm_approaches_arithmetic_for_small_moves():
+    s0 = 1000.0
+    sim = ExecutionCostSimulator(
+        AlmgrenChrissParams(sigma=PARAMS.sigma / s0, eta=PARAMS.eta, gamma=PARAMS.gamma,
+                            T=PARAMS.T, X=PARAMS.X, N=PARAMS.N),
+        s0=s0, side="Buy", process="gbm", seed=3,
+    )
+    # same schedule for both: the optimal one depends on sigma
+    twap = np.full(PARAMS.N, PARAMS.X / PARAMS.N)
+    mean, std = _closed_form(ExecutionCostSimulator(PARAMS, s0=s0), twap)
+    dist = sim.simulate(n_paths=100_000, schedule=twap)
+    assert abs(dist.mean - mean) < 5 * std / np.sqrt(dist.n_paths)
+    assert np.isclose(dist.std, std, rtol=0.02)
+
+
+def test_seeded_runs_repeat_and_shard_sizes_add_up():
+    sim = ExecutionCostSimulator(PARAMS, s0=100.0, seed=11)
+    a = sim.simulate(n_paths=5000, chunk_size=1000, keep_costs=True)
+    b = sim.simulate(n_paths=5000, chunk_size=1000, keep_costs=True)
+    assert np.array_equal(a.costs, b.costs)
+    assert sim.simulate(n_paths=5001, processes=2).n_paths == 5001
@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+
+from utils.synthetic_market import MarketConfig, SyntheticMarket, concat_batches
+
+
+def _assert_same(a, b):
+    for name in ("ts", "bids", "asks", "seq", "trades", "trade_rows", "trade_ids"):
+        np.testing.assert_array_equal(getattr(a, name), getattr(b, name), err_msg=name)
+
+
+@pytest.mark.parametrize("chunk_events", [1, 777, 1000, 70_000, 200_000])
+def test_same_seed_same_data_for_any_chunking(chunk_events):
+    n = 150_000 if chunk_events > 1 else 3000
+    whole = SyntheticMarket(seed=3).generate(n)
+    market = SyntheticMarket(seed=3)
+    parts = list(market.chunks(n, chunk_events))
+    assert [len(p) for p in parts[:-1]] == [chunk_events] * (len(parts) - 1)
+    _assert_same(concat_batches(parts), whole)
+    assert market.events == n and market.trade_count == len(whole.trades)
+
+
+def test_consecutive_calls_continue_the_stream():
+    cfg = MarketConfig(rate=500.0, branching=0.7)
+    whole = SyntheticMarket(cfg, seed=5).generate(20_000)
+    market = SyntheticMarket(cfg, seed=5)
+    _assert_same(concat_batches([market.generate(5_000), market.generate(15_000)]), whole)
+    assert whole.seq.tolist() == list(range(20_000))
+    assert np.all(np.diff(whole.ts) >= 0)
+    np.testing.assert_array_equal(whole.trades["ts"], whole.ts[whole.trade_rows])
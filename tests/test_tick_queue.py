@@ -0,0 +1,24 @@
+import asyncio
+
+from websockets.async_ws_client import TickQueue
+
+
+def test_block_policy_never_drops_synchronously():
+    async def run():
+        q = TickQueue(2, "block")
+        assert q.put_nowait(1) and q.put_nowait(2)
+        assert not q.put_nowait(3)
+        return q.dropped, [await q.get(), await q.get()]
+
+    assert asyncio.run(run()) == (0, [1, 2])
+
+
+def test_drop_policies():
+    async def run(policy):
+        q = TickQueue(2, policy)
+        for i in range(4):
+            q.put_nowait(i)
+        return q.dropped, [await q.get(), await q.get()]
+
+    assert asyncio.run(run("drop_oldest")) == (2, [2, 3])
+    assert asyncio.run(run("drop_newest")) == (2, [0, 1])
@@ -0,0 +1,96 @@
+import math
+import sys
+import threading
+
+import numpy as np
+
+from websockets.trade_tape import BUY, TradeTape
+
+
+def _brute_force(trades, now, window_s):
+    inside = trades[trades["ts"] >= now - window_s]
+    if not len(inside):
+        return {"trade_count": 0}
+    px, sz = inside["px"], inside["sz"]
+    returns = np.diff(np.log(px))
+    return {
+        "trade_count": len(inside),
+        "volume": sz.sum(),
+        "vwap": (px * sz).sum() / sz.sum(),
+        "buy_volume": sz[inside["side"] == BUY].sum(),
+        "realized_vol": math.sqrt((returns ** 2).sum()),
+    }
+
+
+def _fill(tape, n, seed=0):
+    rng = np.random.default_rng(seed)
+    ts = np.cumsum(rng.exponential(0.05, n))
+    px = 100.0 * np.exp(np.cumsum(rng.normal(0.0, 1e-4, n)))
+    sz = rng.uniform(0.01, 2.0, n)
+    side = np.where(rng.random(n) < 0.5, 1, -1)
+    for row in zip(ts.tolist(), px.tolist(), sz.tolist(), side.tolist()):
+        tape.add(*row)
+    return ts[-1]
+
+
+def _check(tape, now):
+    trades = tape.buffer.last()
+    for window, agg in tape.windows.items():
+        got = agg.stats(now)
+        want = _brute_force(trades, now, window)
+        assert got["trade_count"] == want["trade_count"]
+        if not want["trade_count"]:
+            continue
+        for name in ("volume", "vwap", "buy_volume", "realized_vol"):
+            assert math.isclose(got[name], want[name], rel_tol=1e-9, abs_tol=1e-9), name
+
+
+def test_running_sums_match_brute_force():
+    tape = TradeTape(windows_s=(1.0, 10.0, 60.0))
+    now = _fill(tape, 5000)
+    _check(tape, now)
+    _check(tape, now + 5.0)
+
+
+def test_concurrent_stats_and_add():
+    tape = TradeTape(windows_s=(1.0, 10.0))
+    done = threading.Event()
+
+    def reader():
+        while not done.is_set():
+            trades = tape.buffer.last(1)
+            if len(trades):
+                tape.all_stats(float(trades["ts"][-1]))
+
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    readers = [threading.Thread(target=reader) for _ in range(4)]
+    try:
+        for t in readers:
+            t.start()
+        now = _fill(tape, 100_000, seed=1)
+    finally:
+        done.set()
+        for t in readers:
+            t.join()
+        sys.setswitchinterval(interval)
+    _check(tape, now)
+
+
+def test_since_keeps_trades_sharing_a_timestamp():
+    tape = TradeTape(capacity=8)
+    tape.add(1.0, 100.0, 1.0, BUY)
+    tape.add(2.0, 100.0, 2.0, BUY)
+    trades, position = tape.since(0)
+    assert trades["sz"].tolist() == [1.0, 2.0]
+
+    tape.add(2.0, 101.0, 3.0, BUY)       # same ts as the last trade already read
+    trades, position = tape.since(position)
+    assert trades["sz"].tolist() == [3.0]
+    assert len(tape.since(position)[0]) == 0
+
+    for i in range(10):                  # wraps the ring; only the newest 8 survive
+        tape.add(3.0 + i, 100.0, 4.0 + i, BUY)
+    trades, position = tape.since(position)
+    assert trades["sz"].tolist() == [6.0 + i for i in range(8)]
+    assert position == 13
@@ -0,0 +1,55 @@
+import json
+
+import numpy as np
+
+from tradesim import SimulatorService
+from utils.book_types import BookSnapshot, Tick
+
+
+def _book(bid_size):
+    bids = np.array([[100.0, bid_size], [99.9, 2.0]])
+    asks = np.array([[100.1, 1.5], [100.2, 2.5]])
+    return bids, asks
+
+
+def _push(service, client, bids, asks, ts):
+    # what OrderBookClient._apply_update does on the receive thread
+    tick = Tick(bids[0, 0], asks[0, 0], asks[:, 1].sum(), bids[:, 1].sum(), client.inst_id, str(int(ts * 1000)))
+    client.version += 1
+    client.last_changed = client.differ.update(client.version, tick, bids, asks)
+    service._on_update(client, tick, BookSnapshot(bids, asks))
+
+
+def test_worker_uses_diff_mask_and_falls_back_after_drops(tmp_path):
+    service = SimulatorService(["BTC-USDT"], record_dir=str(tmp_path), record_diffs=True)
+    key = ("OKX", "BTC-USDT")
+    client, q, stats = service.clients[key], service._queues[0], service.stats[key]
+
+    def drain():
+        while not q.empty():
+            service._process(*q.get_nowait())
+
+    _push(service, client, *_book(1.0), 1.0)
+    _push(service, client, *_book(1.0), 2.0)      # repeat
+    _push(service, client, *_book(3.0), 3.0)
+    drain()
+    assert (stats.ticks, stats.unchanged) == (3, 1)
+
+    # a changed book is dropped from the queue; the repeat after it has an empty mask
+    _push(service, client, *_book(4.0), 4.0)
+    q.get_nowait()
+    _push(service, client, *_book(4.0), 5.0)
+    assert client.last_changed == 0
+    drain()
+    assert (stats.ticks, stats.unchanged) == (4, 1)
+    assert service._last_books[key][0][0, 1] == 4.0
+
+    service.stop()
+    recorded = service.recorders[key].store.read()
+    assert recorded[0].tolist() == [1.0, 3.0, 5.0]    # (ts, bids, asks): repeats are not written
+
+    with open(tmp_path / "OKX_BTC-USDT.diffs.jsonl") as f:
+        diffs = [json.loads(line) for line in f]
+    assert [d["v"] for d in diffs] == [1, 3, 4]
+    assert diffs[0]["snapshot"] and len(diffs[0]["bids"]) == 2
+    assert diffs[1]["bids"] == [[100.0, 3.0]] and diffs[1]["asks"] == []
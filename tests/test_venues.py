@@ -0,0 +1,193 @@
+import json
+import time
+
+import numpy as np
+import pytest
+
+from utils.consolidated_book import ConsolidatedBook
+from websockets.fixture_server import FixtureServer
+from websockets.venues import OKXAdapter
+from websockets.ws_client import OrderBookClient
+
+
+def _client(url, venue, **kwargs):
+    # a short ping timeout bounds how long the receive loop takes to notice stop()
+    return OrderBookClient(url, venue=venue, ping_interval=1, ping_timeout=0.2, reconnect_base_delay=5.0, **kwargs)
+
+
+def _replay(frames, venue, until, **kwargs):
+    """Serve `frames` to a fresh client until until(client, server) holds; returns both."""
+    with FixtureServer(frames) as server:
+        client = _client(server.url, venue, **kwargs)
+        client.start()
+        try:
+            deadline = time.time() + 5.0
+            while not until(client, server) and time.time() < deadline:
+                time.sleep(0.01)
+        finally:
+            client.stop()
+    return client, server
+
+
+def _levels(book):
+    return book.bids.tolist(), book.asks.tolist()
+
+
+# ---- OKX `books`: snapshot + deltas with seqId/prevSeqId and a CRC32 checksum ----
+class _OKXBook:
+    """Server-side book that stamps each OKX message with seqs and the checksum of the result."""
+
+    def __init__(self):
+        self.bids, self.asks = {}, {}
+        self.seq = 0
+        self.adapter = OKXAdapter("books")
+
+    def message(self, bids, asks, snapshot=False, skip=0, bad_checksum=False):
+        if snapshot:
+            self.bids, self.asks = {}, {}
+        for levels, book in ((bids, self.bids), (asks, self.asks)):
+            for px, sz in levels:
+                if float(sz) > 0:
+                    book[px] = sz
+                else:
+                    book.pop(px, None)
+        prev = -1 if snapshot else self.seq + skip
+        self.seq += 1 + skip
+        checksum = self.adapter.checksum(
+            [f"{p}:{self.bids[p]}" for p in sorted(self.bids, key=float, reverse=True)[:25]],
+            [f"{p}:{self.asks[p]}" for p in sorted(self.asks, key=float)[:25]],
+        )
+        return json.dumps({
+            "arg": {"channel": "books", "instId": "BTC-USDT"},
+            "action": "snapshot" if snapshot else "update",
+            "data": [{
+                "bids": [[p, s, "0", "1"] for p, s in bids], "asks": [[p, s, "0", "1"] for p, s in asks],
+                "ts": str(1_700_000_000_000 + self.seq), "seqId": self.seq, "prevSeqId": prev,
+                "checksum": checksum + 1 if bad_checksum else checksum,
+            }],
+        })
+
+
+def _okx_frames(gap=False, bad_checksum=False):
+    book = _OKXBook()
+    return [
+        book.message([("100.0", "1"), ("99.5", "2")], [("100.5", "1"), ("101.0", "3")], snapshot=True),
+        book.message([("99.5", "0"), ("99.8", "4")], [], skip=1 if gap else 0),
+        book.message([], [("100.5", "2")], bad_checksum=bad_checksum),
+    ]
+
+
+def test_okx_books_deltas_and_checksums():
+    client, server = _replay(_okx_frames(), OKXAdapter("books"), lambda c, s: c.version >= 3)
+    assert client.version == 3 and client.resyncs == 0
+    assert _levels(client.get_latest_book()) == ([[100.0, 1.0], [99.8, 4.0]], [[100.5, 2.0], [101.0, 3.0]])
+
+
+@pytest.mark.parametrize("kind", ["gap", "checksum"])
+def test_okx_out_of_sync_resubscribes(kind):
+    frames = _okx_frames(gap=kind == "gap", bad_checksum=kind == "checksum")
+    # the resubscribe is one unsubscribe + one subscribe after the initial subscribe
+    client, server = _replay(frames, OKXAdapter("books"), lambda c, s: len(s.received) >= 3)
+    assert client.resyncs == 1
+    assert [json.loads(m)["op"] for m in server.received] == ["subscribe", "unsubscribe", "subscribe"]
+    assert client.venue_book.awaiting_snapshot
+    assert client.version == (1 if kind == "gap" else 2)
+
+
+# ---- Bybit: snapshot, then deltas with consecutive update ids ----
+def _bybit(kind, u, bids=(), asks=()):
+    return json.dumps({
+        "topic": "orderbook.50.BTCUSDT", "type": kind, "ts": 1_700_000_000_000 + u,
+        "data": {"s": "BTCUSDT", "b": [list(l) for l in bids], "a": [list(l) for l in asks], "u": u},
+    })
+
+
+def test_bybit_gap_resyncs_until_the_next_snapshot():
+    frames = [
+        _bybit("snapshot", 10, [("100", "1")], [("101", "1")]),
+        _bybit("delta", 11, [("100.5", "2")]),
+        _bybit("delta", 13, [], [("100.8", "1")]),       # 12 is missing
+        _bybit("delta", 14, [("100.6", "1")]),           # ignored until a snapshot
+        _bybit("snapshot", 20, [("99", "5")], [("102", "5")]),
+        _bybit("delta", 21, [], [("101.5", "1")]),
+    ]
+    client, server = _replay(frames, "Bybit", lambda c, s: c.version >= 4)
+    assert client.resyncs == 1
+    assert client.version == 4
+    assert _levels(client.get_latest_book()) == ([[99.0, 5.0]], [[101.5, 1.0], [102.0, 5.0]])
+    ops = [json.loads(m)["op"] for m in server.received]
+    assert ops == ["subscribe", "unsubscribe", "subscribe"]
+
+
+# ---- Binance: top-N partial depth snapshots ----
+def test_binance_snapshots_replace_the_book():
+    frames = [
+        json.dumps({"lastUpdateId": i, "bids": [[f"{100 - i}", "1"], [f"{99 - i}", "2"]],
+                    "asks": [[f"{101 - i}", "1"]]})
+        for i in range(3)
+    ]
+    client, server = _replay(frames, "Binance", lambda c, s: c.version >= 3)
+    assert json.loads(server.received[0])["params"] == ["btcusdt@depth10@100ms"]
+    assert _levels(client.get_latest_book()) == ([[98.0, 1.0], [97.0, 2.0]], [[99.0, 1.0]])
+
+
+def test_clients_feed_a_consolidated_book():
+    shared = ConsolidatedBook()
+    bybit = [_bybit("snapshot", 1, [("100.2", "1")], [("100.9", "2")])]
+    binance = [json.dumps({"lastUpdateId": 1, "bids": [["100.1", "3"]], "asks": [["100.7", "1"]]})]
+    _replay(bybit, "Bybit", lambda c, s: c.version >= 1, consolidated=shared)
+    # the Bybit client disconnected, which drops its levels
+    assert shared.venues == ["Bybit"] and not len(shared.bids)
+    with FixtureServer(bybit) as s1, FixtureServer(binance) as s2:
+        clients = [_client(s.url, v, consolidated=shared) for s, v in ((s1, "Bybit"), (s2, "Binance"))]
+        for c in clients:
+            c.start()
+        deadline = time.time() + 5.0
+        while any(c.version < 1 for c in clients) and time.time() < deadline:
+            time.sleep(0.01)
+        try:
+            assert shared.best("bids") == (100.2, "Bybit")
+            assert shared.best("asks") == (100.7, "Binance")
+        finally:
+            for c in clients:
+                c.stop()
+
+
+# ---- ConsolidatedBook merge and routing ----
+def _ladder_from_scratch(books, descending):
+    rows = [(p, s, i) for i, levels in enumerate(books) for p, s in levels]
+    rows.sort(key=lambda r: -r[0] if descending else r[0])
+    return rows
+
+
+def test_consolidated_updates_match_a_full_sort():
+    rng = np.random.default_rng(4)
+    book = ConsolidatedBook()
+    venues = ["A", "B", "C"]
+    current = {v: np.empty((0, 2)) for v in venues}
+    for _ in range(200):
+        v = venues[rng.integers(3)]
+        bids = np.column_stack((np.sort(np.round(rng.uniform(99, 100, 5), 1))[::-1], rng.uniform(0.1, 2, 5)))
+        asks = np.column_stack((np.sort(np.round(rng.uniform(100.1, 101, 5), 1)), rng.uniform(0.1, 2, 5)))
+        book.update(v, bids, asks)
+        current[v] = (bids, asks)
+        order = [current[name] for name in book.venues]
+        for side, descending, ladder in ((0, True, book.bids), (1, False, book.asks)):
+            want = _ladder_from_scratch([o[side] for o in order if len(o)], descending)
+            assert ladder[:, 0].tolist() == [r[0] for r in want]
+            assert sorted(map(tuple, ladder.tolist())) == sorted((p, s, float(i)) for p, s, i in want)
+    book.remove("B")
+    assert (book.bids[:, 2] != book.venues.index("B")).all()
+
+
+def test_route_splits_across_venues_and_prices_fees():
+    book = ConsolidatedBook()
+    book.update("A", np.array([[99.0, 1.0]]), np.array([[100.0, 1.0], [100.2, 1.0]]))
+    book.update("B", np.array([[99.1, 1.0]]), np.array([[100.1, 1.0]]))
+    result = book.route("Buy", 2.5)
+    assert result.filled == 2.5 and not result.depth_exhausted
+    assert result.allocations == {"A": {"qty": 1.5, "notional": 100.0 + 50.1}, "B": {"qty": 1.0, "notional": 100.1}}
+    # a 0.2% taker fee on A makes B's 100.1 cheaper than A's 100.0
+    first = book.route("Buy", 1.0, taker_fees={"A": 0.002})
+    assert first.allocations == {"B": {"qty": 1.0, "notional": 100.1}}
+    assert book.route("Sell", 5.0).depth_exhausted
@@ -0,0 +1,504 @@
+"""
+Headless simulator service: ingest, analytics, cost estimation and recording without Streamlit.
+
+    python -m tradesim run --instruments BTC-USDT,ETH-USDT
+    python -m tradesim run --instruments BTC-USDT --venues OKX,Binance --record data/ --metrics-port 9100
+    python -m tradesim run --instruments BTC-USDT --cost-port 8765 --workers 4 --duration 600
+    python -m tradesim run --instruments BTC-USDT --trades --impact-params config/impact_params.json
+    python -m tradesim run --instruments BTC-USDT --record data/ --record-diffs
+
+Each (venue, instrument) feed runs its own websocket client thread. Book updates are
+sharded by instrument onto --workers analytics threads, which update BookAnalytics,
+the CostEstimator and (with --record) a TickStore per feed; books that repeat the
+previous one (the client's diff mask is empty) skip all three. --record-diffs also
+writes every BookDiff (changed levels only) to a JSON-lines file per feed. With
+--processes the BookAnalytics signals move to a pool of worker processes fed through
+shared-memory rings (utils.analytics_pool) so they use more than one core. With --impact-params the
+estimator's (eta, gamma) are calibrated online from the books (and trades, with
+--trades) and saved to that file. SIGINT / SIGTERM stop
+the feeds, drain the worker queues and flush every recording buffer before exit.
+"""
+import argparse
+import json
+import os
+import queue
+import signal
+import sys
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+from loguru import logger
+
+from models.cost_estimator import CostEstimator, start_cost_server
+from models.impact_calibration import ImpactCalibrator
+from utils.analytics_pool import AnalyticsPool
+from utils.book_analytics import BookAnalytics
+from utils.book_diff import LEVELS, BookDiff, same_levels
+from utils.book_types import LEVEL_DTYPE
+from utils.consolidated_book import ConsolidatedBook
+from utils.profiling import PROFILER
+from utils.tick_store import TickStore
+from websockets.venues import ADAPTERS
+from websockets.ws_client import OrderBookClient, tick_time
+
+_STOP = object()
+
+
+class FeedRecorder:
+    """
+    Buffers top-N books for one feed and appends them to a TickStore in batches.
+    SimulatorService only adds books whose levels changed; a repeat adds nothing
+    to an as-of lookup.
+    """
+
+    def __init__(self, path: str, levels: int, inst_id: str, flush_rows: int = 1000):
+        self.store = TickStore(path, levels, inst_id)
+        self.levels = self.store.levels
+        self.flush_rows = flush_rows
+        self.rows = 0
+        self._ts: List[float] = []
+        self._bids: List[np.ndarray] = []
+        self._asks: List[np.ndarray] = []
+
+    def add(self, ts: float, bids: np.ndarray, asks: np.ndarray):
+        self._ts.append(ts)
+        self._bids.append(_pad(bids, self.levels))
+        self._asks.append(_pad(asks, self.levels))
+        if len(self._ts) >= self.flush_rows:
+            self.flush()
+
+    def flush(self):
+        if not self._ts:
+            return
+        self.store.append(np.array(self._ts), np.stack(self._bids), np.stack(self._asks))
+        self.rows += len(self._ts)
+        self._ts, self._bids, self._asks = [], [], []
+
+
+class DiffRecorder:
+    """
+    Appends every BookDiff of one feed (BookDiff.to_message(), one JSON object per
+    line) to a file. Subscribed with OrderBookClient.subscribe_diffs, so add() runs
+    on the receive thread and flush() on a worker.
+    """
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.rows = 0
+        self._file = open(path, "a", buffering=1 << 16)
+        self._lock = threading.Lock()
+
+    def add(self, diff: BookDiff):
+        line = json.dumps(diff.to_message(), separators=(",", ":")) + "\n"
+        with self._lock:
+            if not self._file.closed:
+                self._file.write(line)
+                self.rows += 1
+
+    def flush(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+def _pad(levels: np.ndarray, n: int) -> np.ndarray:
+    if len(levels) == n:
+        return levels
+    out = np.full((n, 2), np.nan, dtype=LEVEL_DTYPE)
+    out[:min(n, len(levels))] = levels[:n]
+    return out
+
+
+class FeedStats:
+    __slots__ = ("ticks", "dropped", "unchanged", "last_mid", "last_spread", "last_ts", "signals")
+
+    def __init__(self):
+        self.ticks = 0
+        self.dropped = 0
+        self.unchanged = 0      # updates that repeated the previous book
+        self.last_mid = float("nan")
+        self.last_spread = float("nan")
+        self.last_ts = 0.0
+        self.signals: Dict[str, float] = {}
+
+
+class SimulatorService:
+    """
+    Args:
+        instruments: instrument ids, e.g. ["BTC-USDT"]
+        venues: adapter names from websockets.venues.ADAPTERS
+        workers: analytics threads; each instrument is always handled by the same worker
+        record_dir: write one TickStore per feed under this directory
+        record_diffs: with record_dir, also write each feed's BookDiffs to
+            "<venue>_<inst>.diffs.jsonl" there
+        queue_size: per-worker backlog; the oldest update is dropped when full
+        processes: compute BookAnalytics signals in this many worker processes instead of
+            on the worker threads (0 = in-thread)
+        impact_params_path: calibrate the estimator's impact parameters online, loading
+            and saving them at this JSON path
+    """
+
+    def __init__(self, instruments: List[str], venues: List[str] = ("OKX",), url: Optional[str] = None,
+                 workers: int = 1, record_dir: Optional[str] = None, flush_rows: int = 1000,
+                 flush_interval_s: float = 5.0, queue_size: int = 10_000, top_n: int = 5,
+                 subscribe_trades: bool = False, processes: int = 0, impact_params_path: Optional[str] = None,
+                 record_diffs: bool = False):
+        if not instruments:
+            raise ValueError("Need at least one instrument")
+        for venue in venues:
+            if venue not in ADAPTERS:
+                raise ValueError(f"Unknown venue: {venue}")
+        if url and len(venues) > 1:
+            raise ValueError("--url can only be used with a single venue")
+        if record_diffs and not record_dir:
+            raise ValueError("--record-diffs needs --record")
+        self.instruments = list(instruments)
+        self.venues = list(venues)
+        self.workers = max(1, int(workers))
+        self.flush_interval_s = flush_interval_s
+        self.estimator = CostEstimator()
+        self.consolidated: Dict[str, ConsolidatedBook] = {}
+        self.stats: Dict[Tuple[str, str], FeedStats] = {}
+        self.recorders: Dict[Tuple[str, str], FeedRecorder] = {}
+        self.diff_recorders: Dict[Tuple[str, str], DiffRecorder] = {}
+        self._analytics: Dict[Tuple[str, str], BookAnalytics] = {}
+        # per feed, the last (bids, asks) and client version the worker processed
+        self._last_books: Dict[Tuple[str, str], Tuple[np.ndarray, np.ndarray]] = {}
+        self._last_versions: Dict[Tuple[str, str], int] = {}
+        self._queues = [queue.Queue(maxsize=queue_size) for _ in range(self.workers)]
+        self._threads: List[threading.Thread] = []
+        self.clients: Dict[Tuple[str, str], OrderBookClient] = {}
+        self.started_at = None
+        self._stopped = False
+        self.calibrator: Optional[ImpactCalibrator] = None
+        # per feed: (book ts of the last pull, trade tape position after it)
+        self._trades_seen: Dict[Tuple[str, str], Tuple[float, int]] = {}
+        if impact_params_path:
+            self.calibrator = ImpactCalibrator(path=impact_params_path).bind(self.estimator)
+        self.pool: Optional[AnalyticsPool] = None
+        self._pool_keys: Dict[str, Tuple[str, str]] = {}
+        if processes > 0:
+            self._pool_keys = {self.estimator_key(v, i): (v, i) for i in self.instruments for v in self.venues}
+            self.pool = AnalyticsPool(list(self._pool_keys), workers=processes, levels=top_n,
+                                      capacity=queue_size, on_result=self._on_analytics)
+
+        for inst in self.instruments:
+            shared = ConsolidatedBook() if len(self.venues) > 1 else None
+            if shared is not None:
+                self.consolidated[inst] = shared
+            for venue in self.venues:
+                key = (venue, inst)
+                self.stats[key] = FeedStats()
+                self._analytics[key] = BookAnalytics()
+                if record_dir:
+                    self.recorders[key] = FeedRecorder(
+                        os.path.join(record_dir, f"{venue}_{inst}"), top_n, inst, flush_rows,
+                    )
+                self.clients[key] = OrderBookClient(
+                    url, inst, venue=venue, top_n=top_n, consolidated=shared,
+                    subscribe_trades=subscribe_trades, on_update=self._on_update,
+                )
+                if record_diffs:
+                    recorder = DiffRecorder(os.path.join(record_dir, f"{venue}_{inst}.diffs.jsonl"))
+                    self.diff_recorders[key] = recorder
+                    self.clients[key].subscribe_diffs(recorder.add)
+
+    def estimator_key(self, venue: str, inst: str) -> str:
+        """CostEstimator instrument name: the plain id with one venue, "<inst>@<venue>" with several."""
+        return inst if len(self.venues) == 1 else f"{inst}@{venue}"
+
+    # ---- lifecycle ----
+    def start(self):
+        self.started_at = time.time()
+        if self.pool is not None:
+            self.pool.start()
+        for i, q in enumerate(self._queues):
+            t = threading.Thread(target=self._worker, args=(q,), name=f"tradesim-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        for client in self.clients.values():
+            client.start()
+        logger.warning(
+            f"tradesim running: {len(self.clients)} feeds ({', '.join(self.venues)} x {', '.join(self.instruments)}), "
+            f"{self.workers} workers" + (f", {self.pool.workers} analytics processes" if self.pool else "")
+        )
+
+    def stop(self, timeout: float = 10.0):
+        """Stop feeds, drain the worker queues and flush recordings."""
+        if self._stopped:
+            return
+        self._stopped = True
+        for client in self.clients.values():
+            client.stop()
+        for q in self._queues:
+            q.put(_STOP)
+        for t in self._threads:
+            t.join(timeout)
+        if self.pool is not None:
+            self.pool.stop(timeout)
+        for recorder in self.recorders.values():
+            recorder.flush()
+        for recorder in self.diff_recorders.values():
+            recorder.close()
+        if self.calibrator is not None:
+            self.calibrator.save()
+        ticks = sum(s.ticks for s in self.stats.values())
+        dropped = sum(s.dropped for s in self.stats.values())
+        recorded = sum(r.rows for r in self.recorders.values())
+        logger.warning(f"tradesim stopped: {ticks} updates processed, {dropped} dropped, {recorded} rows recorded")
+
+    # ---- ingest ----
+    def _on_update(self, client: OrderBookClient, tick, book):
+        # receive thread: hand off and return; the worker owns all per-feed state
+        key = (client.adapter.name, client.inst_id)
+        q = self._queues[zlib.crc32(client.inst_id.encode()) % self.workers]
+        item = (key, tick_time(tick), book, client.version, client.last_changed)
+        # drop-oldest; other feeds' receive threads share this queue, so retry until the put lands
+        while True:
+            try:
+                q.put_nowait(item)
+                return
+            except queue.Full:
+                pass
+            try:
+                evicted = q.get_nowait()
+            except queue.Empty:
+                continue
+            if evicted is _STOP:
+                # shutting down: keep the sentinel and drop this update instead
+                self.stats[key].dropped += 1
+                q.put(_STOP)
+                return
+            self.stats[evicted[0]].dropped += 1
+
+    def _worker(self, q: queue.Queue):
+        last_flush = time.time()
+        while True:
+            try:
+                item = q.get(timeout=self.flush_interval_s)
+            except queue.Empty:
+                item = None
+            if item is _STOP:
+                return
+            if item is not None:
+                self._process(*item)
+            now = time.time()
+            if now - last_flush >= self.flush_interval_s:
+                for key, recorder in self.recorders.items():
+                    if self._owns(q, key):
+                        recorder.flush()
+                for key, recorder in self.diff_recorders.items():
+                    if self._owns(q, key):
+                        recorder.flush()
+                if self.calibrator is not None and q is self._queues[0]:
+                    self.calibrator.save()
+                last_flush = now
+
+    def _owns(self, q: queue.Queue, key: Tuple[str, str]) -> bool:
+        return self._queues[zlib.crc32(key[1].encode()) % self.workers] is q
+
+    def _process(self, key: Tuple[str, str], ts: float, book, version: int, changed_mask: int = LEVELS):
+        venue, inst = key
+        stats = self.stats[key]
+        prev = self._last_books.get(key)
+        if self._last_versions.get(key) == version - 1:
+            # the previous update of this feed was processed: the client's diff mask says it all
+            changed = bool(changed_mask & LEVELS)
+        else:
+            # the queue dropped updates in between, one of which may have changed the
+            # levels: compare with the last book this worker saw
+            changed = prev is None or not (same_levels(prev[0], book.bids) and same_levels(prev[1], book.asks))
+        self._last_versions[key] = version
+        if not changed:
+            # the feed repeated the book: signals and cost caches still hold
+            stats.unchanged += 1
+        elif self.pool is not None:
+            # signals arrive asynchronously through _on_analytics
+            if not self.pool.submit(self.estimator_key(venue, inst), ts, book.bids, book.asks, version):
+                stats.dropped += 1
+        else:
+            stats.signals = self._analytics[key].update(book.bids, book.asks, ts)
+        stats.ticks += 1
+        stats.last_mid = book.mid_price
+        stats.last_spread = book.spread
+        stats.last_ts = ts
+        if changed:
+            self._last_books[key] = (book.bids, book.asks)
+            self.estimator.update_book(
+                self.estimator_key(venue, inst), book.bids, book.asks, self._volatility(venue, inst), version,
+            )
+        recorder = self.recorders.get(key)
+        if recorder is not None and changed:
+            recorder.add(ts, book.bids, book.asks)
+        if self.calibrator is not None:
+            self._calibrate(key, ts, book)
+
+    def _calibrate(self, key: Tuple[str, str], ts: float, book):
+        name = self.estimator_key(*key)
+        tape = self.clients[key].trade_tape
+        pulled, position = self._trades_seen.get(key, (-np.inf, 0))
+        # trades are pulled from the client's tape at most once per book sample interval
+        if tape is not None and ts - pulled >= self.calibrator.book_interval_s:
+            trades, position = tape.since(position)
+            self._trades_seen[key] = (ts, position)
+            if len(trades):
+                self.calibrator.add_trades(name, trades["ts"], trades["sz"], trades["side"])
+        self.calibrator.add_book(name, ts, book.bids, book.asks)
+
+    def _on_analytics(self, key: str, result: dict):
+        # pool collector thread
+        self.stats[self._pool_keys[key]].signals = result
+
+    def _volatility(self, venue: str, inst: str, bars: int = 60) -> float:
+        """Std of 1s mid-price returns over the last `bars` seconds."""
+        closes = self.clients[(venue, inst)].bars.bars("1s")["mid_close"][-bars:]
+        if len(closes) < 3:
+            return 0.0
+        return float(np.std(np.diff(closes) / closes[:-1]))
+
+    # ---- reporting ----
+    def metrics_text(self) -> str:
+        """Prometheus text exposition of per-feed counters and gauges."""
+        lines = [
+            "# TYPE tradesim_uptime_seconds gauge",
+            f"tradesim_uptime_seconds {time.time() - (self.started_at or time.time()):.3f}",
+            "# TYPE tradesim_queue_depth gauge",
+        ]
+        lines += [f'tradesim_queue_depth{{worker="{i}"}} {q.qsize()}' for i, q in enumerate(self._queues)]
+        if self.pool is not None:
+            lines.append("# TYPE tradesim_analytics_backlog gauge")
+            lines += [f'tradesim_analytics_backlog{{process="{i}"}} {n}' for i, n in enumerate(self.pool.backlog())]
+            lines.append("# TYPE tradesim_analytics_dropped_results_total counter")
+            lines += [f'tradesim_analytics_dropped_results_total{{process="{i}"}} {n}'
+                      for i, n in enumerate(self.pool.dropped_results())]
+        series = (
+            ("tradesim_updates_total", "counter", lambda c, s: s.ticks),
+            ("tradesim_dropped_total", "counter", lambda c, s: s.dropped),
+            ("tradesim_unchanged_total", "counter", lambda c, s: s.unchanged),
+            ("tradesim_reconnects_total", "counter", lambda c, s: c.reconnects),
+            ("tradesim_resyncs_total", "counter", lambda c, s: c.resyncs),
+            ("tradesim_mid_price", "gauge", lambda c, s: s.last_mid),
+            ("tradesim_spread", "gauge", lambda c, s: s.last_spread),
+            ("tradesim_ingest_latency_ms", "gauge", lambda c, s: c.latest_latency_ms if c.latest_latency_ms is not None else float("nan")),
+            ("tradesim_imbalance", "gauge", lambda c, s: s.signals.get("imbalance_5", float("nan"))),
+            ("tradesim_recorded_rows_total", "counter",
+             lambda c, s: self.recorders[(c.adapter.name, c.inst_id)].rows if self.recorders else 0),
+            ("tradesim_recorded_diffs_total", "counter",
+             lambda c, s: self.diff_recorders[(c.adapter.name, c.inst_id)].rows if self.diff_recorders else 0),
+        )
+        for name, kind, value in series:
+            lines.append(f"# TYPE {name} {kind}")
+            for (venue, inst), client in self.clients.items():
+                lines.append(f'{name}{{venue="{venue}",instrument="{inst}"}} {value(client, self.stats[(venue, inst)])}')
+        return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    disable_nagle_algorithm = True
+    service: SimulatorService = None
+
+    def do_GET(self):
+        if self.path == "/health":
+            status, body, ctype = 200, b'{"status": "ok"}', "application/json"
+        elif self.path == "/metrics":
+            status, body, ctype = 200, self.service.metrics_text().encode(), "text/plain; version=0.0.4"
+        else:
+            status, body, ctype = 404, b'{"error": "not found"}', "application/json"
+        self.send_response(status)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(service: SimulatorService, host: str = "0.0.0.0", port: int = 9100) -> ThreadingHTTPServer:
+    handler = type("MetricsHandler", (_MetricsHandler,), {"service": service})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logger.warning(f"Metrics on http://{host}:{server.server_address[1]}/metrics")
+    return server
+
+
+def run(args) -> int:
+    logger.remove()
+    logger.add(sys.stderr, level=args.log_level)
+    load_dotenv()
+    venues = [v.strip() for v in args.venues.split(",") if v.strip()]
+    url = args.url or (os.getenv("API_URL") if venues == ["OKX"] else None)
+    service = SimulatorService(
+        [i.strip() for i in args.instruments.split(",") if i.strip()], venues, url,
+        workers=args.workers, record_dir=args.record, flush_rows=args.flush_rows,
+        flush_interval_s=args.flush_interval, queue_size=args.queue_size, top_n=args.levels,
+        subscribe_trades=args.trades, processes=args.processes, impact_params_path=args.impact_params,
+        record_diffs=args.record_diffs,
+    )
+
+    servers = []
+    if args.metrics_port is not None:
+        servers.append(start_metrics_server(service, args.metrics_host, args.metrics_port))
+    if args.cost_port is not None:
+        servers.append(start_cost_server(service.estimator, args.metrics_host, args.cost_port))
+
+    shutdown = threading.Event()
+
+    def _on_signal(signum, frame):
+        logger.warning(f"Received signal {signum}, shutting down")
+        shutdown.set()
+
+    signal.signal(signal.SIGINT, _on_signal)
+    signal.signal(signal.SIGTERM, _on_signal)
+    PROFILER.install_signal()
+
+    service.start()
+    shutdown.wait(args.duration)
+    service.stop()
+    for server in servers:
+        server.shutdown()
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="tradesim", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("run", help="run ingest + analytics + cost estimation until interrupted")
+    p.add_argument("--instruments", default="BTC-USDT", help="comma-separated instrument ids")
+    p.add_argument("--venues", default="OKX", help=f"comma-separated venues ({', '.join(ADAPTERS)})")
+    p.add_argument("--url", help="websocket endpoint override (single venue only; OKX defaults to $API_URL)")
+    p.add_argument("--workers", type=int, default=1, help="analytics worker threads")
+    p.add_argument("--processes", type=int, default=0,
+                   help="analytics worker processes (0 = compute signals on the worker threads)")
+    p.add_argument("--impact-params", help="calibrate impact (eta, gamma) online and keep them in this JSON file")
+    p.add_argument("--levels", type=int, default=5, help="book levels kept per feed")
+    p.add_argument("--trades", action="store_true", help="also subscribe to trades")
+    p.add_argument("--record", help="record every feed to a TickStore under this directory (repeated books are skipped)")
+    p.add_argument("--record-diffs", action="store_true",
+                   help="with --record, also write each feed's book diffs (changed levels only) as JSON lines")
+    p.add_argument("--flush-rows", type=int, default=1000, help="recording rows buffered before a write")
+    p.add_argument("--flush-interval", type=float, default=5.0, help="max seconds between recording writes")
+    p.add_argument("--queue-size", type=int, default=10_000, help="per-worker backlog before dropping")
+    p.add_argument("--metrics-port", type=int, help="serve Prometheus /metrics and /health on this port")
+    p.add_argument("--metrics-host", default="127.0.0.1")
+    p.add_argument("--cost-port", type=int, help="serve the cost estimator (/estimate) on this port")
+    p.add_argument("--duration", type=float, default=None, help="stop after this many seconds")
+    p.add_argument("--log-level", default="WARNING", help="per-tick logs are INFO; WARNING keeps the hot path quiet")
+    args = parser.parse_args(argv)
+    return run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,251 @@
+import math
+import multiprocessing as mp
+import threading
+import time
+import zlib
+from typing import Callable, Dict, List, Optional, Sequence
+import numpy as np
+from loguru import logger
+
+from utils.book_analytics import BookAnalytics
+from utils.shm_ring import ShmRing
+
+# per-result fields computed next to BookAnalytics' signals
+RESULT_FIELDS = ("mid", "spread", "volatility", "queued_s")
+
+
+def signal_names() -> tuple:
+    """Keys of BookAnalytics().update() with the default configuration."""
+    one = np.array([[1.0, 1.0]])
+    return tuple(BookAnalytics().update(one, one + [1.0, 0.0], 0.0))
+
+
+def book_dtype(levels: int) -> np.dtype:
+    return np.dtype([
+        ("key", "i4"), ("n_bids", "i4"), ("n_asks", "i4"), ("version", "i8"),
+        ("ts", "f8"), ("queued_at", "f8"),
+        ("bids", "f8", (levels, 2)), ("asks", "f8", (levels, 2)),
+    ])
+
+
+def result_dtype() -> np.dtype:
+    return np.dtype(
+        [("key", "i4"), ("version", "i8"), ("ts", "f8")]
+        + [(name, "f8") for name in RESULT_FIELDS + signal_names()]
+    )
+
+
+class AnalyticsPool:
+    """
+    Per-instrument analytics (BookAnalytics signals plus an EWMA volatility of
+    mid returns) fanned out over worker processes.
+
+    Each key (e.g. an instrument id) is pinned to one worker by crc32 hash, so its
+    updates are processed in order and its state lives in a single process. Books
+    travel to the worker through a shared-memory ring (utils.shm_ring.ShmRing) and
+    results come back through another; a collector thread merges them into
+    `latest` and calls `on_result(key, result)`.
+
+        pool = AnalyticsPool(["BTC-USDT", "ETH-USDT"], workers=4)
+        pool.start()
+        pool.submit("BTC-USDT", ts, book.bids, book.asks, version)
+        pool.latest["BTC-USDT"]   # {"mid": ..., "imbalance_5": ..., ...}
+
+    Args:
+        keys: every key that will be submitted
+        workers: worker processes
+        levels: book levels shipped per side (deeper books are truncated)
+        capacity: records per ring; a full inbox drops the new book (see `dropped`), a full
+            outbox the new result (see dropped_results())
+        vol_halflife: EWMA half-life of the volatility estimate, in updates
+        on_result: called from the collector thread for every result
+    """
+
+    def __init__(self, keys: Sequence[str], workers: int = 2, levels: int = 5, capacity: int = 4096,
+                 vol_halflife: float = 50.0, on_result: Optional[Callable[[str, dict], None]] = None):
+        if not keys:
+            raise ValueError("Need at least one key")
+        self.keys = list(dict.fromkeys(keys))
+        self.workers = max(1, int(workers))
+        self.levels = int(levels)
+        self.capacity = int(capacity)
+        self.vol_halflife = float(vol_halflife)
+        self.on_result = on_result
+        self.latest: Dict[str, dict] = {}
+        self.processed = 0
+        self._ids = {key: i for i, key in enumerate(self.keys)}
+        self._shard = [zlib.crc32(key.encode()) % self.workers for key in self.keys]
+        self._inboxes: List[ShmRing] = []
+        self._outboxes: List[ShmRing] = []
+        self._locks = [threading.Lock() for _ in range(self.workers)]
+        self._procs: List[mp.Process] = []
+        self._ctx = mp.get_context("spawn")  # no fork: the parent runs websocket threads
+        self._stop = self._ctx.Event()
+        self._collector: Optional[threading.Thread] = None
+        self._collecting = False
+
+    def start(self) -> "AnalyticsPool":
+        in_dtype, out_dtype = book_dtype(self.levels), result_dtype()
+        for i in range(self.workers):
+            inbox, outbox = ShmRing(in_dtype, self.capacity), ShmRing(out_dtype, self.capacity)
+            self._inboxes.append(inbox)
+            self._outboxes.append(outbox)
+            proc = self._ctx.Process(
+                target=_worker_main, name=f"analytics-{i}", daemon=True,
+                args=(inbox.spec(), outbox.spec(), self._stop, self.vol_halflife),
+            )
+            proc.start()
+            self._procs.append(proc)
+        self._collecting = True
+        self._collector = threading.Thread(target=self._collect, name="analytics-collector", daemon=True)
+        self._collector.start()
+        return self
+
+    def submit(self, key: str, ts: float, bids: np.ndarray, asks: np.ndarray, version: int = 0) -> bool:
+        """
+        Queue one book for `key`; safe to call from several threads.
+
+        Returns:
+            False when the key's worker is backlogged and the book was dropped
+        """
+        key_id = self._ids[key]
+        shard = self._shard[key_id]
+        ring = self._inboxes[shard]
+        n_bids, n_asks = len(bids), len(asks)
+        if n_bids != self.levels:
+            bids, n_bids = _fit(bids, self.levels), min(n_bids, self.levels)
+        if n_asks != self.levels:
+            asks, n_asks = _fit(asks, self.levels), min(n_asks, self.levels)
+        with self._locks[shard]:
+            slot = ring.reserve()
+            if slot is None:
+                return False
+            ring.records[slot] = (key_id, n_bids, n_asks, version, ts, time.monotonic(), bids, asks)
+            ring.publish()
+        return True
+
+    def _collect(self):
+        names = result_dtype().names[1:]
+        sleep = 20e-6
+        while self._collecting or any(len(r) for r in self._outboxes):
+            got = 0
+            for ring in self._outboxes:
+                batch = ring.get_batch(release=False)
+                got += len(batch)
+                for row in batch.tolist():
+                    key = self.keys[row[0]]
+                    result = dict(zip(names, row[1:]))
+                    self.latest[key] = result
+                    if self.on_result is not None:
+                        self.on_result(key, result)
+                ring.release(len(batch))
+            self.processed += got
+            if got:
+                sleep = 20e-6
+            else:
+                time.sleep(sleep)
+                sleep = min(sleep * 2, 0.002)
+
+    @property
+    def dropped(self) -> int:
+        """Books rejected because a worker's inbox was full."""
+        return sum(r.dropped for r in self._inboxes)
+
+    def backlog(self) -> List[int]:
+        """Queued books per worker."""
+        return [len(r) for r in self._inboxes]
+
+    def dropped_results(self) -> List[int]:
+        """Results per worker lost because its outbox was full (the collector fell behind)."""
+        return [r.dropped for r in self._outboxes]
+
+    def drain(self, timeout: float = 10.0) -> bool:
+        """Wait until every submitted book has a merged result."""
+        deadline = time.monotonic() + timeout
+        # workers and the collector release ring slots only once they are done with them
+        while any(len(r) for r in self._inboxes + self._outboxes):
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.001)
+        return True
+
+    def stop(self, timeout: float = 10.0):
+        """Let workers finish queued books, merge the last results and free the rings."""
+        if not self._procs:
+            return
+        self._stop.set()
+        for proc in self._procs:
+            proc.join(timeout)
+            if proc.is_alive():
+                logger.warning(f"{proc.name} did not exit, terminating")
+                proc.terminate()
+        self._collecting = False
+        if self._collector is not None:
+            self._collector.join(timeout)
+        for ring in self._inboxes + self._outboxes:
+            ring.close()
+        self._procs, self._inboxes, self._outboxes = [], [], []
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def _fit(levels: np.ndarray, n: int) -> np.ndarray:
+    out = np.zeros((n, 2))
+    out[:min(n, len(levels))] = levels[:n]
+    return out
+
+
+def _worker_main(in_spec, out_spec, stop, vol_halflife: float):
+    inbox, outbox = ShmRing.attach(*in_spec), ShmRing.attach(*out_spec)
+    signals = signal_names()
+    alpha = 1.0 - math.exp(-math.log(2.0) / vol_halflife)
+    analytics: Dict[int, BookAnalytics] = {}
+    last_mid: Dict[int, float] = {}
+    variance: Dict[int, float] = {}
+    results = outbox.records
+    try:
+        while True:
+            # slots are released after the results are published, so an empty
+            # inbox means everything submitted so far has been answered
+            batch = inbox.wait_batch(256, timeout=0.05, release=False)
+            if not len(batch):
+                if stop.is_set():
+                    return
+                continue
+            header = zip(batch["key"].tolist(), batch["n_bids"].tolist(), batch["n_asks"].tolist(),
+                         batch["version"].tolist(), batch["ts"].tolist(), batch["queued_at"].tolist())
+            for (key, n_bids, n_asks, version, ts, queued_at), bids, asks in zip(header, batch["bids"], batch["asks"]):
+                if not n_bids or not n_asks:
+                    continue
+                bids, asks = bids[:n_bids], asks[:n_asks]
+                state = analytics.get(key)
+                if state is None:
+                    state = analytics[key] = BookAnalytics()
+                values = state.update(bids, asks, ts)
+
+                best_bid, best_ask = bids[0, 0], asks[0, 0]
+                mid = (best_bid + best_ask) / 2.0
+                prev = last_mid.get(key)
+                var = variance.get(key, 0.0)
+                if prev is not None and prev > 0 and mid > 0:
+                    r = math.log(mid / prev)
+                    var += alpha * (r * r - var)
+                last_mid[key], variance[key] = mid, var
+
+                slot = outbox.reserve()
+                if slot is None:
+                    # the ring counts the loss; the parent reports it through dropped_results()
+                    continue
+                results[slot] = (
+                    key, version, ts, mid, best_ask - best_bid, math.sqrt(var), time.monotonic() - queued_at,
+                    *[values[name] for name in signals],
+                )
+                outbox.publish()
+            inbox.release(len(batch))
+    finally:
+        inbox.close()
+        outbox.close()
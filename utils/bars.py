@@ -0,0 +1,217 @@
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+
+# One bar per resolution bucket: OHLC of mid, spread and visible depth (bid + ask
+# size), traded volume and the number of book ticks folded in. Buckets without
+# any tick are skipped, so consecutive bars are not always `resolution` apart.
+BAR_FIELDS = ("mid", "spread", "depth")
+BAR_DTYPE = np.dtype(
+    [("start", "f8")]
+    + [(f"{field}_{part}", "f8") for field in BAR_FIELDS for part in ("open", "high", "low", "close")]
+    + [("volume", "f8"), ("ticks", "i8")]
+)
+RESOLUTIONS = {"1s": 1, "1m": 60, "5m": 300, "1h": 3600}
+# 1h of 1s bars, 1d of 1m, 1w of 5m, 30d of 1h: ~0.9 MB per instrument
+DEFAULT_CAPACITY = {1: 3600, 60: 1440, 300: 2016, 3600: 720}
+
+_VOLUME = 13
+_TICKS = 14
+
+
+def _new_bar(start: float, mid: float, spread: float, depth: float, volume: float, ticks: int) -> list:
+    return [start, mid, mid, mid, mid, spread, spread, spread, spread, depth, depth, depth, depth, volume, ticks]
+
+
+def _merge(into: list, bar: list):
+    """Fold a later bar into `into` (open stays, high/low widen, close moves)."""
+    for i in (2, 6, 10):
+        if bar[i] > into[i]:
+            into[i] = bar[i]
+        if bar[i + 1] < into[i + 1]:
+            into[i + 1] = bar[i + 1]
+        into[i + 2] = bar[i + 2]
+    into[_VOLUME] += bar[_VOLUME]
+    into[_TICKS] += bar[_TICKS]
+
+
+class BarSeries:
+    """Closed bars of one resolution in a fixed-size ring buffer plus the bar still open."""
+
+    def __init__(self, resolution_s: float, capacity: int):
+        if resolution_s <= 0 or capacity <= 0:
+            raise ValueError("resolution_s and capacity must be > 0")
+        self.resolution_s = resolution_s
+        self.capacity = capacity
+        self._bars = np.zeros(capacity, dtype=BAR_DTYPE)
+        self._head = 0      # next write position
+        self._count = 0
+        self.open_bar: Optional[list] = None
+        self.parent: Optional["BarSeries"] = None  # coarser series fed with every closed bar
+
+    def bucket(self, ts: float) -> float:
+        return ts - ts % self.resolution_s
+
+    def add_tick(self, ts: float, mid: float, spread: float, depth: float, volume: float = 0.0):
+        start = self.bucket(ts)
+        bar = self.open_bar
+        if bar is not None and start <= bar[0]:
+            # same bucket (late ticks are folded into the open bar)
+            if mid > bar[2]:
+                bar[2] = mid
+            if mid < bar[3]:
+                bar[3] = mid
+            bar[4] = mid
+            if spread > bar[6]:
+                bar[6] = spread
+            if spread < bar[7]:
+                bar[7] = spread
+            bar[8] = spread
+            if depth > bar[10]:
+                bar[10] = depth
+            if depth < bar[11]:
+                bar[11] = depth
+            bar[12] = depth
+            bar[_VOLUME] += volume
+            bar[_TICKS] += 1
+            return
+        self._roll(_new_bar(start, mid, spread, depth, volume, 1))
+
+    def add_volume(self, ts: float, qty: float):
+        """Traded size; a trade in a new bucket opens a flat bar at the last close."""
+        bar = self.open_bar
+        if bar is None:
+            return
+        start = self.bucket(ts)
+        if start <= bar[0]:
+            bar[_VOLUME] += qty
+        else:
+            self._roll(_new_bar(start, bar[4], bar[8], bar[12], qty, 0))
+
+    def add_bar(self, bar: list):
+        """Roll up a closed bar from a finer series."""
+        start = self.bucket(bar[0])
+        if self.open_bar is not None and start <= self.open_bar[0]:
+            _merge(self.open_bar, bar)
+        else:
+            new = list(bar)
+            new[0] = start
+            self._roll(new)
+
+    def _roll(self, new_bar: list):
+        closed = self.open_bar
+        self.open_bar = new_bar
+        if closed is None:
+            return
+        self._bars[self._head] = tuple(closed)
+        self._head = (self._head + 1) % self.capacity
+        self._count = min(self._count + 1, self.capacity)
+        if self.parent is not None:
+            self.parent.add_bar(closed)
+
+    def closed(self) -> np.ndarray:
+        """Closed bars, oldest first (a copy)."""
+        if self._count < self.capacity:
+            return self._bars[:self._count].copy()
+        return np.concatenate((self._bars[self._head:], self._bars[:self._head]))
+
+    def __len__(self) -> int:
+        return self._count + (self.open_bar is not None)
+
+    @property
+    def nbytes(self) -> int:
+        return self._bars.nbytes
+
+
+class BarAggregator:
+    """
+    Multi-resolution bars for one instrument. Ticks only update the finest
+    series; each closed bar is rolled up into the next coarser one, so a tick
+    costs the same however many resolutions are kept.
+
+    Args:
+        resolutions: bar sizes in seconds, each a multiple of the previous one
+        capacity: closed bars kept per resolution (defaults to DEFAULT_CAPACITY or 1000)
+    """
+
+    def __init__(self, resolutions: Sequence[float] = (1, 60, 300, 3600),
+                 capacity: Optional[Dict[float, int]] = None):
+        resolutions = sorted(resolutions)
+        if not resolutions:
+            raise ValueError("Need at least one resolution")
+        for finer, coarser in zip(resolutions, resolutions[1:]):
+            if coarser % finer:
+                raise ValueError(f"Resolution {coarser}s is not a multiple of {finer}s")
+        capacity = capacity or {}
+        self.series: Dict[float, BarSeries] = {
+            r: BarSeries(r, capacity.get(r, DEFAULT_CAPACITY.get(r, 1000))) for r in resolutions
+        }
+        chain: List[BarSeries] = [self.series[r] for r in resolutions]
+        for finer, coarser in zip(chain, chain[1:]):
+            finer.parent = coarser
+        self._finest = chain[0]
+        self.resolutions = tuple(resolutions)
+
+    def add_tick(self, ts: float, mid: float, spread: float, depth: float, volume: float = 0.0):
+        self._finest.add_tick(ts, mid, spread, depth, volume)
+
+    def add_volume(self, ts: float, qty: float):
+        self._finest.add_volume(ts, qty)
+
+    def bars(self, resolution, since: Optional[float] = None, include_open: bool = True) -> np.ndarray:
+        """
+        Bars of `resolution` (seconds or a RESOLUTIONS key like "1m"), oldest first.
+
+        Args:
+            since: only bars starting at or after this timestamp
+            include_open: append the in-progress bar, including finer bars not rolled up yet
+        """
+        series = self.series[RESOLUTIONS.get(resolution, resolution)]
+        out = series.closed()
+        if include_open:
+            pending = self._pending_bars(series)
+            if pending:
+                out = np.concatenate((out, np.array([tuple(bar) for bar in pending], dtype=BAR_DTYPE)))
+        if since is not None:
+            out = out[int(np.searchsorted(out["start"], series.bucket(since), side="left")):]
+        return out
+
+    def _pending_bars(self, series: BarSeries) -> List[list]:
+        """
+        Bars of `series` not closed yet, oldest first: its open bar plus the open
+        bars of the finer series, which have not been rolled up. When a finer bar
+        is already in a newer bucket, the bar before it is finished, so there can
+        be more than one.
+        """
+        finer = [s for s in self.series.values() if s.resolution_s < series.resolution_s]
+        bars = [list(series.open_bar)] if series.open_bar is not None else []
+        for child in sorted(finer, key=lambda s: -s.resolution_s):
+            if child.open_bar is None:
+                continue
+            start = series.bucket(child.open_bar[0])
+            if not bars or start > bars[-1][0]:
+                bar = list(child.open_bar)
+                bar[0] = start
+                bars.append(bar)
+            else:
+                _merge(bars[-1], child.open_bar)
+        return bars
+
+    def resolution_for(self, horizon_s: float, max_bars: int = 500) -> float:
+        """Finest resolution that covers `horizon_s` in at most `max_bars` bars."""
+        for r in self.resolutions:
+            if horizon_s / r <= min(max_bars, self.series[r].capacity):
+                return r
+        return self.resolutions[-1]
+
+    def to_frame(self, resolution, since: Optional[float] = None):
+        """Bars as a DataFrame indexed by bar start time (UTC)."""
+        import pandas as pd
+        bars = self.bars(resolution, since)
+        df = pd.DataFrame(bars)
+        df.index = pd.to_datetime(df.pop("start"), unit="s", utc=True)
+        df.index.name = "Time"
+        return df
+
+    @property
+    def nbytes(self) -> int:
+        return sum(s.nbytes for s in self.series.values())
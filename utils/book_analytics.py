@@ -0,0 +1,159 @@
+import math
+from typing import Dict, Optional, Sequence
+import numpy as np
+
+from utils.profiling import timed
+
+# All helpers take (levels, 2) float arrays of [price, size], best level first,
+# as produced by utils.data_utils.parse_levels / BookSnapshot.bids / .asks.
+
+
+def microprice(bids: np.ndarray, asks: np.ndarray) -> float:
+    """
+    Size-weighted mid: leans toward the side with less resting size at the touch.
+    Falls back to the plain mid when both touch sizes are zero.
+    """
+    bid_px, bid_sz = bids[0].tolist()
+    ask_px, ask_sz = asks[0].tolist()
+    total = bid_sz + ask_sz
+    if total <= 0:
+        return (bid_px + ask_px) / 2.0
+    return (bid_px * ask_sz + ask_px * bid_sz) / total
+
+
+def level_weights(depth: int, decay: float = 0.5) -> np.ndarray:
+    """Exponentially decaying per-level weights, 1.0 at the touch."""
+    return np.exp(-decay * np.arange(depth, dtype=np.float64))
+
+
+def order_book_imbalance(bids: np.ndarray, asks: np.ndarray, depth: int = 5,
+                         weights: Optional[np.ndarray] = None) -> float:
+    """
+    Level-weighted imbalance in [-1, 1]; positive means more bid than ask size.
+
+    Args:
+        depth: number of levels per side to include
+        weights: per-level weights (defaults to level_weights(depth))
+    """
+    b = bids[:depth, 1]
+    a = asks[:depth, 1]
+    if weights is None:
+        weights = level_weights(depth)
+    wb = float(weights[:len(b)] @ b)
+    wa = float(weights[:len(a)] @ a)
+    total = wb + wa
+    if total <= 0:
+        return 0.0
+    return (wb - wa) / total
+
+
+def distance_bps(levels: np.ndarray, mid: float) -> np.ndarray:
+    """Absolute distance of each level from mid, in basis points."""
+    return np.abs(levels[:, 0] - mid) / mid * 1e4
+
+
+def depth_within_bps(levels: np.ndarray, mid: float, bps: Sequence[float]) -> np.ndarray:
+    """
+    Cumulative size resting within each of the given distances (bps) from mid.
+
+    Returns:
+        array shaped like `bps`
+    """
+    cum = np.concatenate(([0.0], np.cumsum(levels[:, 1])))
+    # levels are sorted away from mid, so distances are non-decreasing
+    idx = np.searchsorted(distance_bps(levels, mid), np.asarray(bps, dtype=np.float64), side="right")
+    return cum[idx]
+
+
+def book_slope(levels: np.ndarray, mid: float) -> float:
+    """
+    Least-squares slope of cumulative size against distance from mid (size per bp).
+    Steeper books absorb a given order with less price movement.
+    """
+    return _slope(distance_bps(levels, mid), np.cumsum(levels[:, 1]))
+
+
+def _slope(x: np.ndarray, y: np.ndarray) -> float:
+    if len(x) < 2:
+        return 0.0
+    x_c = x - x.mean()
+    denom = float(x_c @ x_c)
+    if denom == 0:
+        return 0.0
+    return float(x_c @ (y - y.mean()) / denom)
+
+
+class BookAnalytics:
+    """
+    Per-instrument signal state updated once per book tick.
+
+    Stateless signals (microprice, imbalance, depth, slope) are recomputed from
+    the level arrays; resilience is tracked incrementally as the EWMA fraction
+    of near-touch depth deficit (vs. its own EWMA baseline) refilled per second.
+    """
+
+    def __init__(self, depths: Sequence[int] = (1, 3, 5), bps_bands: Sequence[float] = (5.0, 10.0, 25.0),
+                 level_decay: float = 0.5, resilience_band_bps: float = 10.0, halflife_s: float = 30.0):
+        self.depths = tuple(int(d) for d in depths)
+        self.bps_bands = np.asarray(bps_bands, dtype=np.float64)
+        self.resilience_band_bps = float(resilience_band_bps)
+        self.halflife_s = float(halflife_s)
+        self._weights = level_weights(max(self.depths), level_decay)
+        # resilience band rides along as the last searchsorted target
+        self._bands = np.append(self.bps_bands, self.resilience_band_bps)
+        self._band_names = [f"{b:g}" for b in self.bps_bands]
+
+        self._baseline: Optional[float] = None
+        self._prev_depth: Optional[float] = None
+        self._prev_ts: Optional[float] = None
+        self.resilience = 0.0
+
+    @timed("BookAnalytics.update")
+    def update(self, bids: np.ndarray, asks: np.ndarray, ts: float) -> Dict[str, float]:
+        """
+        Returns:
+            dict with microprice, imbalance_<d> for each configured depth,
+            bid/ask_depth_<bps>bps for each band, bid/ask_slope and resilience.
+        """
+        mid = (bids[0, 0] + asks[0, 0]) / 2.0
+        out = {"microprice": microprice(bids, asks)}
+        for d in self.depths:
+            out[f"imbalance_{d}"] = order_book_imbalance(bids, asks, d, self._weights)
+
+        # one distance/cumulative-size profile per side feeds depth bands, slope and resilience
+        near_touch = 0.0
+        for side, levels in (("bid", bids), ("ask", asks)):
+            dist = distance_bps(levels, mid)
+            cum = np.cumsum(levels[:, 1])
+            cum0 = np.concatenate(([0.0], cum))
+            depth = cum0[np.searchsorted(dist, self._bands, side="right")].tolist()
+            for band, value in zip(self._band_names, depth[:-1]):
+                out[f"{side}_depth_{band}bps"] = value
+            near_touch += depth[-1]
+            out[f"{side}_slope"] = _slope(dist, cum)
+
+        out["resilience"] = self._update_resilience(near_touch, ts)
+        return out
+
+    def _update_resilience(self, depth: float, ts: float) -> float:
+        if self._prev_ts is None:
+            self._baseline = depth
+        else:
+            dt = ts - self._prev_ts
+            if dt > 0:
+                alpha = 1.0 - math.exp(-math.log(2.0) * dt / self.halflife_s)
+                deficit = self._baseline - self._prev_depth
+                if deficit > 0:
+                    refilled = min(max(depth - self._prev_depth, 0.0) / deficit, 1.0) / dt
+                    self.resilience += alpha * (refilled - self.resilience)
+                self._baseline += alpha * (depth - self._baseline)
+
+        self._prev_depth = depth
+        self._prev_ts = ts
+        return self.resilience
+
+    def reset(self):
+        self._baseline = None
+        self._prev_depth = None
+        self._prev_ts = None
+        self.resilience = 0.0
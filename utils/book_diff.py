@@ -0,0 +1,215 @@
+from typing import Any, Callable, List, Optional
+import numpy as np
+
+from utils.book_types import EMPTY_LEVELS, LEVEL_DTYPE, _SlotMapping
+
+# Changed-metrics bitmask of a BookDiff
+BIDS = 1 << 0               # any bid level (price or size) in the top N
+ASKS = 1 << 1
+BEST_BID = 1 << 2
+BEST_ASK = 1 << 3
+SPREAD = 1 << 4
+MID_PRICE = 1 << 5
+BID_VOLUME = 1 << 6         # total visible bid size
+ASK_VOLUME = 1 << 7
+METRIC_BITS = {
+    "bids": BIDS, "asks": ASKS, "best_bid": BEST_BID, "best_ask": BEST_ASK, "spread": SPREAD,
+    "mid_price": MID_PRICE, "total_bid_volume": BID_VOLUME, "total_ask_volume": ASK_VOLUME,
+}
+LEVELS = BIDS | ASKS
+TOP_OF_BOOK = BEST_BID | BEST_ASK | SPREAD | MID_PRICE
+_SMALL_BOOK = 32
+
+
+def diff_levels(prev: np.ndarray, cur: np.ndarray) -> np.ndarray:
+    """
+    Levels of `cur` that are new or resized against `prev`, plus [price, 0] for
+    prices that left the ladder. Both sides are (levels, 2) [price, size] arrays
+    in any consistent order; the result is sorted by price.
+
+    Returns:
+        (k, 2) array, EMPTY_LEVELS when nothing changed
+    """
+    if prev is cur:
+        return EMPTY_LEVELS
+    if len(prev) <= _SMALL_BOOK and len(cur) <= _SMALL_BOOK:
+        # a handful of levels: plain lists beat several tiny numpy calls
+        return _diff_small(prev.tolist(), cur.tolist())
+    if prev.shape == cur.shape:
+        same = prev == cur
+        if same.all():
+            return EMPTY_LEVELS
+        if same[:, 0].all():
+            # same ladder (the common case): only sizes moved
+            out = cur[~same[:, 1]]
+            return out if len(out) < 2 or out[0, 0] < out[-1, 0] else out[::-1]
+    if not len(prev):
+        return cur[np.argsort(cur[:, 0])]
+    prev_sorted = prev[np.argsort(prev[:, 0])]
+    cur_sorted = cur[np.argsort(cur[:, 0])]
+    # new or resized levels of cur
+    pos = np.searchsorted(prev_sorted[:, 0], cur_sorted[:, 0]).clip(0, len(prev_sorted) - 1)
+    same = (prev_sorted[pos, 0] == cur_sorted[:, 0]) & (prev_sorted[pos, 1] == cur_sorted[:, 1])
+    changed = cur_sorted[~same]
+    # prices of prev no longer in cur
+    if len(cur_sorted):
+        pos = np.searchsorted(cur_sorted[:, 0], prev_sorted[:, 0]).clip(0, len(cur_sorted) - 1)
+        gone = prev_sorted[cur_sorted[pos, 0] != prev_sorted[:, 0], 0]
+    else:
+        gone = prev_sorted[:, 0]
+    if not len(gone):
+        return changed if len(changed) else EMPTY_LEVELS
+    removed = np.column_stack((gone, np.zeros(len(gone), dtype=LEVEL_DTYPE)))
+    out = np.concatenate((changed, removed))
+    return out[np.argsort(out[:, 0], kind="stable")]
+
+
+def _diff_small(prev: list, cur: list) -> np.ndarray:
+    if prev == cur:
+        return EMPTY_LEVELS
+    old = dict(prev)
+    out = [level for level in cur if old.get(level[0]) != level[1]]
+    new = {price for price, _ in cur}
+    out += [[price, 0.0] for price in old if price not in new]
+    if not out:
+        return EMPTY_LEVELS
+    out.sort()
+    return np.array(out, dtype=LEVEL_DTYPE)
+
+
+def same_levels(prev: np.ndarray, cur: np.ndarray) -> bool:
+    if prev is cur:
+        return True
+    if prev.shape != cur.shape:
+        return False
+    if len(cur) <= _SMALL_BOOK:
+        return prev.tolist() == cur.tolist()
+    return bool(np.array_equal(prev, cur))
+
+
+def apply_levels(levels: np.ndarray, changes: np.ndarray, descending: bool, top_n: Optional[int] = None) -> np.ndarray:
+    """Rebuild a side from its previous levels and a diff_levels() result."""
+    if not len(changes):
+        return levels
+    book = dict(levels.tolist())
+    for price, size in changes.tolist():
+        if size > 0:
+            book[price] = size
+        else:
+            book.pop(price, None)
+    prices = sorted(book, reverse=descending)[:top_n]
+    return np.array([(p, book[p]) for p in prices], dtype=LEVEL_DTYPE).reshape(-1, 2)
+
+
+class BookDiff(_SlotMapping):
+    """
+    What one accepted book update changed: the bid / ask levels that are new,
+    resized or gone (size 0), and a bitmask of the changed metrics (see BIDS,
+    BEST_BID, ... above). A snapshot diff (first book, or after a resync) lists
+    every level.
+
+        if diff.changed & book_diff.BIDS:
+            redraw_bids(diff.bids)
+        if "spread" in diff:            # same as diff.changed & SPREAD
+            ...
+    """
+    __slots__ = ("inst_id", "version", "ts", "changed", "bids", "asks", "best_bid", "best_ask", "snapshot")
+    _fields = __slots__
+
+    def __init__(self, inst_id: Optional[str], version: int, ts: Any, changed: int,
+                 bids: np.ndarray, asks: np.ndarray, best_bid: float, best_ask: float, snapshot: bool = False):
+        self.inst_id = inst_id
+        self.version = version
+        self.ts = ts
+        self.changed = changed
+        self.bids = bids
+        self.asks = asks
+        self.best_bid = best_bid
+        self.best_ask = best_ask
+        self.snapshot = snapshot
+
+    def __contains__(self, name: object) -> bool:
+        return bool(self.changed & METRIC_BITS.get(name, 0))
+
+    @property
+    def empty(self) -> bool:
+        return not self.changed
+
+    def changed_metrics(self) -> List[str]:
+        return [name for name, bit in METRIC_BITS.items() if self.changed & bit]
+
+    def to_message(self) -> dict:
+        """Compact JSON-ready form for fan-out: the changed levels and the bitmask."""
+        return {
+            "instId": self.inst_id, "v": self.version, "ts": self.ts, "snapshot": self.snapshot,
+            "changed": self.changed, "bids": self.bids.tolist(), "asks": self.asks.tolist(),
+        }
+
+
+class BookDiffer:
+    """
+    Turns successive top-N books of one feed into BookDiffs and hands them to
+    subscribers. The first book, and the first after reset(), is a snapshot diff.
+    Without subscribers only the per-side change flags (side_versions) are kept,
+    which costs a list comparison per side.
+    """
+
+    def __init__(self):
+        self.bids = EMPTY_LEVELS
+        self.asks = EMPTY_LEVELS
+        self.tick = None
+        self.side_versions = {"bids": 0, "asks": 0}    # bumped whenever that side changes
+        self._subscribers: List[Callable[[BookDiff], None]] = []
+
+    def subscribe(self, fn: Callable[[BookDiff], None]) -> Callable[[], None]:
+        """Call fn(diff) for every non-empty diff; returns an unsubscribe function."""
+        self._subscribers.append(fn)
+
+        def unsubscribe():
+            if fn in self._subscribers:
+                self._subscribers.remove(fn)
+        return unsubscribe
+
+    def reset(self):
+        self.bids = self.asks = EMPTY_LEVELS
+        self.tick = None
+
+    def update(self, version: int, tick, bids: np.ndarray, asks: np.ndarray) -> int:
+        """
+        Diff against the previous book; `tick` is the new book's utils.book_types.Tick.
+
+        Returns:
+            changed-metrics bitmask (0 when the book repeated)
+        """
+        diff = None
+        if self._subscribers:
+            snapshot = self.tick is None
+            bid_changes = diff_levels(self.bids, bids)
+            ask_changes = diff_levels(self.asks, asks)
+            changed = (BIDS if len(bid_changes) else 0) | (ASKS if len(ask_changes) else 0)
+        else:
+            changed = (0 if same_levels(self.bids, bids) else BIDS) | (0 if same_levels(self.asks, asks) else ASKS)
+        if changed:
+            changed |= _changed_metrics(self.tick, tick)
+            if changed & BIDS:
+                self.side_versions["bids"] += 1
+            if changed & ASKS:
+                self.side_versions["asks"] += 1
+            if self._subscribers:
+                diff = BookDiff(tick.instId, version, tick.ts, changed, bid_changes, ask_changes,
+                                tick.best_bid, tick.best_ask, snapshot)
+        self.bids, self.asks, self.tick = bids, asks, tick
+        if diff is not None:
+            for fn in list(self._subscribers):
+                fn(diff)
+        return changed
+
+
+def _changed_metrics(prev, tick) -> int:
+    if prev is None:
+        return TOP_OF_BOOK | BID_VOLUME | ASK_VOLUME
+    mask = 0
+    for name in ("best_bid", "best_ask", "spread", "mid_price", "total_bid_volume", "total_ask_volume"):
+        if getattr(prev, name) != getattr(tick, name):
+            mask |= METRIC_BITS[name]
+    return mask
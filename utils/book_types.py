@@ -0,0 +1,107 @@
+from collections.abc import Mapping
+from typing import Any, Optional
+import numpy as np
+
+LEVEL_DTYPE = np.float64
+EMPTY_LEVELS = np.empty((0, 2), dtype=LEVEL_DTYPE)
+EMPTY_LEVELS.flags.writeable = False
+
+
+class _SlotMapping(Mapping):
+    """
+    Read-only dict-style access over __slots__ fields so existing callers that
+    do ``tick["mid_price"]`` / ``tick.get("spread")`` keep working.
+    """
+    __slots__ = ()
+    _fields: tuple = ()
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self._fields:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self):
+        return iter(self._fields)
+
+    def __len__(self) -> int:
+        return len(self._fields)
+
+    def to_dict(self) -> dict:
+        return {f: getattr(self, f) for f in self._fields}
+
+    def __repr__(self) -> str:
+        body = ", ".join(f"{f}={getattr(self, f)!r}" for f in self._fields)
+        return f"{type(self).__name__}({body})"
+
+
+class Tick(_SlotMapping):
+    """Top-of-book summary produced per websocket message."""
+    __slots__ = (
+        "best_bid", "best_ask", "spread", "mid_price",
+        "total_ask_volume", "total_bid_volume", "instId", "ts",
+    )
+    _fields = __slots__
+
+    def __init__(self, best_bid: float, best_ask: float, total_ask_volume: float,
+                 total_bid_volume: float, instId: Optional[str] = None, ts: Optional[str] = None):
+        self.best_bid = best_bid
+        self.best_ask = best_ask
+        self.spread = best_ask - best_bid
+        self.mid_price = (best_ask + best_bid) / 2
+        self.total_ask_volume = total_ask_volume
+        self.total_bid_volume = total_bid_volume
+        self.instId = instId
+        self.ts = ts
+
+
+class BookSnapshot(_SlotMapping):
+    """
+    Normalized top-N orderbook.
+
+    ``bids`` / ``asks`` are (levels, 2) float64 arrays of [price, size], best first.
+    ``bids_df`` / ``asks_df`` are only built on first access, and are attributes
+    only: iterating, dict(), to_dict() and repr() never build them.
+    """
+    __slots__ = (
+        "best_bid", "best_ask", "spread", "mid_price", "bids", "asks",
+        "total_bid_volume", "total_ask_volume", "bid_dwa", "ask_dwa",
+        "_bids_df", "_asks_df",
+    )
+    _fields = (
+        "best_bid", "best_ask", "spread", "mid_price", "bids", "asks",
+        "total_bid_volume", "total_ask_volume", "bid_dwa", "ask_dwa",
+    )
+
+    def __init__(self, bids: np.ndarray, asks: np.ndarray):
+        self.bids = bids
+        self.asks = asks
+        self.best_bid = float(bids[0, 0])
+        self.best_ask = float(asks[0, 0])
+        self.spread = self.best_ask - self.best_bid
+        self.mid_price = (self.best_ask + self.best_bid) / 2.0
+        self.total_bid_volume = float(bids[:, 1].sum())
+        self.total_ask_volume = float(asks[:, 1].sum())
+        self.bid_dwa = _depth_weighted_avg(bids, self.total_bid_volume)
+        self.ask_dwa = _depth_weighted_avg(asks, self.total_ask_volume)
+        self._bids_df = None
+        self._asks_df = None
+
+    @property
+    def bids_df(self):
+        if self._bids_df is None:
+            import pandas as pd
+            self._bids_df = pd.DataFrame(self.bids, columns=["price", "size"])
+        return self._bids_df
+
+    @property
+    def asks_df(self):
+        if self._asks_df is None:
+            import pandas as pd
+            self._asks_df = pd.DataFrame(self.asks, columns=["price", "size"])
+        return self._asks_df
+
+
+def _depth_weighted_avg(levels: np.ndarray, total_vol: float) -> float:
+    if total_vol == 0:
+        return float(levels[0, 0])
+    return float(levels[:, 0] @ levels[:, 1] / total_vol)
@@ -0,0 +1,151 @@
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+from utils.book_types import LEVEL_DTYPE
+
+# consolidated ladders are (levels, 3) arrays of [price, size, venue index], best first
+_EMPTY_LADDER = np.empty((0, 3), dtype=LEVEL_DTYPE)
+
+
+@dataclass
+class RouteResult:
+    side: str
+    qty: float
+    filled: float
+    avg_price: float            # before fees
+    notional: float
+    fee_cost: float
+    depth_exhausted: bool
+    allocations: Dict[str, Dict[str, float]] = field(default_factory=dict)  # venue -> {"qty", "notional"}
+
+
+class ConsolidatedBook:
+    """
+    One sorted ladder per side merged from several venues' top-N books.
+
+    update(venue, bids, asks) swaps out only that venue's levels: the other
+    venues' rows are already sorted, so the new ones are merged in with one
+    searchsorted + insert instead of re-sorting the whole ladder.
+    """
+
+    def __init__(self):
+        self.venues: List[str] = []
+        self.bids = _EMPTY_LADDER
+        self.asks = _EMPTY_LADDER
+        self.version = 0
+        self._lock = threading.Lock()
+
+    def update(self, venue: str, bids: np.ndarray, asks: np.ndarray):
+        """
+        Args:
+            bids, asks: (levels, 2) arrays of [price, size] for `venue`, best first
+        """
+        with self._lock:
+            idx = self._venue_index(venue)
+            self.bids = _replace(self.bids, idx, bids, descending=True)
+            self.asks = _replace(self.asks, idx, asks, descending=False)
+            self.version += 1
+
+    def remove(self, venue: str):
+        """Drop a venue's levels (e.g. on disconnect)."""
+        with self._lock:
+            if venue not in self.venues:
+                return
+            idx = self.venues.index(venue)
+            self.bids = self.bids[self.bids[:, 2] != idx]
+            self.asks = self.asks[self.asks[:, 2] != idx]
+            self.version += 1
+
+    def _venue_index(self, venue: str) -> int:
+        if venue not in self.venues:
+            self.venues.append(venue)
+        return self.venues.index(venue)
+
+    def ladder(self, side: str, depth: Optional[int] = None) -> np.ndarray:
+        """[price, size, venue index] rows for "bids" or "asks", best first."""
+        ladder = self.bids if side == "bids" else self.asks
+        return ladder if depth is None else ladder[:depth]
+
+    def levels(self, side: str, depth: Optional[int] = None) -> np.ndarray:
+        """(levels, 2) [price, size] with sizes summed across venues at equal prices."""
+        ladder = self.ladder(side)
+        if not len(ladder):
+            return ladder[:, :2]
+        # rows with equal price are adjacent in the ladder, so reduce over runs
+        breaks = np.flatnonzero(np.diff(ladder[:, 0])) + 1
+        run_starts = np.concatenate(([0], breaks))
+        sizes = np.add.reduceat(ladder[:, 1], run_starts)
+        out = np.column_stack((ladder[run_starts, 0], sizes))
+        return out if depth is None else out[:depth]
+
+    def best(self, side: str) -> Tuple[float, Optional[str]]:
+        """(price, venue) at the top of one side, (nan, None) when empty."""
+        ladder = self.ladder(side)
+        if not len(ladder):
+            return float("nan"), None
+        return float(ladder[0, 0]), self.venues[int(ladder[0, 2])]
+
+    def mid_price(self) -> float:
+        return (self.best("bids")[0] + self.best("asks")[0]) / 2.0
+
+    def route(self, side: str, qty: float, taker_fees: Optional[Dict[str, float]] = None) -> RouteResult:
+        """
+        Split a marketable order of `qty` base units across venues by walking the
+        consolidated ladder (cheapest all-in price first when taker_fees are given).
+        Size beyond the visible book is left unfilled.
+        """
+        if side not in ("Buy", "Sell"):
+            raise ValueError(f"Unknown side: {side}")
+        if qty <= 0:
+            raise ValueError("qty must be > 0")
+        ladder = self.asks if side == "Buy" else self.bids
+        fees = np.array([(taker_fees or {}).get(v, 0.0) for v in self.venues])
+        if taker_fees and len(ladder):
+            rate = fees[ladder[:, 2].astype(np.intp)]
+            effective = ladder[:, 0] * (1.0 + rate) if side == "Buy" else -ladder[:, 0] * (1.0 - rate)
+            ladder = ladder[np.argsort(effective, kind="stable")]
+
+        cum = np.cumsum(ladder[:, 1])
+        take = np.minimum(ladder[:, 1], np.maximum(qty - (cum - ladder[:, 1]), 0.0))
+        filled = float(take.sum())
+        notionals = take * ladder[:, 0]
+        venue_idx = ladder[:, 2].astype(np.intp)
+        n_venues = len(self.venues)
+        qty_by_venue = np.bincount(venue_idx, weights=take, minlength=n_venues)
+        notional_by_venue = np.bincount(venue_idx, weights=notionals, minlength=n_venues)
+        notional = float(notionals.sum())
+        return RouteResult(
+            side=side, qty=float(qty), filled=filled,
+            avg_price=notional / filled if filled > 0 else float("nan"),
+            notional=notional,
+            fee_cost=float(notional_by_venue @ fees) if n_venues else 0.0,
+            depth_exhausted=filled < qty,
+            allocations={
+                v: {"qty": float(qty_by_venue[i]), "notional": float(notional_by_venue[i])}
+                for i, v in enumerate(self.venues) if qty_by_venue[i] > 0
+            },
+        )
+
+
+def _replace(ladder: np.ndarray, idx: int, levels: np.ndarray, descending: bool) -> np.ndarray:
+    keep = ladder[ladder[:, 2] != idx] if len(ladder) else ladder
+    if not len(levels):
+        return keep
+    new = np.empty((len(levels), 3), dtype=LEVEL_DTYPE)
+    new[:, :2] = levels
+    new[:, 2] = idx
+    if not len(keep):
+        return new
+    # searchsorted needs ascending keys; negate bid prices
+    keys = -keep[:, 0] if descending else keep[:, 0]
+    new_keys = -new[:, 0] if descending else new[:, 0]
+    # final row of each new level = its insertion point + the new levels ahead of it
+    slots = np.searchsorted(keys, new_keys, side="right") + np.arange(len(new))
+    out = np.empty((len(keep) + len(new), 3), dtype=LEVEL_DTYPE)
+    is_new = np.zeros(len(out), dtype=bool)
+    is_new[slots] = True
+    out[slots] = new
+    out[~is_new] = keep
+    return out
@@ -1,77 +1,184 @@
-from typing import Dict, List, Tuple, Any
-import pandas as pd
+from typing import Dict, Iterable, Iterator, List, Any, Tuple, Union
+import numpy as np
+import json
 import math
 
-def process_orderbook_snapshot(snapshot: dict, top_n: int = 5) -> Dict[str, Any]:
+from utils.book_types import BookSnapshot, LEVEL_DTYPE
+
+
+def parse_levels(arr: List[List[Any]], top_n: int) -> np.ndarray:
+    """
+    Parse up to top_n raw [price, size, ...] rows into a (levels, 2) float array,
+    dropping rows that are malformed or non-finite.
+    """
+    rows = arr[:top_n]
+    try:
+        levels = np.array([row[:2] for row in rows], dtype=LEVEL_DTYPE).reshape(-1, 2)
+    except (TypeError, ValueError, IndexError):
+        # slow path: a malformed row somewhere, parse one by one and skip it
+        out = []
+        for p_sz in rows:
+            try:
+                p = float(p_sz[0])
+                s = float(p_sz[1])
+                if math.isfinite(p) and math.isfinite(s):
+                    out.append((p, s))
+            except Exception:
+                continue
+        return np.array(out, dtype=LEVEL_DTYPE).reshape(-1, 2)
+
+    finite = np.isfinite(levels).all(axis=1)
+    if not finite.all():
+        levels = levels[finite]
+    return levels
+
+
+def process_orderbook_snapshot(snapshot: dict, top_n: int = 5) -> Union[BookSnapshot, Dict[str, Any]]:
     """
-    Convert a raw orderbook snapshot (asks/bids lists) into a normalized dict
+    Convert a raw orderbook snapshot (asks/bids lists) into a normalized BookSnapshot
     with top_n levels, mid_price, spread, total volumes and a depth-weighted avg price.
 
     Expected snapshot format:
       { "asks": [[price_str, size_str], ...], "bids": [[price_str, size_str], ...], ... }
 
-    Returns a dict with:
+    Returns a BookSnapshot (also readable as a dict) with:
       - best_bid, best_ask, spread, mid_price
-      - bids: list of (price: float, size: float) up to top_n
-      - asks: list of (price: float, size: float) up to top_n
+      - bids: (levels, 2) array of [price, size] up to top_n
+      - asks: (levels, 2) array of [price, size] up to top_n
+      - bids_df, asks_df attributes: DataFrames, built lazily on first access
       - total_bid_volume, total_ask_volume
       - bid_dwa (depth-weighted avg price), ask_dwa
+    or an empty dict when either side has no valid levels.
     """
-    asks_raw = snapshot.get("asks") or []
-    bids_raw = snapshot.get("bids") or []
+    asks = parse_levels(snapshot.get("asks") or [], top_n)
+    bids = parse_levels(snapshot.get("bids") or [], top_n)
 
-    def _to_tuples(arr: List[List[Any]]) -> List[Tuple[float, float]]:
-        out = []
-        for p_sz in arr[:top_n]:
+    if not len(asks) or not len(bids):
+        return {}
+
+    return BookSnapshot(bids, asks)
+
+
+def _fill_side(out: np.ndarray, rows: List[List[Any]]):
+    """Write raw [price, size, ...] rows into a NaN-initialised (levels, 2) slot."""
+    rows = rows[:out.shape[0]]
+    try:
+        out[:len(rows)] = [row[:2] for row in rows]
+    except (TypeError, ValueError, IndexError):
+        out[:] = np.nan
+        for j, p_sz in enumerate(rows):
             try:
-                p = float(p_sz[0])
-                s = float(p_sz[1])
-                if math.isfinite(p) and math.isfinite(s):
-                    out.append((p, s))
+                out[j] = (float(p_sz[0]), float(p_sz[1]))
             except Exception:
                 continue
-        return out
 
-    asks = _to_tuples(asks_raw)
-    bids = _to_tuples(bids_raw)
 
-    if not asks or not bids:
-        return {}
+def _unwrap(message: Union[str, bytes, dict]) -> dict:
+    # accept raw websocket frames ({"arg":..., "data":[book]}) as well as bare books
+    if isinstance(message, (str, bytes)):
+        message = json.loads(message)
+    data = message.get("data")
+    if isinstance(data, list) and data:
+        return data[0]
+    return message
+
+
+def snapshots_to_arrays(snapshots: Iterable[Union[str, bytes, dict]], top_n: int = 5) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Stack raw snapshots (dicts, OKX push frames or their JSON text) into level arrays.
+
+    Returns:
+        (bids, asks): two (N, top_n, 2) float64 arrays of [price, size]; missing or
+        unparseable levels are NaN.
+    """
+    snapshots = list(snapshots)
+    n = len(snapshots)
+    bids = np.full((n, top_n, 2), np.nan, dtype=LEVEL_DTYPE)
+    asks = np.full((n, top_n, 2), np.nan, dtype=LEVEL_DTYPE)
+    for i, message in enumerate(snapshots):
+        try:
+            snap = _unwrap(message)
+        except Exception:
+            continue
+        _fill_side(bids[i], snap.get("bids") or [])
+        _fill_side(asks[i], snap.get("asks") or [])
+    return bids, asks
 
-    best_ask = asks[0][0]
-    best_bid = bids[0][0]
-    spread = best_ask - best_bid
-    mid_price = (best_ask + best_bid) / 2.0
-
-    total_ask_volume = sum(sz for _, sz in asks)
-    total_bid_volume = sum(sz for _, sz in bids)
-
-    def depth_weighted_avg(items: List[Tuple[float, float]]) -> float:
-        if not items:
-            return 0.0
-        total_vol = sum(sz for _, sz in items)
-        if total_vol == 0:
-            return items[0][0]
-        return sum(p * sz for p, sz in items) / total_vol
-
-    bid_dwa = depth_weighted_avg(bids)
-    ask_dwa = depth_weighted_avg(asks)
-
-    # convenience: aggregate into dataframes (optional)
-    bids_df = pd.DataFrame(bids, columns=["price", "size"])
-    asks_df = pd.DataFrame(asks, columns=["price", "size"])
-
-    return {
-        "best_bid": float(best_bid),
-        "best_ask": float(best_ask),
-        "spread": float(spread),
-        "mid_price": float(mid_price),
-        "bids": bids,
-        "asks": asks,
-        "bids_df": bids_df,
-        "asks_df": asks_df,
-        "total_bid_volume": float(total_bid_volume),
-        "total_ask_volume": float(total_ask_volume),
-        "bid_dwa": float(bid_dwa),
-        "ask_dwa": float(ask_dwa),
+
+def _side_stats(levels: np.ndarray):
+    prices = levels[..., 0]
+    sizes = levels[..., 1]
+    valid = np.isfinite(prices) & np.isfinite(sizes)
+    has_levels = valid.any(axis=1)
+
+    first = valid.argmax(axis=1)
+    best = np.take_along_axis(prices, first[:, None], axis=1)[:, 0]
+
+    sizes = np.where(valid, sizes, 0.0)
+    total = sizes.sum(axis=1)
+    notional = np.where(valid, prices, 0.0) * sizes
+    notional = notional.sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        dwa = np.where(total != 0, notional / total, best)
+    return has_levels, best, total, dwa
+
+
+def process_orderbook_batch(bids: np.ndarray, asks: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Vectorized process_orderbook_snapshot over N snapshots.
+
+    Args:
+        bids, asks: (N, levels, 2) arrays of [price, size], best level first.
+            Rows containing NaN/inf in price or size are masked out.
+
+    Returns a dict of length-N arrays:
+      - valid: True where both sides have at least one usable level
+      - best_bid, best_ask, spread, mid_price
+      - total_bid_volume, total_ask_volume
+      - bid_dwa, ask_dwa
+    Metrics of invalid snapshots are NaN.
+    """
+    bids = np.asarray(bids, dtype=LEVEL_DTYPE)
+    asks = np.asarray(asks, dtype=LEVEL_DTYPE)
+    if bids.ndim != 3 or asks.ndim != 3 or bids.shape[2] != 2 or asks.shape[2] != 2:
+        raise ValueError("bids and asks must be (N, levels, 2) arrays")
+    if bids.shape[0] != asks.shape[0]:
+        raise ValueError("bids and asks must hold the same number of snapshots")
+
+    bid_ok, best_bid, total_bid, bid_dwa = _side_stats(bids)
+    ask_ok, best_ask, total_ask, ask_dwa = _side_stats(asks)
+    valid = bid_ok & ask_ok
+
+    out = {
+        "best_bid": best_bid,
+        "best_ask": best_ask,
+        "spread": best_ask - best_bid,
+        "mid_price": (best_ask + best_bid) / 2.0,
+        "total_bid_volume": total_bid,
+        "total_ask_volume": total_ask,
+        "bid_dwa": bid_dwa,
+        "ask_dwa": ask_dwa,
     }
+    if not valid.all():
+        for arr in out.values():
+            arr[~valid] = np.nan
+    out["valid"] = valid
+    return out
+
+
+def process_orderbook_stream(messages: Iterable[Union[str, bytes, dict]], top_n: int = 5,
+                             chunk_size: int = 100_000) -> Iterator[Dict[str, np.ndarray]]:
+    """
+    Process an arbitrarily long stream of raw snapshots in fixed-size chunks,
+    yielding one process_orderbook_batch result per chunk so memory stays bounded.
+    """
+    if chunk_size <= 0:
+        raise ValueError("chunk_size must be > 0")
+    chunk = []
+    for message in messages:
+        chunk.append(message)
+        if len(chunk) >= chunk_size:
+            yield process_orderbook_batch(*snapshots_to_arrays(chunk, top_n))
+            chunk = []
+    if chunk:
+        yield process_orderbook_batch(*snapshots_to_arrays(chunk, top_n))
@@ -1,18 +1,151 @@
-from typing import Literal
+import json
+import os
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, List, Literal, Optional, Tuple, Union
+import numpy as np
+
+DEFAULT_FEE_CONFIG = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config", "fee_schedules.json")
+SECONDS_PER_DAY = 86400
+
+
+@dataclass
+class FeeTier:
+    name: str
+    min_volume_30d: float
+    maker: float
+    taker: float
+
+
+class FeeSchedule:
+    """Volume-tiered maker/taker rates for one exchange + instrument type."""
+
+    def __init__(self, tiers: List[FeeTier], exchange: str = "OKX", inst_type: str = "spot"):
+        if not tiers:
+            raise ValueError("Fee schedule needs at least one tier")
+        self.exchange = exchange
+        self.inst_type = inst_type
+        self.tiers = sorted(tiers, key=lambda t: t.min_volume_30d)
+        self._by_name = {t.name: t for t in self.tiers}
+        self._thresholds = np.array([t.min_volume_30d for t in self.tiers])
+
+    def __contains__(self, tier: str) -> bool:
+        return tier in self._by_name
+
+    def get(self, tier: str) -> FeeTier:
+        if tier not in self._by_name:
+            raise ValueError(f"Unknown fee tier: {tier}")
+        return self._by_name[tier]
+
+    def tier_for_volume(self, volume_30d: float) -> FeeTier:
+        idx = int(np.searchsorted(self._thresholds, volume_30d, side="right")) - 1
+        return self.tiers[max(idx, 0)]
+
+
+def load_fee_schedules(path: str = DEFAULT_FEE_CONFIG) -> Dict[Tuple[str, str], FeeSchedule]:
+    """
+    Load schedules from JSON shaped as
+    {exchange: {inst_type: [{"tier", "min_volume_30d", "maker", "taker"}, ...]}}.
+    """
+    with open(path) as f:
+        raw = json.load(f)
+    schedules = {}
+    for exchange, by_type in raw.items():
+        for inst_type, tiers in by_type.items():
+            schedules[(exchange, inst_type)] = FeeSchedule(
+                [FeeTier(t["tier"], float(t.get("min_volume_30d", 0.0)), float(t["maker"]), float(t["taker"])) for t in tiers],
+                exchange, inst_type,
+            )
+    return schedules
+
+
+class RollingVolume:
+    """Trailing N-day traded notional kept in daily buckets."""
+
+    def __init__(self, days: int = 30):
+        self.days = days
+        self._buckets: deque = deque()  # (day_index, notional)
+        self.total = 0.0
+
+    def add(self, notional: float, ts: Optional[float] = None):
+        day = int((time.time() if ts is None else ts) // SECONDS_PER_DAY)
+        if self._buckets and self._buckets[-1][0] == day:
+            self._buckets[-1][1] += notional
+        else:
+            self._buckets.append([day, notional])
+        self.total += notional
+        self._expire(day)
+
+    def seed(self, notional: float, ts: Optional[float] = None):
+        """Book a known trailing total as if traded evenly over the window, so it rolls off day by day."""
+        today = int((time.time() if ts is None else ts) // SECONDS_PER_DAY)
+        per_day = notional / self.days
+        for day in range(today - self.days + 1, today + 1):
+            if self._buckets and self._buckets[-1][0] >= day:
+                continue
+            self._buckets.append([day, per_day])
+            self.total += per_day
+
+    def value(self, ts: Optional[float] = None) -> float:
+        self._expire(int((time.time() if ts is None else ts) // SECONDS_PER_DAY))
+        return self.total
+
+    def _expire(self, today: int):
+        while self._buckets and self._buckets[0][0] <= today - self.days:
+            self.total -= self._buckets.popleft()[1]
+        if not self._buckets:
+            self.total = 0.0
+
 
 class FeeModel:
+    # OKX spot fallback for when config/fee_schedules.json is missing
     FEE_TABLE = {
-        "Tier 1": {"maker": 0.001, "taker": 0.002},
-        "Tier 2": {"maker": 0.0008, "taker": 0.0015},
-        "Tier 3": {"maker": 0.0005, "taker": 0.001},
+        "Tier 1": {"min_volume_30d": 0.0, "maker": 0.001, "taker": 0.002},
+        "Tier 2": {"min_volume_30d": 5_000_000.0, "maker": 0.0008, "taker": 0.0015},
+        "Tier 3": {"min_volume_30d": 10_000_000.0, "maker": 0.0005, "taker": 0.001},
     }
 
-    def __init__(self, tier: str = "Tier 1"):
-        if tier not in self.FEE_TABLE:
-            raise ValueError(f"Unknown fee tier: {tier}")
-        self.tier = tier
-        self.maker_fee = float(self.FEE_TABLE[tier]["maker"])
-        self.taker_fee = float(self.FEE_TABLE[tier]["taker"])
+    _default_schedule: Optional[FeeSchedule] = None
+
+    def __init__(self, tier: str = "Tier 1", schedule: Optional[FeeSchedule] = None, auto_tier: bool = False):
+        self.schedule = schedule or self.default_schedule()
+        if auto_tier and len(self.schedule.tiers) > 1 and not self.schedule._thresholds[1:].any():
+            raise ValueError("auto_tier needs a fee schedule with volume thresholds")
+        self.auto_tier = auto_tier
+        self.volume_30d = RollingVolume(30)
+        self.set_tier(tier)
+
+    @classmethod
+    def default_schedule(cls) -> FeeSchedule:
+        """OKX spot from the fee config, read once; FEE_TABLE if the file is missing."""
+        if cls._default_schedule is None:
+            schedule = None
+            if os.path.exists(DEFAULT_FEE_CONFIG):
+                schedule = load_fee_schedules(DEFAULT_FEE_CONFIG).get(("OKX", "spot"))
+            if schedule is None:
+                schedule = FeeSchedule(
+                    [FeeTier(name, rates["min_volume_30d"], rates["maker"], rates["taker"])
+                     for name, rates in cls.FEE_TABLE.items()]
+                )
+            FeeModel._default_schedule = schedule
+        return cls._default_schedule
+
+    @classmethod
+    def from_config(cls, exchange: str = "OKX", inst_type: str = "spot", path: str = DEFAULT_FEE_CONFIG,
+                    volume_30d: float = 0.0, auto_tier: bool = True) -> "FeeModel":
+        """
+        Build a model from the fee config, starting at the tier matching `volume_30d`.
+        That trailing volume is spread over the past 30 days so it rolls off gradually.
+        """
+        schedules = load_fee_schedules(path)
+        if (exchange, inst_type) not in schedules:
+            raise ValueError(f"No fee schedule for {exchange} {inst_type}")
+        schedule = schedules[(exchange, inst_type)]
+        model = cls(schedule.tier_for_volume(volume_30d).name, schedule, auto_tier)
+        if volume_30d:
+            model.volume_30d.seed(volume_30d)
+        return model
 
     def calculate_fee(self, volume: float, is_maker: bool) -> float:
         """
@@ -23,13 +156,40 @@ class FeeModel:
         fee_rate = self.maker_fee if is_maker else self.taker_fee
         return volume * fee_rate
 
+    def calculate_fees(self, volumes: np.ndarray, is_maker: Union[bool, np.ndarray]) -> np.ndarray:
+        """
+        Vectorized calculate_fee over arrays of notionals; is_maker may be a scalar
+        or a boolean array broadcastable against volumes.
+        """
+        volumes = np.asarray(volumes, dtype=np.float64)
+        if (volumes < 0).any():
+            raise ValueError("volume must be non-negative")
+        rates = np.where(is_maker, self.maker_fee, self.taker_fee)
+        return volumes * rates
+
     def fee_rate(self, is_maker: bool) -> float:
         """Return the fee rate for maker or taker."""
         return self.maker_fee if is_maker else self.taker_fee
 
+    def record_fill(self, notional: float, ts: Optional[float] = None) -> str:
+        """
+        Add executed notional to the rolling 30-day volume; with auto_tier the
+        model moves to the tier that volume qualifies for.
+
+        Returns:
+            current tier name
+        """
+        self.volume_30d.add(notional, ts)
+        if self.auto_tier:
+            tier = self.schedule.tier_for_volume(self.volume_30d.value(ts)).name
+            if tier != self.tier:
+                self.set_tier(tier)
+        return self.tier
+
     def set_tier(self, tier: str):
-        if tier not in self.FEE_TABLE:
+        if tier not in self.schedule:
             raise ValueError(f"Unknown fee tier: {tier}")
+        rates = self.schedule.get(tier)
         self.tier = tier
-        self.maker_fee = float(self.FEE_TABLE[tier]["maker"])
-        self.taker_fee = float(self.FEE_TABLE[tier]["taker"])
+        self.maker_fee = float(rates.maker)
+        self.taker_fee = float(rates.taker)
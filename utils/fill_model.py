@@ -0,0 +1,54 @@
+from typing import Tuple
+import numpy as np
+
+
+def walk_book(levels: np.ndarray, qty: float) -> Tuple[float, float]:
+    """
+    Fill `qty` (base units) by consuming resting levels best-first.
+
+    Args:
+        levels: (levels, 2) array of [price, size] on the side being taken
+            (asks for a buy, bids for a sell); NaN levels are ignored
+
+    Returns:
+        (filled_qty, notional); filled_qty < qty when the visible book is too thin
+    """
+    if qty <= 0:
+        return 0.0, 0.0
+    prices = levels[:, 0]
+    sizes = levels[:, 1]
+    ok = np.isfinite(prices) & np.isfinite(sizes)
+    if not ok.all():
+        prices = prices[ok]
+        sizes = sizes[ok]
+    cum = np.cumsum(sizes)
+    # number of levels fully consumed before the order is done
+    k = int(np.searchsorted(cum, qty, side="left"))
+    if k >= len(sizes):
+        return float(cum[-1]) if len(cum) else 0.0, float(prices @ sizes)
+    full = float(prices[:k] @ sizes[:k])
+    taken_before = float(cum[k - 1]) if k > 0 else 0.0
+    return float(qty), full + (qty - taken_before) * float(prices[k])
+
+
+def walk_book_batch(levels: np.ndarray, qty: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Vectorized walk_book over N books and N order sizes.
+
+    Args:
+        levels: (N, levels, 2) arrays of [price, size]
+        qty: (N,) order sizes
+
+    Returns:
+        (filled_qty, notional) arrays of shape (N,)
+    """
+    prices = levels[..., 0]
+    sizes = levels[..., 1]
+    ok = np.isfinite(prices) & np.isfinite(sizes)
+    prices = np.where(ok, prices, 0.0)
+    sizes = np.where(ok, sizes, 0.0)
+    qty = np.asarray(qty, dtype=np.float64)
+
+    cum_before = np.cumsum(sizes, axis=1) - sizes
+    take = np.clip(qty[:, None] - cum_before, 0.0, sizes)
+    return take.sum(axis=1), (take * prices).sum(axis=1)
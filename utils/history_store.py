@@ -0,0 +1,232 @@
+import glob
+import os
+import threading
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+import numpy as np
+from loguru import logger
+
+from utils.bars import BarAggregator
+
+# One row per dashboard refresh that saw a new book version. Field names match the
+# keys of OrderBookClient.get_latest_orderbook() plus the measured latency.
+HISTORY_FIELDS = (
+    "best_bid", "best_ask", "spread", "mid_price", "total_bid_volume", "total_ask_volume", "latency_ms",
+)
+HISTORY_DTYPE = np.dtype([("version", "i8"), ("ts", "f8")] + [(name, "f8") for name in HISTORY_FIELDS])
+# rows older than the retention window are compacted into bars of these sizes
+COMPACT_RESOLUTIONS = (60, 3600)
+SEGMENT_SUFFIX = ".hist.npy"
+
+
+class HistoryStore:
+    """
+    Bounded tick history for one instrument, shared by every dashboard session.
+
+    Raw rows live in a fixed-size ring sized from `memory_budget_bytes`, so memory
+    in use stays flat however long the app runs. Rows leave the ring when they are
+    older than `retention_s` or when the ring is full. Evicted rows are compacted
+    into 1m / 1h bars (utils.bars) and, with `spill_dir`, also written to disk as
+    .npy segments that are deleted after `spill_retention_s`. Evicted rows are
+    buffered until there is a ring eviction's worth of them (`evict_fraction` of
+    the ring) or they span `spill_interval_s`, so a once-a-second expiry does not
+    write a file per row; buffered rows are lost if the process exits.
+
+        store = HistoryStore(memory_budget_bytes=8 << 20, retention_s=3600, spill_dir="history/")
+        store.append(client.version, time.time(), client.get_latest_orderbook(), latency_ms)
+        store.tail(120)          # newest raw rows
+        store.rows(since=t0)     # raw rows incl. those spilled to disk
+        store.bars.bars("1m")    # compacted history
+        store.memory()           # {"raw_bytes": ..., "bar_bytes": ..., "spilled_bytes": ...}
+
+    Args:
+        memory_budget_bytes: size of the raw row ring
+        retention_s: raw rows older than this are compacted (None = only when the ring is full)
+        spill_dir: directory for spilled raw segments (None = compact only)
+        spill_retention_s: spilled segments whose newest row is older than this are deleted
+        evict_fraction: share of the ring freed at once when it is full, and the
+            number of evicted rows written per segment
+        spill_interval_s: evicted rows are written at least this often
+    """
+
+    def __init__(self, memory_budget_bytes: int = 8 << 20, retention_s: Optional[float] = 3600.0,
+                 spill_dir: Optional[str] = None, spill_retention_s: Optional[float] = 7 * 86400.0,
+                 evict_fraction: float = 0.125, spill_interval_s: float = 3600.0):
+        capacity = int(memory_budget_bytes) // HISTORY_DTYPE.itemsize
+        if capacity < 2:
+            raise ValueError("memory_budget_bytes is too small for two rows")
+        if not 0 < evict_fraction <= 1:
+            raise ValueError("evict_fraction must be in (0, 1]")
+        self.capacity = capacity
+        self.retention_s = retention_s
+        self.spill_dir = spill_dir
+        self.spill_retention_s = spill_retention_s
+        self.spill_interval_s = spill_interval_s
+        self.bars = BarAggregator(COMPACT_RESOLUTIONS)
+        self.appended = 0       # rows ever appended; changes whenever the history does
+        self.compacted = 0
+        self._rows = np.zeros(capacity, dtype=HISTORY_DTYPE)
+        self._start = 0         # ring index of the oldest row
+        self._count = 0
+        self._evict_rows = max(1, int(capacity * evict_fraction))
+        self._last_version = None
+        self._next_expiry = 0.0
+        # (first ts, last ts, path, bytes), oldest first
+        self._segments: Deque[Tuple[float, float, str, int]] = deque()
+        self._spilled_bytes = 0
+        self._unspilled: List[np.ndarray] = []   # evicted rows waiting for the next segment
+        self._unspilled_rows = 0
+        self._lock = threading.Lock()
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+            self._segments = deque(_scan_segments(spill_dir))
+            self._spilled_bytes = sum(segment[3] for segment in self._segments)
+
+    # ---- writing ----
+    def append(self, version, ts: float, data: Dict[str, float], latency_ms: float = 0.0) -> bool:
+        """
+        Add one row; safe to call from several sessions for the same feed.
+
+        Returns:
+            False when `version` is not newer than the last recorded one (another
+            session got there first), so rows stay in version order
+        """
+        with self._lock:
+            if version is not None and self._last_version is not None and version <= self._last_version:
+                return False
+            if version is not None:
+                self._last_version = version
+            if self._count == self.capacity:
+                self._evict(self._evict_rows)
+            i = (self._start + self._count) % self.capacity
+            self._rows[i] = (
+                version if version is not None else -1, ts,
+                *[data.get(name) or 0.0 for name in HISTORY_FIELDS[:-1]], latency_ms,
+            )
+            self._count += 1
+            self.appended += 1
+            if ts >= self._next_expiry:
+                # checked once a second: retention only needs to be approximate
+                self._expire(ts)
+                self._next_expiry = ts + 1.0
+        return True
+
+    def _expire(self, now: float):
+        if self.retention_s is not None:
+            n = int(np.searchsorted(self._ordered()["ts"], now - self.retention_s, side="left"))
+            if n:
+                self._evict(n)
+        if self.spill_retention_s is not None:
+            self._drop_segments(now - self.spill_retention_s)
+
+    def _evict(self, n: int):
+        rows = self._ordered()[:n]
+        for ts, mid, spread, bid_vol, ask_vol in zip(
+            rows["ts"].tolist(), rows["mid_price"].tolist(), rows["spread"].tolist(),
+            rows["total_bid_volume"].tolist(), rows["total_ask_volume"].tolist(),
+        ):
+            self.bars.add_tick(ts, mid, spread, bid_vol + ask_vol)
+        if self.spill_dir:
+            self._unspilled.append(rows.copy())
+            self._unspilled_rows += n
+            if (self._unspilled_rows >= self._evict_rows
+                    or rows["ts"][-1] - self._unspilled[0]["ts"][0] >= self.spill_interval_s):
+                self._spill(np.concatenate(self._unspilled))
+                self._unspilled = []
+                self._unspilled_rows = 0
+        self._start = (self._start + n) % self.capacity
+        self._count -= n
+        self.compacted += n
+
+    def _spill(self, rows: np.ndarray):
+        first, last = float(rows["ts"][0]), float(rows["ts"][-1])
+        path = os.path.join(self.spill_dir, f"{first:.3f}-{last:.3f}{SEGMENT_SUFFIX}")
+        try:
+            np.save(path, rows)
+            nbytes = os.path.getsize(path)
+        except OSError as e:
+            logger.warning(f"Could not spill {len(rows)} history rows to {path}: {e}")
+            return
+        self._segments.append((first, last, path, nbytes))
+        self._spilled_bytes += nbytes
+
+    def _drop_segments(self, cutoff: float):
+        while self._segments and self._segments[0][1] < cutoff:
+            _, _, path, nbytes = self._segments.popleft()
+            self._spilled_bytes -= nbytes
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    # ---- reading ----
+    def _ordered(self) -> np.ndarray:
+        end = self._start + self._count
+        if end <= self.capacity:
+            return self._rows[self._start:end]
+        return np.concatenate((self._rows[self._start:], self._rows[:end - self.capacity]))
+
+    def tail(self, n: Optional[int] = None, since: Optional[float] = None) -> np.ndarray:
+        """Newest `n` raw rows in memory (at or after `since`), oldest first (a copy)."""
+        with self._lock:
+            rows = self._ordered()
+            if since is not None:
+                rows = rows[int(np.searchsorted(rows["ts"], since, side="left")):]
+            if n is not None:
+                rows = rows[-n:] if n > 0 else rows[:0]
+            return rows.copy()
+
+    def rows(self, since: Optional[float] = None, include_spilled: bool = True) -> np.ndarray:
+        """Raw rows at or after `since`, reading spilled segments back from disk first."""
+        with self._lock:
+            segments = [path for _, last, path, _ in self._segments if since is None or last >= since]
+            recent = np.concatenate(self._unspilled + [self._ordered()])
+        parts = []
+        if include_spilled:
+            for path in segments:
+                try:
+                    part = np.load(path)
+                except (OSError, ValueError):
+                    continue
+                if part.dtype == HISTORY_DTYPE:
+                    parts.append(part)
+        parts.append(recent)
+        out = np.concatenate(parts)
+        if since is not None:
+            out = out[out["ts"] >= since]
+        return out
+
+    def __len__(self) -> int:
+        return self._count
+
+    def memory(self) -> Dict[str, int]:
+        """Rows and bytes held in memory (raw ring, compacted bars, rows not yet spilled) and on disk."""
+        with self._lock:
+            return {
+                "raw_rows": self._count,
+                "raw_capacity": self.capacity,
+                "raw_bytes": self._rows.nbytes,
+                "compacted_rows": self.compacted,
+                "bar_bytes": self.bars.nbytes,
+                "unspilled_rows": self._unspilled_rows,
+                "spilled_segments": len(self._segments),
+                "spilled_bytes": self._spilled_bytes,
+            }
+
+    @property
+    def nbytes(self) -> int:
+        return self._rows.nbytes + self.bars.nbytes
+
+
+def _scan_segments(spill_dir: str) -> List[Tuple[float, float, str, int]]:
+    """Segments left by an earlier run, oldest first."""
+    segments = []
+    for path in glob.glob(os.path.join(spill_dir, f"*{SEGMENT_SUFFIX}")):
+        name = os.path.basename(path)[:-len(SEGMENT_SUFFIX)]
+        try:
+            first, last = (float(x) for x in name.split("-"))
+            nbytes = os.path.getsize(path)
+        except (ValueError, OSError):
+            continue
+        segments.append((first, last, path, nbytes))
+    return sorted(segments)
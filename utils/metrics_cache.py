@@ -0,0 +1,134 @@
+import threading
+from collections import OrderedDict
+from functools import cached_property
+from typing import Any, Callable, Dict, Optional
+import numpy as np
+
+from utils.book_analytics import order_book_imbalance
+
+
+class BookMetrics:
+    """
+    Derived metrics for one book version. Every metric is computed on first
+    access and kept for the lifetime of this object; a new book version gets a
+    new BookMetrics, which is what invalidates the old values.
+    """
+
+    def __init__(self, instrument: str, seq_id: Any, bids: np.ndarray, asks: np.ndarray,
+                 extra: Optional[Dict[str, Callable[["BookMetrics"], Any]]] = None):
+        self.instrument = instrument
+        self.seq_id = seq_id
+        self.bids = bids
+        self.asks = asks
+        self._extra = extra or {}
+        self._extra_values: Dict[str, Any] = {}
+
+    def levels(self, side: str) -> np.ndarray:
+        return self.bids if side == "bids" else self.asks
+
+    @cached_property
+    def mid_price(self) -> float:
+        return float(self.bids[0, 0] + self.asks[0, 0]) / 2.0
+
+    @cached_property
+    def spread(self) -> float:
+        return float(self.asks[0, 0] - self.bids[0, 0])
+
+    @cached_property
+    def cum_bid_depth(self) -> np.ndarray:
+        return np.cumsum(self.bids[:, 1])
+
+    @cached_property
+    def cum_ask_depth(self) -> np.ndarray:
+        return np.cumsum(self.asks[:, 1])
+
+    def cum_depth(self, side: str) -> np.ndarray:
+        return self.cum_bid_depth if side == "bids" else self.cum_ask_depth
+
+    def pct_of_side(self, side: str) -> np.ndarray:
+        cum = self.cum_depth(side)
+        total = cum[-1] if len(cum) else 0.0
+        if total <= 0:
+            return np.zeros(len(cum))
+        return self.levels(side)[:, 1] / total * 100
+
+    @cached_property
+    def bid_dwa(self) -> float:
+        return float(self.bid_fill_curve[-1]) if len(self.bids) else float("nan")
+
+    @cached_property
+    def ask_dwa(self) -> float:
+        return float(self.ask_fill_curve[-1]) if len(self.asks) else float("nan")
+
+    @cached_property
+    def imbalance(self) -> float:
+        return order_book_imbalance(self.bids, self.asks, max(len(self.bids), len(self.asks)))
+
+    @cached_property
+    def bid_fill_curve(self) -> np.ndarray:
+        """Average fill price for selling the cumulative size through each bid level."""
+        return _fill_curve(self.bids, self.cum_bid_depth)
+
+    @cached_property
+    def ask_fill_curve(self) -> np.ndarray:
+        """Average fill price for buying the cumulative size through each ask level."""
+        return _fill_curve(self.asks, self.cum_ask_depth)
+
+    def fill_curve(self, side: str) -> np.ndarray:
+        return self.bid_fill_curve if side == "bids" else self.ask_fill_curve
+
+    def get(self, name: str) -> Any:
+        """Named metric, including ones registered on the owning cache."""
+        if name in self._extra:
+            if name not in self._extra_values:
+                self._extra_values[name] = self._extra[name](self)
+            return self._extra_values[name]
+        return getattr(self, name)
+
+
+def _fill_curve(levels: np.ndarray, cum: np.ndarray) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.cumsum(levels[:, 0] * levels[:, 1]) / cum
+
+
+class BookMetricsCache:
+    """
+    Latest BookMetrics per instrument, keyed by book sequence id, with LRU
+    eviction once more than `max_instruments` instruments are tracked.
+    """
+
+    def __init__(self, max_instruments: int = 64):
+        if max_instruments <= 0:
+            raise ValueError("max_instruments must be > 0")
+        self.max_instruments = max_instruments
+        self._entries: "OrderedDict[str, BookMetrics]" = OrderedDict()
+        self._extra: Dict[str, Callable[[BookMetrics], Any]] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, fn: Callable[[BookMetrics], Any]):
+        """Add a lazily computed metric available as metrics.get(name)."""
+        self._extra[name] = fn
+
+    def update(self, instrument: str, seq_id: Any, bids: np.ndarray, asks: np.ndarray) -> BookMetrics:
+        """Start a new book version; the same seq_id again keeps the existing entry."""
+        with self._lock:
+            entry = self._entries.get(instrument)
+            if entry is None or entry.seq_id != seq_id:
+                entry = BookMetrics(instrument, seq_id, bids, asks, self._extra)
+                self._entries[instrument] = entry
+            self._entries.move_to_end(instrument)
+            while len(self._entries) > self.max_instruments:
+                self._entries.popitem(last=False)
+            return entry
+
+    def get(self, instrument: str, seq_id: Any = None) -> Optional[BookMetrics]:
+        """Metrics for the current version (or None if seq_id is given and stale)."""
+        with self._lock:
+            entry = self._entries.get(instrument)
+            if entry is None or (seq_id is not None and entry.seq_id != seq_id):
+                return None
+            self._entries.move_to_end(instrument)
+            return entry
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,197 @@
+# Opt-in profiling for the ingest process. Off by default: instrumented calls
+# only pay one attribute check. Enable before start-up with
+#
+#   TRADESIM_PROFILE=sample     sample the receive thread into collapsed stacks (flamegraph.pl / speedscope)
+#   TRADESIM_PROFILE=cprofile   run cProfile inside the receive thread, dump a .prof file
+#                               (written by that thread on its first message after the stop)
+#   TRADESIM_PROFILE=timings    per-function timings only
+#   TRADESIM_PROFILE_WINDOW=30  capture window in seconds
+#   TRADESIM_PROFILE_DIR=profiles
+#
+# or toggle at runtime with `kill -USR1 <pid>` once install_signal() has run in
+# the main thread. Every capture also writes <stem>.timings.json for @timed functions.
+import cProfile
+import functools
+import json
+import os
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Callable, Dict, Optional
+from loguru import logger
+
+MODES = ("sample", "cprofile", "timings")
+
+
+class FeedProfiler:
+    def __init__(self, out_dir: str = "profiles", window_s: float = 30.0, interval_s: float = 0.005):
+        self.out_dir = out_dir
+        self.window_s = window_s
+        self.interval_s = interval_s
+        self.active = False
+        self.mode: Optional[str] = None
+        self.target_thread: Optional[int] = None
+        self.timings: Dict[str, list] = {}
+        self._stacks: Counter = Counter()
+        self._sampler: Optional[threading.Thread] = None
+        self._timer: Optional[threading.Timer] = None
+        self._cprofile: Optional[cProfile.Profile] = None
+        self._cprofile_thread: Optional[int] = None
+        self._cprofile_stop: Optional[str] = None    # output stem once stop() has asked for the dump
+        self._lock = threading.Lock()
+
+    # ---- capture control ----
+    def start(self, mode: str = "sample", window_s: Optional[float] = None):
+        if mode not in MODES:
+            raise ValueError(f"Unknown profiling mode: {mode}")
+        with self._lock:
+            if self.active:
+                return
+            self.mode = mode
+            self.timings = {}
+            self._stacks = Counter()
+            self.active = True
+        if mode == "sample":
+            self._sampler = threading.Thread(target=self._sample_loop, name="feed-profiler", daemon=True)
+            self._sampler.start()
+        window = self.window_s if window_s is None else window_s
+        if window and window > 0:
+            self._timer = threading.Timer(window, self.stop)
+            self._timer.daemon = True
+            self._timer.start()
+        logger.info(f"Profiling started (mode={mode}, window={window}s)")
+
+    def stop(self) -> Optional[str]:
+        """Stop the capture and write its files. Returns the output file stem."""
+        with self._lock:
+            if not self.active:
+                return None
+            self.active = False
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._sampler is not None:
+            self._sampler.join()
+            self._sampler = None
+        stem = self._dump()
+        if self._cprofile is not None:
+            # a cProfile capture can only be disabled from its own thread: the
+            # receive thread disables and dumps it on its next message
+            self._cprofile_stop = stem
+            if self._cprofile_thread == threading.get_ident():
+                self._finish_cprofile()
+        return stem
+
+    def toggle(self, mode: Optional[str] = None):
+        if self.active:
+            self.stop()
+        else:
+            self.start(mode or os.getenv("TRADESIM_PROFILE") or "sample")
+
+    def start_from_env(self):
+        mode = os.getenv("TRADESIM_PROFILE", "").strip().lower()
+        if not mode or mode in ("0", "off", "false"):
+            return
+        self.out_dir = os.getenv("TRADESIM_PROFILE_DIR", self.out_dir)
+        self.start(mode, float(os.getenv("TRADESIM_PROFILE_WINDOW", self.window_s)))
+
+    def install_signal(self, signum: int = getattr(signal, "SIGUSR1", 0)) -> bool:
+        """Toggle captures on `signum`. Must be called from the main thread."""
+        if not signum:
+            return False
+        try:
+            signal.signal(signum, lambda *_: self.toggle())
+        except ValueError:
+            logger.warning("Profiler signal handler can only be installed from the main thread")
+            return False
+        return True
+
+    # ---- hooks ----
+    def thread_hook(self):
+        """Call from the receive thread on each message so captures target that thread."""
+        if not self.active or self._cprofile_stop is not None:
+            if self._cprofile_stop is not None and self._cprofile_thread == threading.get_ident():
+                self._finish_cprofile()
+            if not self.active:
+                return
+        ident = threading.get_ident()
+        self.target_thread = ident
+        if self.mode == "cprofile" and self._cprofile is None:
+            self._cprofile = cProfile.Profile()
+            self._cprofile_thread = ident
+            self._cprofile.enable()
+
+    def record(self, name: str, elapsed_ns: int):
+        stat = self.timings.get(name)
+        if stat is None:
+            self.timings[name] = [1, elapsed_ns, elapsed_ns]
+        else:
+            stat[0] += 1
+            stat[1] += elapsed_ns
+            if elapsed_ns > stat[2]:
+                stat[2] = elapsed_ns
+
+    # ---- internals ----
+    def _sample_loop(self):
+        while self.active:
+            target = self.target_thread
+            if target is not None:
+                frame = sys._current_frames().get(target)
+                if frame is not None:
+                    self._stacks[_collapse(frame)] += 1
+            time.sleep(self.interval_s)
+
+    def _finish_cprofile(self):
+        # owning thread only: stop collecting, then write the stats
+        profile, stem = self._cprofile, self._cprofile_stop
+        profile.disable()
+        self._cprofile = self._cprofile_thread = self._cprofile_stop = None
+        profile.dump_stats(stem + ".prof")
+        logger.info(f"Profiling wrote {stem}.prof")
+
+    def _dump(self) -> str:
+        os.makedirs(self.out_dir, exist_ok=True)
+        stem = os.path.join(self.out_dir, f"{self.mode}-{time.strftime('%Y%m%d-%H%M%S')}")
+        if self.mode == "sample":
+            with open(stem + ".collapsed", "w") as f:
+                for stack, count in self._stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+        with open(stem + ".timings.json", "w") as f:
+            json.dump({
+                name: {"calls": n, "total_ms": total / 1e6, "mean_us": total / n / 1e3, "max_us": mx / 1e3}
+                for name, (n, total, mx) in sorted(self.timings.items())
+            }, f, indent=2)
+        logger.info(f"Profiling stopped, wrote {stem}.*")
+        return stem
+
+
+def _collapse(frame) -> str:
+    parts = []
+    while frame is not None:
+        code = frame.f_code
+        parts.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(parts))
+
+
+PROFILER = FeedProfiler()
+
+
+def timed(name: Optional[str] = None) -> Callable:
+    """Record call count / total / max time for the wrapped function while a capture is active."""
+    def decorator(fn):
+        label = name or fn.__qualname__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not PROFILER.active:
+                return fn(*args, **kwargs)
+            start = time.perf_counter_ns()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                PROFILER.record(label, time.perf_counter_ns() - start)
+        return wrapper
+    return decorator
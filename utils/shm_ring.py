@@ -0,0 +1,136 @@
+import time
+from multiprocessing import shared_memory
+from typing import Optional
+import numpy as np
+
+# Header: write count, read count and dropped count, each on its own cache line so
+# the producer and consumer never write the same line.
+_HEADER_BYTES = 192
+_HEAD, _TAIL, _DROPPED = 0, 8, 16   # int64 indices, 64 bytes apart
+
+
+class ShmRing:
+    """
+    Single-producer / single-consumer ring of fixed-dtype records in a
+    multiprocessing.shared_memory block, for handing books and results between
+    processes without pickling.
+
+    The producer fills a slot through `fields` and then publishes it by bumping
+    the write count; the consumer copies published records out and bumps the read
+    count. Counters only ever grow and each is written by one side only, so no
+    lock is shared between processes. A full ring rejects new records (counted in
+    `dropped`) rather than blocking the producer.
+
+    Args:
+        dtype: record dtype (may contain sub-array fields, e.g. ("bids", "f8", (5, 2)))
+        capacity: number of records
+        name: attach to an existing ring created with the same dtype/capacity
+    """
+
+    def __init__(self, dtype, capacity: int, name: Optional[str] = None):
+        if capacity <= 0:
+            raise ValueError("capacity must be > 0")
+        self.dtype = np.dtype(dtype)
+        self.capacity = int(capacity)
+        size = _HEADER_BYTES + self.dtype.itemsize * self.capacity
+        self.owner = name is None
+        if self.owner:
+            self._shm = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            # processes started by multiprocessing share the creator's resource tracker,
+            # so only the creator unlinks the block
+            self._shm = shared_memory.SharedMemory(name=name)
+        self._counters = np.ndarray((_HEADER_BYTES // 8,), dtype=np.int64, buffer=self._shm.buf)
+        self.records = np.ndarray((self.capacity,), dtype=self.dtype, buffer=self._shm.buf, offset=_HEADER_BYTES)
+        self.fields = {f: self.records[f] for f in self.dtype.names}
+        if self.owner:
+            self._counters[:] = 0
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    def spec(self) -> tuple:
+        """(dtype descr, capacity, name): what another process needs to attach."""
+        return self.dtype.descr, self.capacity, self.name
+
+    @classmethod
+    def attach(cls, descr, capacity: int, name: str) -> "ShmRing":
+        return cls(np.dtype(descr), capacity, name)
+
+    # ---- producer ----
+    def reserve(self) -> Optional[int]:
+        """Slot index to fill next, or None (and one more drop) when the ring is full."""
+        head = int(self._counters[_HEAD])
+        if head - int(self._counters[_TAIL]) >= self.capacity:
+            self._counters[_DROPPED] += 1
+            return None
+        return head % self.capacity
+
+    def publish(self):
+        """Make the slot returned by reserve() visible to the consumer."""
+        self._counters[_HEAD] += 1
+
+    def put(self, record) -> bool:
+        slot = self.reserve()
+        if slot is None:
+            return False
+        self.records[slot] = record
+        self.publish()
+        return True
+
+    # ---- consumer ----
+    def get_batch(self, max_records: Optional[int] = None, release: bool = True) -> np.ndarray:
+        """
+        Copy out up to `max_records` published records, oldest first.
+
+        Args:
+            release: free the slots right away; with False the records still count
+                in len() until release(len(batch)), which must come before the next get
+        """
+        tail = int(self._counters[_TAIL])
+        n = int(self._counters[_HEAD]) - tail
+        if max_records is not None:
+            n = min(n, max_records)
+        if n <= 0:
+            return self.records[:0].copy()
+        start = tail % self.capacity
+        end = start + n
+        if end <= self.capacity:
+            out = self.records[start:end].copy()
+        else:
+            out = np.concatenate((self.records[start:], self.records[:end - self.capacity]))
+        if release:
+            self._counters[_TAIL] = tail + n
+        return out
+
+    def release(self, n: int):
+        self._counters[_TAIL] += n
+
+    def wait_batch(self, max_records: Optional[int] = None, timeout: float = 0.1,
+                   max_sleep_s: float = 0.002, release: bool = True) -> np.ndarray:
+        """get_batch(), polling with exponential backoff (up to `max_sleep_s`) until `timeout`."""
+        deadline = time.monotonic() + timeout
+        sleep = 20e-6
+        while True:
+            batch = self.get_batch(max_records, release)
+            if len(batch) or time.monotonic() >= deadline:
+                return batch
+            time.sleep(sleep)
+            sleep = min(sleep * 2, max_sleep_s)
+
+    # ---- both ----
+    def __len__(self) -> int:
+        return int(self._counters[_HEAD]) - int(self._counters[_TAIL])
+
+    @property
+    def dropped(self) -> int:
+        return int(self._counters[_DROPPED])
+
+    def close(self):
+        """Detach; the creating side also frees the block."""
+        self._counters = self.records = None
+        self.fields = {}
+        self._shm.close()
+        if self.owner:
+            self._shm.unlink()
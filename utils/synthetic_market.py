@@ -0,0 +1,357 @@
+import json
+import math
+from dataclasses import dataclass
+from typing import Iterator, List, Optional
+import numpy as np
+from scipy.signal import lfilter
+
+from websockets.trade_tape import TRADE_DTYPE, BUY, SELL
+
+
+@dataclass
+class MarketConfig:
+    """
+    Order-flow parameters of SyntheticMarket. Sizes are in base units, times in seconds.
+
+    Args:
+        rate: background event rate (events/s)
+        branching: Hawkes branching ratio; each event triggers on average this many
+            more (0 = Poisson, must be < 1). The long-run rate is rate / (1 - branching).
+        decay_s: mean delay between an event and the events it triggers
+        p_trade: share of events that are market orders (split evenly buy / sell)
+        depth: mean resting size at the touch
+        depth_slope: extra mean size per level away from the touch (1.0 doubles it at level 2)
+        size_vol: log-normal dispersion of resting sizes
+        size_halflife: updates of one level for its size to revert halfway to the mean
+        trade_size: mean market order size (exponential); orders at least as large as the
+            touch sweep it and move the price one tick
+        refill_s: time constant for a consumed touch to fill back up; for half of it the
+            other side lags one tick behind a sweep
+    """
+    mid: float = 30_000.0
+    tick: float = 0.1
+    levels: int = 5
+    rate: float = 2_000.0
+    branching: float = 0.5
+    decay_s: float = 0.01
+    p_trade: float = 0.1
+    depth: float = 1.0
+    depth_slope: float = 0.5
+    size_vol: float = 0.5
+    size_halflife: float = 20.0
+    trade_size: float = 0.1
+    refill_s: float = 0.2
+    lot: float = 1e-6
+    start_ts: float = 1_700_000_000.0
+
+
+@dataclass
+class MarketBatch:
+    """
+    One chunk of generated market data, every array in event order.
+
+    ts/bids/asks hold the book after each event (one L2 update per event) in the
+    TickStore layout; trades holds the market orders (websockets.trade_tape.TRADE_DTYPE)
+    and trade_rows the book row each one produced.
+    """
+    ts: np.ndarray                 # (N,)
+    bids: np.ndarray               # (N, levels, 2) [price, size], best first
+    asks: np.ndarray               # (N, levels, 2)
+    seq: np.ndarray                # (N,) global update sequence number
+    trades: np.ndarray             # (M,) TRADE_DTYPE
+    trade_rows: np.ndarray         # (M,) index into ts/bids/asks
+    trade_ids: np.ndarray          # (M,) global trade sequence number
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+    def split(self, n: int):
+        """(first n updates, the rest), each with its own trades; both are views."""
+        cut = int(np.searchsorted(self.trade_rows, n))
+        head = MarketBatch(self.ts[:n], self.bids[:n], self.asks[:n], self.seq[:n],
+                           self.trades[:cut], self.trade_rows[:cut], self.trade_ids[:cut])
+        tail = MarketBatch(self.ts[n:], self.bids[n:], self.asks[n:], self.seq[n:],
+                           self.trades[cut:], self.trade_rows[cut:] - n, self.trade_ids[cut:])
+        return head, tail
+
+    def snapshots(self) -> List[dict]:
+        """Books as OKX `books5` data entries (what process_orderbook_snapshot and OrderBookProcessor take)."""
+        ts_ms = np.round(self.ts * 1000).astype(np.int64).tolist()
+        return [
+            {"asks": _levels_text(asks), "bids": _levels_text(bids), "ts": str(t), "seqId": s}
+            for bids, asks, t, s in zip(self.bids.tolist(), self.asks.tolist(), ts_ms, self.seq.tolist())
+        ]
+
+    def book_frames(self, inst_id: str = "BTC-USDT") -> List[str]:
+        """OKX `books5` push frames (JSON text), one per update."""
+        arg = {"channel": "books5", "instId": inst_id}
+        return [json.dumps({"arg": arg, "data": [book]}) for book in self.snapshots()]
+
+    def trade_frames(self, inst_id: str = "BTC-USDT") -> List[str]:
+        """OKX `trades` push frames (JSON text), one per trade."""
+        arg = {"channel": "trades", "instId": inst_id}
+        return [json.dumps({"arg": arg, "data": [row]}) for row in self._trade_rows(inst_id)]
+
+    def feed_frames(self, inst_id: str = "BTC-USDT") -> List[str]:
+        """Book and trade frames interleaved as a live feed would send them (a trade before its book)."""
+        books = self.book_frames(inst_id)
+        trades = self.trade_frames(inst_id)
+        out: List[str] = []
+        start = 0
+        for row, frame in zip(self.trade_rows.tolist(), trades):
+            out.extend(books[start:row])
+            out.append(frame)
+            start = row
+        out.extend(books[start:])
+        return out
+
+    def _trade_rows(self, inst_id: str) -> List[dict]:
+        t = self.trades
+        ts_ms = np.round(t["ts"] * 1000).astype(np.int64).tolist()
+        return [
+            {"instId": inst_id, "tradeId": str(i), "px": f"{px:.12g}", "sz": f"{sz:.6f}",
+             "side": "buy" if side == BUY else "sell", "ts": str(ms)}
+            for i, px, sz, side, ms in zip(self.trade_ids.tolist(), t["px"].tolist(), t["sz"].tolist(),
+                                           t["side"].tolist(), ts_ms)
+        ]
+
+
+def _levels_text(levels: list) -> list:
+    return [[f"{px:.12g}", f"{sz:.6f}", "0", "1"] for px, sz in levels]
+
+
+class SyntheticMarket:
+    """
+    Seedable, vectorized order-flow simulator for load and stress tests.
+
+    Event times follow a Hawkes process with an exponential kernel (Poisson with
+    branching=0), generated cluster by cluster: every background event draws its
+    triggered events generation by generation, so a chunk costs a handful of
+    NumPy calls. Each event is either a limit order / cancel that moves the size
+    of one level (log-normal sizes reverting to a depth profile, with the touch
+    more active than deeper levels) or a market order. A market order at least
+    as large as the touch sweeps it: the price moves one tick, the new touch
+    starts empty and refills, and the other side lags a tick for a while, so the
+    spread widens.
+
+    Events are simulated in fixed blocks of about BLOCK_EVENTS and handed out in
+    whatever chunk sizes are asked for, with state carried over between blocks,
+    so any number of events can be streamed with bounded memory and the same
+    seed gives the same data however it is chunked: generate(n) equals the
+    concatenated chunks(n, k) for every k.
+
+        market = SyntheticMarket(MarketConfig(rate=50_000), seed=1)
+        for batch in market.chunks(10_000_000, chunk_events=500_000):
+            store.append(batch.ts, batch.bids, batch.asks)
+
+    Args:
+        config: MarketConfig (defaults if None)
+        seed: numpy Generator seed
+    """
+
+    BLOCK_EVENTS = 1 << 16
+
+    def __init__(self, config: Optional[MarketConfig] = None, seed: Optional[int] = 7):
+        self.config = cfg = config or MarketConfig()
+        if cfg.rate <= 0 or cfg.tick <= 0 or cfg.levels < 1:
+            raise ValueError("rate, tick and levels must be > 0")
+        if not 0 <= cfg.branching < 1:
+            raise ValueError("branching must be in [0, 1)")
+        if not 0 <= cfg.p_trade <= 1:
+            raise ValueError("p_trade must be in [0, 1]")
+        self.rng = np.random.default_rng(seed)
+        n_queues = 2 * cfg.levels
+        level = np.arange(cfg.levels)
+        self._mean_size = cfg.depth * (1.0 + cfg.depth_slope * level)           # (L,)
+        # limit order activity decays away from the touch
+        weights = np.tile(np.exp(-level / 2.0), 2)
+        self._queue_cdf = np.cumsum(weights / weights.sum())
+        self._ar = 0.5 ** (1.0 / cfg.size_halflife)
+        self._ar_scale = math.sqrt(1.0 - self._ar ** 2)
+        # carried state
+        self.now = cfg.start_ts
+        self.events = 0                                    # updates handed out
+        self.trade_count = 0                               # trades handed out
+        self._built_events = 0
+        self._built_trades = 0
+        self._ready: Optional[MarketBatch] = None          # simulated, not handed out yet
+        self._price = int(round(cfg.mid / cfg.tick))       # best bid in ticks, once the lag is over
+        self._touch = (self._price, self._price + 1)       # last (best bid, best ask) in ticks
+        self._x = self.rng.standard_normal(n_queues)       # per-queue log size deviation
+        self._last_trade = np.full(2, -np.inf)             # per side: time and depletion of the last take
+        self._last_depletion = np.zeros(2)
+        self._last_sweep = np.full(2, -np.inf)             # per side: time of the last sweep
+        self._pending = np.empty(0)                        # triggered events beyond the last window
+
+    @property
+    def event_rate(self) -> float:
+        """Long-run events per second."""
+        return self.config.rate / (1.0 - self.config.branching)
+
+    # ---- arrivals ----
+    def _arrivals(self, duration_s: float) -> np.ndarray:
+        """Event times in [now, now + duration_s); later triggered events wait for the next window."""
+        cfg = self.config
+        end = self.now + duration_s
+        n = self.rng.poisson(cfg.rate * duration_s)
+        times = [self.now + self.rng.random(n) * duration_s, self._pending]
+        parents = times[0]
+        while cfg.branching > 0 and len(parents):
+            counts = self.rng.poisson(cfg.branching, len(parents))
+            parents = np.repeat(parents, counts) + self.rng.exponential(cfg.decay_s, int(counts.sum()))
+            times.append(parents)
+        times = np.sort(np.concatenate(times))
+        cut = int(np.searchsorted(times, end))
+        self._pending = times[cut:]
+        self.now = end
+        return times[:cut]
+
+    # ---- generation ----
+    def generate(self, n_events: int) -> MarketBatch:
+        """Exactly `n_events` (> 0) updates (and the trades among them)."""
+        if n_events <= 0:
+            raise ValueError("n_events must be > 0")
+        parts = list(self.chunks(n_events, n_events))
+        return parts[0] if len(parts) == 1 else concat_batches(parts)
+
+    def chunks(self, n_events: int, chunk_events: int = 500_000) -> Iterator[MarketBatch]:
+        """Stream `n_events` updates in batches of `chunk_events` (the last one may be shorter)."""
+        if chunk_events <= 0:
+            raise ValueError("chunk_events must be > 0")
+        left = int(n_events)
+        while left > 0:
+            want = min(left, chunk_events)
+            parts = []
+            while want > 0:
+                while self._ready is None or not len(self._ready):
+                    times = self._arrivals(self.BLOCK_EVENTS / self.event_rate)
+                    if len(times):
+                        self._ready = self._build(times)
+                part, self._ready = self._ready.split(want)
+                parts.append(part)
+                want -= len(part)
+            batch = parts[0] if len(parts) == 1 else concat_batches(parts)
+            left -= len(batch)
+            self.events += len(batch)
+            self.trade_count += len(batch.trades)
+            yield batch
+
+    def _build(self, ts: np.ndarray) -> MarketBatch:
+        cfg, rng = self.config, self.rng
+        n, levels = len(ts), cfg.levels
+        rows = np.arange(n)
+
+        # event marks: market buy / market sell / a limit update of one (side, level) queue
+        u = rng.random(n)
+        is_trade = u < cfg.p_trade
+        is_buy = is_trade & (u < cfg.p_trade / 2)
+        queue = np.searchsorted(self._queue_cdf, rng.random(n), side="right").clip(0, 2 * levels - 1)
+
+        # per-queue AR(1) of log size, advanced only on that queue's own updates
+        x = np.empty((n, 2 * levels))
+        for j in range(2 * levels):
+            hits = np.flatnonzero((queue == j) & ~is_trade)
+            if not len(hits):
+                x[:, j] = self._x[j]
+                continue
+            shocks = self._ar_scale * rng.standard_normal(len(hits))
+            path, _ = lfilter([1.0], [1.0, -self._ar], shocks, zi=[self._ar * self._x[j]])
+            pos = np.zeros(n, dtype=np.int64)
+            pos[hits] = np.arange(1, len(hits) + 1)
+            x[:, j] = np.concatenate(([self._x[j]], path))[np.maximum.accumulate(pos)]
+            self._x[j] = path[-1]
+        sizes = np.exp(cfg.size_vol * x - 0.5 * cfg.size_vol ** 2).reshape(n, 2, levels) * self._mean_size
+
+        # market orders take the touch of the opposite side (asks = side 1 for a buy)
+        take_side = np.where(is_buy, 1, 0)
+        touch = sizes[rows, take_side, 0]
+        size = rng.exponential(cfg.trade_size, n)
+        sweep = is_trade & (size >= touch)
+        size = np.minimum(size, touch)
+        depletion = np.where(is_trade, size / np.maximum(touch, cfg.lot), 0.0)
+
+        # price: each sweep moves the best price one tick in the taker's direction
+        move = np.where(sweep, np.where(is_buy, 1, -1), 0)
+        price = self._price + np.cumsum(move)
+
+        lag = np.empty((n, 2), dtype=np.int64)
+        for side in (0, 1):
+            taken = is_trade & (take_side == side)
+            last_t, last_d = _forward_fill(taken, ts, depletion, self._last_trade[side], self._last_depletion[side])
+            # the touch after a take refills exponentially
+            sizes[:, side, 0] *= 1.0 - last_d * np.exp(-(ts - last_t) / cfg.refill_s)
+            swept = sweep & (take_side == side)
+            last_sweep, _ = _forward_fill(swept, ts, depletion, self._last_sweep[side], 0.0)
+            lag[:, side] = (ts - last_sweep) < cfg.refill_s / 2
+            if taken.any():
+                i = np.flatnonzero(taken)[-1]
+                self._last_trade[side], self._last_depletion[side] = ts[i], depletion[i]
+            if swept.any():
+                self._last_sweep[side] = ts[np.flatnonzero(swept)[-1]]
+        # after a buy sweep (asks consumed) the bid trails one tick behind, and vice versa
+        bid_ticks = price - lag[:, 1]
+        ask_ticks = price + 1 + lag[:, 0]
+
+        steps = np.arange(levels)
+        bids = np.empty((n, levels, 2))
+        asks = np.empty((n, levels, 2))
+        # rounding drops the float noise of ticks * tick (e.g. 30000.100000000002)
+        bids[..., 0] = np.round((bid_ticks[:, None] - steps) * cfg.tick, 10)
+        asks[..., 0] = np.round((ask_ticks[:, None] + steps) * cfg.tick, 10)
+        lots = 1.0 / cfg.lot
+        bids[..., 1] = np.maximum(np.round(sizes[:, 0] * lots) / lots, cfg.lot)
+        asks[..., 1] = np.maximum(np.round(sizes[:, 1] * lots) / lots, cfg.lot)
+
+        trade_rows = np.flatnonzero(is_trade)
+        trades = np.zeros(len(trade_rows), dtype=TRADE_DTYPE)
+        trades["ts"] = ts[trade_rows]
+        # the price a market order paid: the touch before it arrived
+        prev_bid = np.concatenate(([self._touch[0]], bid_ticks[:-1]))[trade_rows]
+        prev_ask = np.concatenate(([self._touch[1]], ask_ticks[:-1]))[trade_rows]
+        buys = is_buy[trade_rows]
+        trades["px"] = np.round(np.where(buys, prev_ask, prev_bid) * cfg.tick, 10)
+        trades["sz"] = np.maximum(np.round(size[trade_rows] * lots) / lots, cfg.lot)
+        trades["side"] = np.where(buys, BUY, SELL)
+
+        batch = MarketBatch(
+            ts=ts, bids=bids, asks=asks, seq=self._built_events + rows, trades=trades, trade_rows=trade_rows,
+            trade_ids=self._built_trades + np.arange(len(trade_rows)),
+        )
+        self._price = int(price[-1])
+        self._touch = (int(bid_ticks[-1]), int(ask_ticks[-1]))
+        self._built_events += n
+        self._built_trades += len(trade_rows)
+        return batch
+
+    # ---- sinks ----
+    def to_tick_store(self, store, n_events: int, chunk_events: int = 500_000) -> int:
+        """Append `n_events` books to a utils.tick_store.TickStore; returns rows written."""
+        if store.levels != self.config.levels:
+            raise ValueError(f"TickStore has {store.levels} levels, generator makes {self.config.levels}")
+        written = 0
+        for batch in self.chunks(n_events, chunk_events):
+            store.append(batch.ts, batch.bids, batch.asks)
+            written += len(batch)
+        return written
+
+
+def _forward_fill(mask: np.ndarray, ts: np.ndarray, values: np.ndarray, ts0: float, value0: float):
+    """For every row, the time and value of the latest masked row at or before it (else ts0/value0)."""
+    idx = np.where(mask, np.arange(len(mask)), -1)
+    idx = np.maximum.accumulate(idx)
+    seen = idx >= 0
+    safe = np.where(seen, idx, 0)
+    return np.where(seen, ts[safe], ts0), np.where(seen, values[safe], value0)
+
+
+def concat_batches(batches: List[MarketBatch]) -> MarketBatch:
+    offsets = np.cumsum([0] + [len(b) for b in batches[:-1]])
+    return MarketBatch(
+        ts=np.concatenate([b.ts for b in batches]),
+        bids=np.concatenate([b.bids for b in batches]),
+        asks=np.concatenate([b.asks for b in batches]),
+        seq=np.concatenate([b.seq for b in batches]),
+        trades=np.concatenate([b.trades for b in batches]),
+        trade_rows=np.concatenate([b.trade_rows + off for b, off in zip(batches, offsets)]),
+        trade_ids=np.concatenate([b.trade_ids for b in batches]),
+    )
@@ -0,0 +1,78 @@
+import json
+import os
+from typing import Iterable, Optional, Tuple, Union
+import numpy as np
+
+from utils.book_types import LEVEL_DTYPE
+from utils.data_utils import snapshots_to_arrays
+
+META_FILE = "meta.json"
+TS_FILE = "ts.f8"
+BIDS_FILE = "bids.f8"
+ASKS_FILE = "asks.f8"
+
+
+class TickStore:
+    """
+    Append-only on-disk L2 history laid out as flat float64 files:
+
+        <path>/meta.json   {"levels": L, "instId": ...}
+        <path>/ts.f8       (N,)        epoch seconds
+        <path>/bids.f8     (N, L, 2)   [price, size], best first, NaN for missing levels
+        <path>/asks.f8     (N, L, 2)
+
+    Readers get np.memmap views, so many processes can share one copy of the
+    data through the OS page cache.
+    """
+
+    def __init__(self, path: str, levels: int = 5, inst_id: Optional[str] = None):
+        self.path = path
+        meta_path = os.path.join(path, META_FILE)
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+            self.levels = int(meta["levels"])
+            self.inst_id = meta.get("instId")
+        else:
+            os.makedirs(path, exist_ok=True)
+            self.levels = int(levels)
+            self.inst_id = inst_id
+            with open(meta_path, "w") as f:
+                json.dump({"levels": self.levels, "instId": self.inst_id}, f)
+
+    def __len__(self) -> int:
+        ts_path = os.path.join(self.path, TS_FILE)
+        if not os.path.exists(ts_path):
+            return 0
+        return os.path.getsize(ts_path) // np.dtype(LEVEL_DTYPE).itemsize
+
+    def append(self, ts: np.ndarray, bids: np.ndarray, asks: np.ndarray):
+        """Append N snapshots; bids/asks must be (N, levels, 2)."""
+        ts = np.ascontiguousarray(ts, dtype=LEVEL_DTYPE)
+        bids = np.ascontiguousarray(bids, dtype=LEVEL_DTYPE)
+        asks = np.ascontiguousarray(asks, dtype=LEVEL_DTYPE)
+        n = len(ts)
+        if bids.shape != (n, self.levels, 2) or asks.shape != (n, self.levels, 2):
+            raise ValueError(f"bids/asks must be ({n}, {self.levels}, 2) arrays")
+        for name, arr in ((TS_FILE, ts), (BIDS_FILE, bids), (ASKS_FILE, asks)):
+            with open(os.path.join(self.path, name), "ab") as f:
+                arr.tofile(f)
+
+    def append_raw(self, snapshots: Iterable[Union[str, bytes, dict]], ts: Iterable[float]):
+        """Append raw snapshots (dicts or OKX frames) with their timestamps in seconds."""
+        bids, asks = snapshots_to_arrays(snapshots, self.levels)
+        self.append(np.fromiter(ts, dtype=LEVEL_DTYPE, count=len(bids)), bids, asks)
+
+    def read(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Returns:
+            (ts, bids, asks) read-only memmaps
+        """
+        n = len(self)
+        if n == 0:
+            empty = np.empty((0, self.levels, 2), dtype=LEVEL_DTYPE)
+            return np.empty(0, dtype=LEVEL_DTYPE), empty, empty.copy()
+        ts = np.memmap(os.path.join(self.path, TS_FILE), dtype=LEVEL_DTYPE, mode="r", shape=(n,))
+        bids = np.memmap(os.path.join(self.path, BIDS_FILE), dtype=LEVEL_DTYPE, mode="r", shape=(n, self.levels, 2))
+        asks = np.memmap(os.path.join(self.path, ASKS_FILE), dtype=LEVEL_DTYPE, mode="r", shape=(n, self.levels, 2))
+        return ts, bids, asks
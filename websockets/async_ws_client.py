@@ -0,0 +1,269 @@
+import asyncio
+import json
+import time
+import websocket
+from loguru import logger
+from typing import Any, Optional
+
+from utils.bars import BarAggregator
+from websockets.ws_client import (
+    process_orderbook, subscribe_message, backoff_delay, record_bars, record_trade_volume,
+)
+from websockets.trade_tape import TradeTape, ingest_trades
+
+_STOP = object()
+
+
+class TickQueue:
+    """
+    Bounded asyncio queue with an explicit policy for slow consumers.
+
+    Policies:
+        - "block": producer awaits free space (backpressure reaches the socket read loop)
+        - "drop_oldest": evict the oldest queued tick to make room for the new one
+        - "drop_newest": discard the incoming tick when full
+    """
+    POLICIES = ("block", "drop_oldest", "drop_newest")
+
+    def __init__(self, maxsize: int = 1000, policy: str = "drop_oldest"):
+        if maxsize <= 0:
+            raise ValueError("maxsize must be > 0")
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown overflow policy: {policy}")
+        self.policy = policy
+        self.dropped = 0
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+
+    async def put(self, item: Any):
+        if self.policy == "block":
+            await self._queue.put(item)
+            return
+        self.put_nowait(item)
+
+    def put_nowait(self, item: Any) -> bool:
+        """
+        Enqueue without waiting. Returns False if the item (or an older one) was dropped.
+        A full "block" queue never drops: it returns False and leaves the item with the caller.
+        """
+        if not self._queue.full():
+            self._queue.put_nowait(item)
+            return True
+        if self.policy == "block":
+            return False
+        self.dropped += 1
+        if self.policy == "drop_newest":
+            return False
+        try:
+            self._queue.get_nowait()
+        except asyncio.QueueEmpty:
+            pass
+        self._queue.put_nowait(item)
+        return False
+
+    async def get(self) -> Any:
+        return await self._queue.get()
+
+    def qsize(self) -> int:
+        return self._queue.qsize()
+
+    def empty(self) -> bool:
+        return self._queue.empty()
+
+
+class AsyncOrderBookClient:
+    """
+    asyncio counterpart of OrderBookClient.
+
+    Keeps one connection alive with exponential-backoff reconnect, an OKX
+    text heartbeat ("ping" -> "pong") on idle sockets, and hands processed
+    ticks to consumers through a bounded TickQueue.
+
+    Usage:
+        client = AsyncOrderBookClient(url)
+        await client.start()
+        async for tick in client:
+            ...
+        await client.stop()
+    """
+
+    def __init__(self, url: str, inst_id: str = "BTC-USDT", channel: str = "books5",
+                 queue_size: int = 1000, overflow: str = "drop_oldest",
+                 heartbeat_interval: float = 20.0, heartbeat_timeout: float = 10.0,
+                 connect_timeout: float = 10.0, reconnect_base_delay: float = 0.5,
+                 reconnect_max_delay: float = 30.0, subscribe_trades: bool = False):
+        self.url = url
+        self.inst_id = inst_id
+        self.channel = channel
+        self.trade_tape = TradeTape() if subscribe_trades else None
+        self.bars = BarAggregator()
+        self.queue = TickQueue(queue_size, overflow)
+        self.heartbeat_interval = heartbeat_interval
+        self.heartbeat_timeout = heartbeat_timeout
+        self.connect_timeout = connect_timeout
+        self.reconnect_base_delay = reconnect_base_delay
+        self.reconnect_max_delay = reconnect_max_delay
+
+        self.ws: Optional[websocket.WebSocket] = None
+        self.running = False
+        self.connected = False
+        self.reconnects = 0
+        self.latest_data = None
+        self.latest_latency_ms = None
+        self._task: Optional[asyncio.Task] = None
+
+    # ---- lifecycle ----
+    async def start(self):
+        if self.running:
+            return
+        self.running = True
+        self._task = asyncio.create_task(self._run())
+        logger.info("Async WebSocket client task started")
+
+    async def stop(self):
+        self.running = False
+        self._close_socket()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        # wake consumers parked on an empty queue
+        if self.queue.empty():
+            self.queue.put_nowait(_STOP)
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.stop()
+
+    # ---- consumer API ----
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self.running and self.queue.empty():
+            raise StopAsyncIteration
+        tick = await self.queue.get()
+        if tick is _STOP:
+            raise StopAsyncIteration
+        return tick
+
+    async def ticks(self):
+        """Async generator over processed ticks until stop() is called."""
+        async for tick in self:
+            yield tick
+
+    def get_latest_orderbook(self):
+        return self.latest_data
+
+    def get_latency(self):
+        return self.latest_latency_ms
+
+    def get_bars(self, resolution="1s", since=None):
+        """OHLC bars (utils.bars.BAR_DTYPE records) of mid, spread, depth and volume."""
+        return self.bars.bars(resolution, since)
+
+    def get_trade_stats(self, window_s: float = 60.0):
+        if self.trade_tape is None:
+            return None
+        return self.trade_tape.stats(window_s, time.time())
+
+    # ---- connection handling ----
+    async def _run(self):
+        attempt = 0
+        while self.running:
+            try:
+                await self._connect()
+                attempt = 0
+                await self._consume()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"WebSocket connection error: {e}")
+            finally:
+                self.connected = False
+                self._close_socket()
+
+            if not self.running:
+                break
+            delay = backoff_delay(attempt, self.reconnect_base_delay, self.reconnect_max_delay)
+            attempt += 1
+            self.reconnects += 1
+            logger.warning(f"Reconnecting in {delay:.2f}s (attempt {attempt})")
+            await asyncio.sleep(delay)
+
+    async def _connect(self):
+        self.ws = await asyncio.to_thread(websocket.create_connection, self.url, timeout=self.connect_timeout)
+        # recv() times out after an idle heartbeat interval so we can probe the socket
+        self.ws.settimeout(self.heartbeat_interval)
+        await asyncio.to_thread(self.ws.send, json.dumps(subscribe_message(self.inst_id, self._channels())))
+        self.connected = True
+        logger.info("WebSocket connection opened")
+
+    def _channels(self):
+        return (self.channel, "trades") if self.trade_tape is not None else (self.channel,)
+
+    async def _consume(self):
+        ws = self.ws
+        awaiting_pong = False
+        while self.running:
+            try:
+                message = await asyncio.to_thread(ws.recv)
+            except websocket.WebSocketTimeoutException:
+                if awaiting_pong:
+                    raise ConnectionError("heartbeat timed out")
+                awaiting_pong = True
+                ws.settimeout(self.heartbeat_timeout)
+                await asyncio.to_thread(ws.send, "ping")
+                continue
+
+            if awaiting_pong:
+                awaiting_pong = False
+                ws.settimeout(self.heartbeat_interval)
+            if not message:
+                raise ConnectionError("connection closed by peer")
+            if message == "pong":
+                continue
+            await self._handle_message(message)
+
+    async def _handle_message(self, message):
+        start = time.time()
+        try:
+            data = json.loads(message)
+        except Exception as e:
+            logger.error(f"Error parsing message: {e}")
+            return
+
+        channel = data.get("arg", {}).get("channel")
+        if channel == "trades" and self.trade_tape is not None:
+            ingest_trades(self.trade_tape, data.get("data") or [])
+            record_trade_volume(self.bars, data.get("data") or [])
+            return
+        if channel != self.channel:
+            logger.debug(f"Message received: {data}")
+            return
+        if not data.get("data"):
+            logger.warning("Received empty orderbook data")
+            return
+
+        processed = process_orderbook(data["data"][0])
+        if processed is None:
+            logger.warning("[Info] Skipped invalid or incomplete orderbook data.")
+            return
+
+        self.latest_data = processed
+        record_bars(self.bars, processed)
+        self.latest_latency_ms = round((time.time() - start) * 1000, 3)
+        await self.queue.put(processed)
+
+    def _close_socket(self):
+        ws, self.ws = self.ws, None
+        if ws is not None:
+            try:
+                ws.close()
+            except Exception:
+                pass
@@ -0,0 +1,191 @@
+import base64
+import hashlib
+import socket
+import struct
+import threading
+import time
+from typing import List, Optional, Sequence
+from loguru import logger
+
+_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+OP_TEXT, OP_CLOSE, OP_PING, OP_PONG = 0x1, 0x8, 0x9, 0xA
+
+
+class FixtureServer:
+    """
+    Minimal local websocket server (RFC 6455, text frames only) that replays
+    recorded venue messages to every client, so adapters and clients can be
+    exercised without network access:
+
+        with FixtureServer(frames) as server:
+            client = OrderBookClient(server.url, venue="Bybit")
+            client.start()
+
+    Args:
+        frames: messages sent in order once the client's first message (the subscribe) arrives
+        interval_s: pause between frames
+        wait_for_subscribe: start replaying immediately when False
+        close_after: close the connection after the last frame (to exercise reconnects)
+    """
+
+    def __init__(self, frames: Sequence[str], host: str = "127.0.0.1", port: int = 0,
+                 interval_s: float = 0.0, wait_for_subscribe: bool = True, close_after: bool = False):
+        self.frames = list(frames)
+        self.interval_s = interval_s
+        self.wait_for_subscribe = wait_for_subscribe
+        self.close_after = close_after
+        self.received: List[str] = []   # text messages from clients (subscriptions, "ping")
+        self.connections = 0
+        self._sock = socket.create_server((host, port))
+        self.host, self.port = self._sock.getsockname()[:2]
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}"
+
+    def start(self) -> "FixtureServer":
+        self._thread = threading.Thread(target=self._accept_loop, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        try:
+            # close() alone does not wake a thread blocked in accept()
+            self._sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._sock.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _accept_loop(self):
+        while not self._stop.is_set():
+            try:
+                conn, _ = self._sock.accept()
+            except OSError:
+                return
+            self.connections += 1
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn: socket.socket):
+        try:
+            if not _handshake(conn):
+                return
+            send_lock = threading.Lock()
+            subscribed = threading.Event()
+            closed = threading.Event()
+            if not self.wait_for_subscribe:
+                subscribed.set()
+            threading.Thread(target=self._read_loop, args=(conn, send_lock, subscribed, closed), daemon=True).start()
+            subscribed.wait()
+            for frame in self.frames:
+                if self._stop.is_set():
+                    break
+                with send_lock:
+                    conn.sendall(encode_frame(frame.encode()))
+                if self.interval_s:
+                    time.sleep(self.interval_s)
+            if self.close_after:
+                with send_lock:
+                    conn.sendall(encode_frame(b"", OP_CLOSE))
+                return
+            # hold the connection open until the client closes it or the server stops
+            while not closed.is_set() and not self._stop.wait(0.05):
+                pass
+        except OSError as e:
+            logger.debug(f"Fixture connection ended: {e}")
+        finally:
+            conn.close()
+
+    def _read_loop(self, conn: socket.socket, send_lock: threading.Lock, subscribed: threading.Event,
+                   closed: threading.Event):
+        try:
+            while True:
+                opcode, payload = read_frame(conn)
+                if opcode == OP_CLOSE:
+                    with send_lock:
+                        conn.sendall(encode_frame(payload[:2], OP_CLOSE))
+                        # end the TCP stream too, so a client still reading sees EOF at once
+                        conn.shutdown(socket.SHUT_RDWR)
+                    return
+                if opcode == OP_PING:
+                    with send_lock:
+                        conn.sendall(encode_frame(payload, OP_PONG))
+                elif opcode == OP_TEXT:
+                    text = payload.decode()
+                    self.received.append(text)
+                    if text == "ping":  # OKX-style text heartbeat
+                        with send_lock:
+                            conn.sendall(encode_frame(b"pong"))
+                    subscribed.set()
+        except (OSError, ConnectionError):
+            return
+        finally:
+            subscribed.set()
+            closed.set()
+
+
+def _handshake(conn: socket.socket) -> bool:
+    request = b""
+    while b"\r\n\r\n" not in request:
+        chunk = conn.recv(4096)
+        if not chunk:
+            return False
+        request += chunk
+    key = None
+    for line in request.decode("latin-1").split("\r\n"):
+        name, _, value = line.partition(":")
+        if name.strip().lower() == "sec-websocket-key":
+            key = value.strip()
+    if key is None:
+        return False
+    accept = base64.b64encode(hashlib.sha1((key + _GUID).encode()).digest()).decode()
+    conn.sendall(
+        "HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+        f"Sec-WebSocket-Accept: {accept}\r\n\r\n".encode()
+    )
+    return True
+
+
+def encode_frame(payload: bytes, opcode: int = OP_TEXT) -> bytes:
+    """Unmasked, unfragmented server frame."""
+    n = len(payload)
+    if n < 126:
+        header = struct.pack("!BB", 0x80 | opcode, n)
+    elif n < 1 << 16:
+        header = struct.pack("!BBH", 0x80 | opcode, 126, n)
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, 127, n)
+    return header + payload
+
+
+def read_frame(conn: socket.socket):
+    """(opcode, payload) of the next frame; client frames are masked."""
+    b0, b1 = _recv_exact(conn, 2)
+    n = b1 & 0x7F
+    if n == 126:
+        n = struct.unpack("!H", _recv_exact(conn, 2))[0]
+    elif n == 127:
+        n = struct.unpack("!Q", _recv_exact(conn, 8))[0]
+    mask = _recv_exact(conn, 4) if b1 & 0x80 else None
+    payload = _recv_exact(conn, n)
+    if mask:
+        payload = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+    return b0 & 0x0F, payload
+
+
+def _recv_exact(conn: socket.socket, n: int) -> bytes:
+    buf = b""
+    while len(buf) < n:
+        chunk = conn.recv(n - len(buf))
+        if not chunk:
+            raise ConnectionError("connection closed")
+        buf += chunk
+    return buf
@@ -1,37 +1,54 @@
 import numpy as np
 import time
 from collections import deque
+from typing import Optional
+
+from utils.data_utils import parse_levels
+from utils.book_analytics import BookAnalytics
+from utils.book_types import EMPTY_LEVELS
+from utils.profiling import timed
 
 class OrderBookProcessor:
-    def __init__(self, history_size=100):
+    def __init__(self, history_size=100, top_n=5, analytics: Optional[BookAnalytics] = None):
+        self.top_n = top_n
         self.price_history = deque(maxlen=history_size)
         self.spread_history = deque(maxlen=history_size)
         self.timestamp_history = deque(maxlen=history_size)
+        self.analytics = analytics if analytics is not None else BookAnalytics()
+        # maintained book: (levels, 2) arrays of [price, size], best first
+        self.bids = EMPTY_LEVELS
+        self.asks = EMPTY_LEVELS
+        self.latest_signals = {}
 
+    @timed("OrderBookProcessor.update")
     def update(self, orderbook: dict):
         try:
-            bids = orderbook.get("bids", [])
-            asks = orderbook.get("asks", [])
-            ts = orderbook.get("timestamp", time.time())
+            bids = parse_levels(orderbook.get("bids") or [], self.top_n)
+            asks = parse_levels(orderbook.get("asks") or [], self.top_n)
 
-            if not bids or not asks:
+            if not len(bids) or not len(asks):
                 return None
 
-            best_bid = float(bids[0][0])
-            best_ask = float(asks[0][0])
+            now = time.time()
+            best_bid = float(bids[0, 0])
+            best_ask = float(asks[0, 0])
             mid_price = (best_bid + best_ask) / 2
             spread = best_ask - best_bid
 
+            self.bids = bids
+            self.asks = asks
             self.price_history.append(mid_price)
             self.spread_history.append(spread)
-            self.timestamp_history.append(time.time())
+            self.timestamp_history.append(now)
+            self.latest_signals = self.analytics.update(bids, asks, now)
 
             return {
                 "mid_price": mid_price,
                 "spread": spread,
                 "volatility": self._compute_volatility(),
                 "best_bid": best_bid,
-                "best_ask": best_ask
+                "best_ask": best_ask,
+                **self.latest_signals,
             }
         except Exception as e:
             print(f"[OrderBookProcessor] Error: {e}")
@@ -40,8 +57,9 @@ class OrderBookProcessor:
     def _compute_volatility(self):
         if len(self.price_history) < 2:
             return 0.0
-        returns = np.diff(self.price_history) / self.price_history[:-1]
-        return np.std(returns) * 100  # percent
+        prices = np.fromiter(self.price_history, dtype=np.float64, count=len(self.price_history))
+        returns = np.diff(prices) / prices[:-1]
+        return float(np.std(returns) * 100)  # percent
 
     def get_latest_metrics(self):
         if not self.price_history:
@@ -49,5 +67,6 @@ class OrderBookProcessor:
         return {
             "mid_price": self.price_history[-1],
             "spread": self.spread_history[-1],
-            "volatility": self._compute_volatility()
+            "volatility": self._compute_volatility(),
+            **self.latest_signals,
         }
@@ -0,0 +1,215 @@
+import math
+import threading
+from collections import deque
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+import numpy as np
+from loguru import logger
+
+TRADE_DTYPE = np.dtype([("ts", "f8"), ("px", "f8"), ("sz", "f8"), ("side", "i1")])
+
+BUY = 1
+SELL = -1
+
+
+class TradeBuffer:
+    """Fixed-capacity ring buffer of trades stored in one structured NumPy array."""
+
+    def __init__(self, capacity: int = 100_000):
+        if capacity <= 0:
+            raise ValueError("capacity must be > 0")
+        self.capacity = capacity
+        self._data = np.zeros(capacity, dtype=TRADE_DTYPE)
+        self._next = 0
+        self._count = 0
+        self.appended = 0     # trades ever appended: a position that survives wrap-around
+
+    def append(self, ts: float, px: float, sz: float, side: int):
+        self._data[self._next] = (ts, px, sz, side)
+        self._next = (self._next + 1) % self.capacity
+        if self._count < self.capacity:
+            self._count += 1
+        self.appended += 1
+
+    def __len__(self) -> int:
+        return self._count
+
+    def last(self, n: Optional[int] = None) -> np.ndarray:
+        """
+        Returns:
+            copy of the most recent n trades (all if n is None), oldest first
+        """
+        n = self._count if n is None else min(n, self._count)
+        start = (self._next - n) % self.capacity
+        if start + n <= self.capacity:
+            return self._data[start:start + n].copy()
+        return np.concatenate((self._data[start:], self._data[:self._next]))
+
+    def since(self, position: int) -> np.ndarray:
+        """
+        Returns:
+            copy of the trades appended after `position` (a previous `appended`),
+            oldest first; those already overwritten are lost
+        """
+        return self.last(max(self.appended - position, 0))
+
+    def clear(self):
+        self._next = 0
+        self._count = 0
+
+
+class RollingTradeStats:
+    """
+    Time-windowed trade aggregates with O(1) amortized updates.
+
+    Running sums are adjusted as trades enter and leave the window, so each trade
+    is touched exactly twice. TWAP weights each price by how long it stood until
+    the next print; realized volatility is sqrt(sum of squared log returns)
+    between consecutive trades inside the window.
+
+    Not thread-safe: stats(now) evicts like add() does. TradeTape serializes both.
+    """
+
+    def __init__(self, window_s: float = 60.0):
+        if window_s <= 0:
+            raise ValueError("window_s must be > 0")
+        self.window_s = float(window_s)
+        # (ts, px, sz, side, dt_to_next, log_return_from_prev)
+        self._trades = deque()
+        self._notional = 0.0
+        self._volume = 0.0
+        self._signed = 0.0
+        self._buy_volume = 0.0
+        self._px_time = 0.0
+        self._time = 0.0
+        self._sq_returns = 0.0
+
+    def add(self, ts: float, px: float, sz: float, side: int):
+        if self._trades:
+            prev = self._trades[-1]
+            dt = max(ts - prev[0], 0.0)
+            # the previous print's dwell time is only known now
+            prev[4] = dt
+            self._px_time += prev[1] * dt
+            self._time += dt
+            ret = math.log(px / prev[1]) if prev[1] > 0 and px > 0 else 0.0
+        else:
+            ret = 0.0
+        self._trades.append([ts, px, sz, side, 0.0, ret])
+        self._notional += px * sz
+        self._volume += sz
+        self._signed += side * sz
+        if side == BUY:
+            self._buy_volume += sz
+        self._sq_returns += ret * ret
+        self._evict(ts)
+
+    def _evict(self, now: float):
+        cutoff = now - self.window_s
+        trades = self._trades
+        while trades and trades[0][0] < cutoff:
+            ts, px, sz, side, dt, _ = trades.popleft()
+            self._notional -= px * sz
+            self._volume -= sz
+            self._signed -= side * sz
+            if side == BUY:
+                self._buy_volume -= sz
+            self._px_time -= px * dt
+            self._time -= dt
+            if trades:
+                # the new oldest trade's return pointed at a price now outside the window
+                r = trades[0][5]
+                self._sq_returns -= r * r
+                trades[0][5] = 0.0
+        if not trades:
+            self._notional = self._volume = self._signed = self._buy_volume = 0.0
+            self._px_time = self._time = self._sq_returns = 0.0
+
+    def stats(self, now: Optional[float] = None) -> Dict[str, float]:
+        """
+        Returns:
+            dict with vwap, twap, volume, signed_volume, buy_volume, sell_volume,
+            buy_ratio, trade_count, intensity (trades/sec) and realized_vol
+        """
+        if now is not None:
+            self._evict(now)
+        count = len(self._trades)
+        if count == 0:
+            return {
+                "vwap": float("nan"), "twap": float("nan"), "volume": 0.0, "signed_volume": 0.0,
+                "buy_volume": 0.0, "sell_volume": 0.0, "buy_ratio": float("nan"),
+                "trade_count": 0, "intensity": 0.0, "realized_vol": 0.0,
+            }
+        last_px = self._trades[-1][1]
+        volume = self._volume
+        return {
+            "vwap": self._notional / volume if volume > 0 else last_px,
+            "twap": self._px_time / self._time if self._time > 0 else last_px,
+            "volume": volume,
+            "signed_volume": self._signed,
+            "buy_volume": self._buy_volume,
+            "sell_volume": volume - self._buy_volume,
+            "buy_ratio": self._buy_volume / volume if volume > 0 else float("nan"),
+            "trade_count": count,
+            "intensity": count / self.window_s,
+            "realized_vol": math.sqrt(max(self._sq_returns, 0.0)),
+        }
+
+
+class TradeTape:
+    """
+    Trade buffer plus one RollingTradeStats per configured window.
+
+    The receive thread adds while dashboards and workers read stats(now), which
+    also evicts; one lock serializes them.
+    """
+
+    def __init__(self, windows_s: Sequence[float] = (10.0, 60.0, 300.0), capacity: int = 100_000):
+        self.buffer = TradeBuffer(capacity)
+        self.windows = {float(w): RollingTradeStats(w) for w in windows_s}
+        self.last_trade_id = None
+        self._lock = threading.Lock()
+
+    def add(self, ts: float, px: float, sz: float, side: int):
+        with self._lock:
+            self.buffer.append(ts, px, sz, side)
+            for agg in self.windows.values():
+                agg.add(ts, px, sz, side)
+
+    def since(self, position: int) -> Tuple[np.ndarray, int]:
+        """
+        Trades added after `position`, and the position to pass next time.
+        Unlike filtering on ts, trades sharing a timestamp are never skipped.
+        """
+        with self._lock:
+            return self.buffer.since(position), self.buffer.appended
+
+    def stats(self, window_s: float, now: Optional[float] = None) -> Dict[str, float]:
+        with self._lock:
+            return self.windows[float(window_s)].stats(now)
+
+    def all_stats(self, now: Optional[float] = None) -> Dict[float, Dict[str, float]]:
+        with self._lock:
+            return {w: agg.stats(now) for w, agg in self.windows.items()}
+
+
+def ingest_trades(tape: TradeTape, trades: Iterable[dict]) -> int:
+    """
+    Push OKX `trades` channel rows ({"px", "sz", "side", "ts", "tradeId"}) into a tape.
+
+    Returns:
+        number of trades added
+    """
+    added = 0
+    for t in trades:
+        try:
+            ts = float(t["ts"]) / 1000.0
+            px = float(t["px"])
+            sz = float(t["sz"])
+            side = BUY if t.get("side") == "buy" else SELL
+        except Exception as e:
+            logger.warning(f"Skipped malformed trade {t}: {e}")
+            continue
+        tape.add(ts, px, sz, side)
+        tape.last_trade_id = t.get("tradeId", tape.last_trade_id)
+        added += 1
+    return added
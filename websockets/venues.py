@@ -0,0 +1,331 @@
+import json
+import zlib
+from typing import Callable, Dict, List, Optional, Tuple
+import numpy as np
+
+from utils.book_types import EMPTY_LEVELS, LEVEL_DTYPE
+from utils.data_utils import parse_levels
+
+
+class BookUpdate:
+    """
+    One order book message normalized across venues.
+
+    ``bids`` / ``asks`` are (levels, 2) float64 arrays of [price, size]. For a
+    snapshot they are the full (top-N) book, best first; for a delta they are
+    changed levels only, where size 0 removes the level.
+
+    On incremental feeds `prev_seq` is the seq a delta must follow, `checksum`
+    the venue's checksum of the book after it, and `raw` the (bids, asks) level
+    lists as sent, which the checksum is computed over.
+    """
+    __slots__ = ("venue", "inst_id", "bids", "asks", "ts", "seq", "snapshot", "prev_seq", "checksum", "raw")
+
+    def __init__(self, venue: str, inst_id: str, bids: np.ndarray, asks: np.ndarray,
+                 ts: Optional[int] = None, seq=None, snapshot: bool = True,
+                 prev_seq=None, checksum: Optional[int] = None, raw: Optional[Tuple[list, list]] = None):
+        self.venue = venue
+        self.inst_id = inst_id
+        self.bids = bids
+        self.asks = asks
+        self.ts = ts            # exchange time, epoch milliseconds
+        self.seq = seq
+        self.snapshot = snapshot
+        self.prev_seq = prev_seq
+        self.checksum = checksum
+        self.raw = raw
+
+    def __repr__(self):
+        kind = "snapshot" if self.snapshot else "delta"
+        return f"BookUpdate({self.venue} {self.inst_id} {kind} bids={len(self.bids)} asks={len(self.asks)} seq={self.seq})"
+
+
+class VenueAdapter:
+    """
+    Venue-specific wire format <-> BookUpdate. Subclasses set `name`, `url` and
+    implement subscribe_messages() and parse(); instruments are always given in
+    the internal "BASE-QUOTE" form (e.g. "BTC-USDT").
+    """
+    name = ""
+    url = ""
+    depth = 5
+    incremental = False  # True when the feed sends deltas after the first snapshot
+
+    def symbol(self, inst_id: str) -> str:
+        return inst_id
+
+    def subscribe_messages(self, inst_id: str, trades: bool = False) -> List[str]:
+        raise NotImplementedError
+
+    def resubscribe_messages(self, inst_id: str) -> List[str]:
+        """Messages that re-request the book channel, so the venue sends a fresh snapshot."""
+        return self.subscribe_messages(inst_id)
+
+    # checksum(bids, asks) -> int over "price:size" strings best first, or None
+    checksum: Optional[Callable[[List[str], List[str]], int]] = None
+
+    def parse(self, data: dict) -> List[BookUpdate]:
+        """Book updates in an already-decoded message ([] for anything else)."""
+        raise NotImplementedError
+
+    def trades(self, data: dict) -> Optional[List[dict]]:
+        """Trade rows as OKX-style {"px", "sz", "side", "ts", "tradeId"} dicts, or None."""
+        return None
+
+
+class OKXAdapter(VenueAdapter):
+    """OKX v5 public `books5` (top-5 snapshots) or `books` (snapshot + deltas)."""
+    name = "OKX"
+    url = "wss://ws.okx.com:8443/ws/v5/public"
+
+    def __init__(self, channel: str = "books5"):
+        self.channel = channel
+        self.incremental = channel != "books5"
+
+    def subscribe_messages(self, inst_id, trades=False):
+        args = [{"channel": self.channel, "instId": inst_id}]
+        if trades:
+            args.append({"channel": "trades", "instId": inst_id})
+        return [json.dumps({"op": "subscribe", "args": args})]
+
+    def resubscribe_messages(self, inst_id):
+        args = [{"channel": self.channel, "instId": inst_id}]
+        return [json.dumps({"op": "unsubscribe", "args": args}), json.dumps({"op": "subscribe", "args": args})]
+
+    def parse(self, data):
+        arg = data.get("arg") or {}
+        if arg.get("channel") != self.channel or not data.get("data"):
+            return []
+        snapshot = data.get("action", "snapshot") == "snapshot"
+        top_n = self.depth if self.channel == "books5" else 400
+        updates = []
+        for book in data["data"]:
+            bids, asks = book.get("bids") or [], book.get("asks") or []
+            update = BookUpdate(
+                self.name, book.get("instId") or arg.get("instId"),
+                parse_levels(bids, top_n), parse_levels(asks, top_n),
+                _int_or_none(book.get("ts")), _int_or_none(book.get("seqId")), snapshot,
+            )
+            if self.incremental:
+                # snapshots carry prevSeqId -1
+                update.prev_seq = None if snapshot else _int_or_none(book.get("prevSeqId"))
+                update.checksum = _int_or_none(book.get("checksum"))
+                update.raw = (bids, asks)
+            updates.append(update)
+        return updates
+
+    def checksum(self, bids, asks):
+        """OKX CRC32 over the top 25 levels interleaved bid, ask, ... as a signed int."""
+        parts = []
+        for i in range(min(max(len(bids), len(asks)), 25)):
+            if i < len(bids):
+                parts.append(bids[i])
+            if i < len(asks):
+                parts.append(asks[i])
+        crc = zlib.crc32(":".join(parts).encode())
+        return crc - (1 << 32) if crc >= 1 << 31 else crc
+
+    def trades(self, data):
+        if (data.get("arg") or {}).get("channel") == "trades":
+            return data.get("data") or []
+        return None
+
+
+class BinanceAdapter(VenueAdapter):
+    """Binance spot partial depth stream (`<symbol>@depth<N>@100ms`, top-N snapshots)."""
+    name = "Binance"
+    url = "wss://stream.binance.com:9443/ws"
+    depth = 10
+
+    def symbol(self, inst_id):
+        return inst_id.replace("-", "").lower()
+
+    def subscribe_messages(self, inst_id, trades=False):
+        params = [f"{self.symbol(inst_id)}@depth{self.depth}@100ms"]
+        if trades:
+            params.append(f"{self.symbol(inst_id)}@trade")
+        return [json.dumps({"method": "SUBSCRIBE", "params": params, "id": 1})]
+
+    def parse(self, data):
+        stream = data.get("stream", "")
+        payload = data.get("data", data)  # combined-stream envelope or raw stream
+        if "lastUpdateId" not in payload:
+            return []
+        inst_id = _inst_from_stream(stream) if stream else None
+        return [BookUpdate(
+            self.name, inst_id,
+            parse_levels(payload.get("bids") or [], self.depth), parse_levels(payload.get("asks") or [], self.depth),
+            _int_or_none(payload.get("E")), payload.get("lastUpdateId"), True,
+        )]
+
+    def trades(self, data):
+        payload = data.get("data", data)
+        if payload.get("e") != "trade":
+            return None
+        return [{
+            "px": payload["p"], "sz": payload["q"], "ts": payload["T"], "tradeId": payload.get("t"),
+            "side": "sell" if payload.get("m") else "buy",  # buyer is maker -> aggressor sold
+        }]
+
+
+class BybitAdapter(VenueAdapter):
+    """Bybit v5 spot `orderbook.<depth>.<symbol>` (snapshot, then deltas)."""
+    name = "Bybit"
+    url = "wss://stream.bybit.com/v5/public/spot"
+    depth = 50
+    incremental = True
+
+    def symbol(self, inst_id):
+        return inst_id.replace("-", "")
+
+    def subscribe_messages(self, inst_id, trades=False):
+        args = [f"orderbook.{self.depth}.{self.symbol(inst_id)}"]
+        if trades:
+            args.append(f"publicTrade.{self.symbol(inst_id)}")
+        return [json.dumps({"op": "subscribe", "args": args})]
+
+    def resubscribe_messages(self, inst_id):
+        args = [f"orderbook.{self.depth}.{self.symbol(inst_id)}"]
+        return [json.dumps({"op": "unsubscribe", "args": args}), json.dumps({"op": "subscribe", "args": args})]
+
+    def parse(self, data):
+        topic = data.get("topic", "")
+        if not topic.startswith("orderbook.") or not data.get("data"):
+            return []
+        book = data["data"]
+        snapshot = data.get("type") == "snapshot"
+        seq = _int_or_none(book.get("u"))
+        return [BookUpdate(
+            self.name, _inst_from_symbol(book.get("s", "")),
+            parse_levels(book.get("b") or [], 1000), parse_levels(book.get("a") or [], 1000),
+            _int_or_none(data.get("ts")), seq, snapshot,
+            # update ids of deltas are consecutive
+            prev_seq=seq - 1 if seq is not None and not snapshot else None,
+        )]
+
+    def trades(self, data):
+        if not data.get("topic", "").startswith("publicTrade."):
+            return None
+        return [
+            {"px": t["p"], "sz": t["v"], "ts": t["T"], "tradeId": t.get("i"), "side": t.get("S", "").lower()}
+            for t in data.get("data") or []
+        ]
+
+
+ADAPTERS = {cls.name: cls for cls in (OKXAdapter, BinanceAdapter, BybitAdapter)}
+
+_QUOTES = ("USDT", "USDC", "USD", "BTC", "ETH", "EUR")
+
+
+def get_adapter(venue: str, **kwargs) -> VenueAdapter:
+    if venue not in ADAPTERS:
+        raise ValueError(f"Unknown venue: {venue}")
+    return ADAPTERS[venue](**kwargs)
+
+
+def _int_or_none(value) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _inst_from_symbol(symbol: str) -> str:
+    symbol = symbol.upper()
+    for quote in _QUOTES:
+        if symbol.endswith(quote) and len(symbol) > len(quote):
+            return f"{symbol[:-len(quote)]}-{quote}"
+    return symbol
+
+
+def _inst_from_stream(stream: str) -> str:
+    return _inst_from_symbol(stream.split("@", 1)[0])
+
+
+class BookOutOfSync(ValueError):
+    """An incremental book missed a delta (sequence gap) or failed its checksum."""
+
+
+class VenueBook:
+    """
+    Local top-N book for one venue built from BookUpdates. Snapshots replace the
+    book; on incremental feeds deltas are applied level by level (size 0 deletes)
+    against the full-depth book.
+
+    Deltas must continue the last seq (BookUpdate.prev_seq) and, when a
+    `checksum` function is given, match the venue's checksum. Otherwise apply()
+    drops the book and raises BookOutOfSync; deltas are then ignored (empty
+    book, awaiting_snapshot) until the next snapshot.
+    """
+
+    def __init__(self, top_n: int = 5, incremental: bool = False,
+                 checksum: Optional[Callable[[List[str], List[str]], int]] = None):
+        self.top_n = top_n
+        self.incremental = incremental
+        self.checksum = checksum
+        self.bids = EMPTY_LEVELS
+        self.asks = EMPTY_LEVELS
+        self.seq = None
+        self.awaiting_snapshot = incremental
+        self._bid_levels: Dict[float, float] = {}
+        self._ask_levels: Dict[float, float] = {}
+        self._bid_text: Dict[float, str] = {}   # "price:size" as sent, for the checksum
+        self._ask_text: Dict[float, str] = {}
+
+    def reset(self):
+        self.bids = self.asks = EMPTY_LEVELS
+        self.seq = None
+        self.awaiting_snapshot = self.incremental
+        self._bid_levels, self._ask_levels = {}, {}
+        self._bid_text, self._ask_text = {}, {}
+
+    def apply(self, update: BookUpdate) -> Tuple[np.ndarray, np.ndarray]:
+        if not self.incremental:
+            # snapshot-only feed: the update already is the book
+            self.bids = update.bids[:self.top_n]
+            self.asks = update.asks[:self.top_n]
+            self.seq = update.seq
+            return self.bids, self.asks
+        if update.snapshot:
+            self.reset()
+            self.awaiting_snapshot = False
+        elif self.awaiting_snapshot:
+            return self.bids, self.asks
+        elif update.prev_seq is not None and self.seq is not None and update.prev_seq != self.seq:
+            expected = self.seq
+            self.reset()
+            raise BookOutOfSync(f"sequence gap: expected a delta after {expected}, got one after {update.prev_seq}")
+        for levels, book in ((update.bids, self._bid_levels), (update.asks, self._ask_levels)):
+            for price, size in levels.tolist():
+                if size > 0:
+                    book[price] = size
+                else:
+                    book.pop(price, None)
+        self.bids = _top(self._bid_levels, self.top_n, reverse=True)
+        self.asks = _top(self._ask_levels, self.top_n, reverse=False)
+        self.seq = update.seq
+        if self.checksum is not None and update.raw is not None:
+            self._verify(update)
+        return self.bids, self.asks
+
+    def _verify(self, update: BookUpdate):
+        for levels, text in ((update.raw[0], self._bid_text), (update.raw[1], self._ask_text)):
+            for level in levels:
+                price = float(level[0])
+                if float(level[1]) > 0:
+                    text[price] = f"{level[0]}:{level[1]}"
+                else:
+                    text.pop(price, None)
+        if update.checksum is None:
+            return
+        bids = [self._bid_text[p] for p in sorted(self._bid_text, reverse=True)[:25]]
+        asks = [self._ask_text[p] for p in sorted(self._ask_text)[:25]]
+        if self.checksum(bids, asks) != update.checksum:
+            seq = self.seq
+            self.reset()
+            raise BookOutOfSync(f"checksum mismatch at seq {seq}")
+
+
+def _top(levels: Dict[float, float], n: int, reverse: bool) -> np.ndarray:
+    prices = sorted(levels, reverse=reverse)[:n]
+    return np.array([(p, levels[p]) for p in prices], dtype=LEVEL_DTYPE).reshape(-1, 2)
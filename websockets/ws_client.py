@@ -2,127 +2,340 @@ import websocket
 import threading
 import json
 import time
+import random
 from loguru import logger
+from utils.bars import BarAggregator
+from utils.book_diff import LEVELS, BookDiffer
+from utils.book_types import BookSnapshot, Tick
+from utils.metrics_cache import BookMetricsCache
+from utils.profiling import PROFILER, timed
+from websockets.trade_tape import TradeTape, ingest_trades
+from websockets.venues import BookOutOfSync, VenueAdapter, VenueBook, get_adapter
+
+
+def process_orderbook(data):
+    """
+    Reduce a raw OKX books5 payload (``data[0]`` of the push message) to the
+    top-of-book summary consumed by the dashboard.
+
+    Returns:
+        Tick (best_bid, best_ask, spread, mid_price, total volumes, instId, ts)
+        or None when the tick is empty or crossed.
+    """
+    try:
+        asks = data.get('asks', [])
+        bids = data.get('bids', [])
+        if not asks or not bids:
+            logger.warning("Empty asks or bids in orderbook data")
+            return None
+
+        best_ask = float(asks[0][0])
+        best_bid = float(bids[0][0])
+
+        if best_bid >= best_ask:
+            logger.warning("Invalid orderbook tick: best bid >= best ask")
+            return None
+
+        total_ask_volume = sum(float(item[1]) for item in asks)
+        total_bid_volume = sum(float(item[1]) for item in bids)
+
+        return Tick(best_bid, best_ask, total_ask_volume, total_bid_volume,
+                    data.get("instId"), data.get("ts"))
+
+    except Exception as e:
+        logger.error(f"Error processing orderbook data: {e}")
+        return None
+
+
+def tick_time(tick) -> float:
+    """Exchange timestamp of a Tick in seconds, falling back to local receive time."""
+    try:
+        return float(tick.ts) / 1000.0
+    except (TypeError, ValueError):
+        return time.time()
+
+
+def record_bars(bars: BarAggregator, tick):
+    bars.add_tick(tick_time(tick), tick.mid_price, tick.spread, tick.total_bid_volume + tick.total_ask_volume)
+
+
+def record_trade_volume(bars: BarAggregator, trades):
+    for t in trades:
+        try:
+            bars.add_volume(float(t["ts"]) / 1000.0, float(t["sz"]))
+        except (KeyError, TypeError, ValueError):
+            continue
+
+
+def subscribe_message(inst_id, channels=("books5",)):
+    if isinstance(channels, str):
+        channels = (channels,)
+    return {
+        "op": "subscribe",
+        "args": [
+            {
+                "channel": channel,
+                "instId": inst_id
+            }
+            for channel in channels
+        ]
+    }
+
+
+def backoff_delay(attempt: int, base: float = 0.5, max_delay: float = 30.0) -> float:
+    """
+    Exponential backoff with jitter for reconnect attempts.
+
+    Returns:
+        seconds to wait before reconnect attempt number `attempt` (0-based)
+    """
+    ceiling = min(max_delay, base * (2 ** attempt))
+    return random.uniform(0.5 * ceiling, ceiling)
+
 
 class OrderBookClient:
-    def __init__(self, url):
-        self.url = url
+    """
+    Threaded feed client for one venue + instrument. Venue wire formats are
+    handled by a websockets.venues adapter (`venue` is its name, or a configured
+    adapter such as OKXAdapter("books")); pass a shared ConsolidatedBook to
+    merge several clients' books into one cross-venue ladder. `on_update`, if
+    given, is called as on_update(client, tick, book) from the receive thread
+    after every accepted book update; subscribe_diffs() delivers only what changed.
+    """
+
+    def __init__(self, url=None, inst_id="BTC-USDT", ping_interval=20, ping_timeout=10,
+                 reconnect_base_delay=0.5, reconnect_max_delay=30.0, subscribe_trades=False,
+                 venue="OKX", top_n=5, consolidated=None, on_update=None):
+        self.adapter = venue if isinstance(venue, VenueAdapter) else get_adapter(venue)
+        self.url = url or self.adapter.url
+        self.inst_id = inst_id
+        self.venue_book = VenueBook(top_n, self.adapter.incremental, self.adapter.checksum)
+        self.consolidated = consolidated
+        self.on_update = on_update
+        self.trade_tape = TradeTape() if subscribe_trades else None
         self.ws = None
+        self.thread = None
         self.running = False
         self.latest_data = None
+        self.latest_book = None
+        self.version = 0
+        self.metrics_cache = BookMetricsCache()
+        self.differ = BookDiffer()
+        self.last_changed = 0       # utils.book_diff bitmask of the latest update
+        self.bars = BarAggregator()
         self.latest_latency_ms = None
+        self.ping_interval = ping_interval
+        self.ping_timeout = ping_timeout
+        self.reconnect_base_delay = reconnect_base_delay
+        self.reconnect_max_delay = reconnect_max_delay
+        self.reconnects = 0
+        self.resyncs = 0            # incremental books dropped after a gap or bad checksum
+        self._attempt = 0
+        self._stop_event = threading.Event()
+        self._updated = threading.Condition()
+        self._waiters = 0
 
-    def _process_orderbook(self, data):
+    @timed("OrderBookClient._process_orderbook")
+    def _process_orderbook(self, update):
+        """Apply a BookUpdate to the local venue book; Tick, or None when empty, crossed or out of sync."""
         try:
-            asks = data.get('asks', [])
-            bids = data.get('bids', [])
-            if not asks or not bids:
-                logger.warning("Empty asks or bids in orderbook data")
-                return None
-
-            best_ask = float(asks[0][0])
-            best_bid = float(bids[0][0])
-
-            if best_bid >= best_ask:
-                logger.warning("Invalid orderbook tick: best bid >= best ask")
-                return None
-
-            spread = best_ask - best_bid
-            mid_price = (best_ask + best_bid) / 2
-
-            total_ask_volume = sum(float(item[1]) for item in asks)
-            total_bid_volume = sum(float(item[1]) for item in bids)
-
-            processed = {
-                "best_bid": best_bid,
-                "best_ask": best_ask,
-                "spread": spread,
-                "mid_price": mid_price,
-                "total_ask_volume": total_ask_volume,
-                "total_bid_volume": total_bid_volume,
-                "instId": data.get("instId"),
-                "ts": data.get("ts"),
-            }
-
-            return processed
-
-        except Exception as e:
-            logger.error(f"Error processing orderbook data: {e}")
+            bids, asks = self.venue_book.apply(update)
+        except BookOutOfSync as e:
+            self._resync(str(e))
+            return None
+        if self.venue_book.awaiting_snapshot:
+            return None
+        if not len(bids) or not len(asks):
+            logger.warning("Empty asks or bids in orderbook data")
+            return None
+        if bids[0, 0] >= asks[0, 0]:
+            logger.warning("Invalid orderbook tick: best bid >= best ask")
             return None
+        return Tick(float(bids[0, 0]), float(asks[0, 0]), float(asks[:, 1].sum()), float(bids[:, 1].sum()),
+                    update.inst_id or self.inst_id, update.ts)
 
+    @timed("OrderBookClient._on_message")
     def _on_message(self, ws, message):
         start = time.time()
+        PROFILER.thread_hook()
 
         try:
             data = json.loads(message)
 
-            if 'arg' in data and data['arg'].get('channel') == 'books5':
-                if 'data' in data and len(data['data']) > 0:
-                    orderbook = data['data'][0]
-                    processed = self._process_orderbook(orderbook)
-
-                    if processed is None:
-                        logger.warning("[Info] Skipped invalid or incomplete orderbook data.")
-                        return
-
-                    self.latest_data = processed
-
-                    end = time.time()
-                    self.latest_latency_ms = round((end - start) * 1000, 3)
+            updates = self.adapter.parse(data)
+            if updates:
+                for update in updates:
+                    self._apply_update(update, start)
+                return
 
-                    logger.info(
-                        f"Processed tick: Best Bid={processed['best_bid']}, "
-                        f"Best Ask={processed['best_ask']}, Spread={processed['spread']:.2f}, "
-                        f"Latency={self.latest_latency_ms} ms"
-                    )
-                else:
-                    logger.warning("Received empty orderbook data")
+            trades = self.adapter.trades(data)
+            if trades is not None:
+                if self.trade_tape is not None:
+                    ingest_trades(self.trade_tape, trades)
+                record_trade_volume(self.bars, trades)
             else:
                 logger.debug(f"Message received: {data}")
 
         except Exception as e:
             logger.error(f"Error parsing message: {e}")
 
+    def _apply_update(self, update, start):
+        processed = self._process_orderbook(update)
+        if processed is None:
+            logger.warning("[Info] Skipped invalid or incomplete orderbook data.")
+            return
+
+        bids, asks = self.venue_book.bids, self.venue_book.asks
+        self.latest_data = processed
+        self.latest_book = BookSnapshot(bids, asks)
+        self.version += 1
+        record_bars(self.bars, processed)
+        changed = self.last_changed = self.differ.update(self.version, processed, bids, asks)
+        # an update that repeats the book keeps the cached metrics and the merged ladder
+        if changed & LEVELS:
+            self.metrics_cache.update(
+                processed.instId, update.seq if update.seq is not None else self.version, bids, asks,
+            )
+            if self.consolidated is not None:
+                self.consolidated.update(self.adapter.name, bids, asks)
+        if self.on_update is not None:
+            self.on_update(self, processed, self.latest_book)
+
+        self.latest_latency_ms = round((time.time() - start) * 1000, 3)
+        if self._waiters:
+            # version is bumped before this check and waiters register before reading it,
+            # so skipping the lock when nobody waits cannot lose a wake-up
+            with self._updated:
+                self._updated.notify_all()
+
+        logger.info(
+            f"Processed tick: Best Bid={processed['best_bid']}, "
+            f"Best Ask={processed['best_ask']}, Spread={processed['spread']:.2f}, "
+            f"Latency={self.latest_latency_ms} ms"
+        )
+
+    def _resync(self, reason):
+        """Drop a book that missed a delta and ask the venue for a fresh snapshot."""
+        logger.warning(f"{self.adapter.name} {self.inst_id} book out of sync ({reason}), resubscribing")
+        self.resyncs += 1
+        if self.consolidated is not None:
+            self.consolidated.remove(self.adapter.name)
+        self.differ.reset()
+        ws = self.ws
+        if ws is not None and ws.sock is not None and ws.sock.connected:
+            for msg in self.adapter.resubscribe_messages(self.inst_id):
+                ws.send(msg)
+
     def _on_error(self, ws, error):
         logger.error(f"WebSocket error: {error}")
 
     def _on_close(self, ws, close_status_code, close_msg):
-        logger.warning("WebSocket closed")
+        logger.warning(f"WebSocket closed (code={close_status_code}, msg={close_msg})")
+        if self.consolidated is not None:
+            # a dropped feed's levels are stale until the next snapshot
+            self.consolidated.remove(self.adapter.name)
+        # the first book after a reconnect is a snapshot, and is diffed as one
+        self.venue_book.reset()
+        self.differ.reset()
 
     def _on_open(self, ws):
         logger.info("WebSocket connection opened")
-        subscribe_message = {
-            "op": "subscribe",
-            "args": [
-                {
-                    "channel": "books5",
-                    "instId": "BTC-USDT"
-                }
-            ]
-        }
-        ws.send(json.dumps(subscribe_message))
+        self._attempt = 0
+        for msg in self.adapter.subscribe_messages(self.inst_id, trades=self.trade_tape is not None):
+            ws.send(msg)
+
+    def _run(self):
+        # run_forever returns whenever the socket drops; keep reconnecting until stop()
+        while self.running:
+            self.ws = websocket.WebSocketApp(
+                self.url,
+                on_message=self._on_message,
+                on_error=self._on_error,
+                on_close=self._on_close,
+                on_open=self._on_open
+            )
+            try:
+                self.ws.run_forever(ping_interval=self.ping_interval, ping_timeout=self.ping_timeout)
+            except Exception as e:
+                logger.error(f"WebSocket run loop failed: {e}")
+
+            if not self.running:
+                break
+            delay = backoff_delay(self._attempt, self.reconnect_base_delay, self.reconnect_max_delay)
+            self._attempt += 1
+            self.reconnects += 1
+            logger.warning(f"Reconnecting in {delay:.2f}s (attempt {self._attempt})")
+            if self._stop_event.wait(delay):
+                break
 
     def start(self):
+        if self.running:
+            return
         self.running = True
-        self.ws = websocket.WebSocketApp(
-            self.url,
-            on_message=self._on_message,
-            on_error=self._on_error,
-            on_close=self._on_close,
-            on_open=self._on_open
-        )
-
-        self.thread = threading.Thread(target=self.ws.run_forever, daemon=True)
+        self._stop_event.clear()
+        self.thread = threading.Thread(target=self._run, daemon=True)
         self.thread.start()
+        PROFILER.start_from_env()
         logger.info("WebSocket client thread started")
 
-    def stop(self):
+    def stop(self, timeout=5.0):
         self.running = False
+        self._stop_event.set()
+        with self._updated:
+            self._updated.notify_all()
         if self.ws:
             self.ws.close()
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout)
 
     def get_latest_orderbook(self):
         return self.latest_data
 
+    def get_latest_book(self):
+        """Latest top-N BookSnapshot (level arrays) or None."""
+        return self.latest_book
+
+    def get_book_metrics(self, inst_id=None):
+        """Lazily computed derived metrics for the current book version."""
+        return self.metrics_cache.get(inst_id or self.inst_id)
+
+    def subscribe_diffs(self, fn):
+        """
+        Call fn(diff) from the receive thread with a utils.book_diff.BookDiff for
+        every update that changed the book.
+
+        Returns:
+            function that unsubscribes fn
+        """
+        return self.differ.subscribe(fn)
+
+    def side_version(self, side):
+        """Counter that moves only when the "bids" or "asks" levels change."""
+        return self.differ.side_versions[side]
+
+    def get_bars(self, resolution="1s", since=None):
+        """OHLC bars (utils.bars.BAR_DTYPE records) of mid, spread, depth and volume."""
+        return self.bars.bars(resolution, since)
+
+    def wait_for_update(self, since_version, timeout=None):
+        """
+        Block until the book version moves past `since_version` or `timeout` elapses.
+
+        Returns:
+            current version (equal to since_version on timeout)
+        """
+        with self._updated:
+            self._waiters += 1
+            try:
+                self._updated.wait_for(lambda: self.version != since_version or not self.running, timeout)
+            finally:
+                self._waiters -= 1
+        return self.version
+
     def get_latency(self):
         return self.latest_latency_ms
+
+    def get_trade_stats(self, window_s=60.0):
+        if self.trade_tape is None:
+            return None
+        return self.trade_tape.stats(window_s, time.time())